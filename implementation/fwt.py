@@ -1,7 +1,13 @@
 " 高速ウェーブレット変換（サンプル） "
+import contextlib
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from scipy.ndimage import correlate1d
-from scipy.ndimage import convolve1d
+import fwt_backend
 
 # スケーリング係数
 HAAR_SCALING_COEF = [0.707106781186547, 0.707106781186547]
@@ -11,9 +17,77 @@ DAUBECHIES3_SCALING_COEF = [0.332670552950, 0.806891509311, 0.459877502118, -0.1
 DAUBECHIES4_SCALING_COEF = [0.230377813309, 0.714846570553, 0.630880767930, -0.027983769417,\
         -0.187034811719, 0.030841381836, 0.032883011667, -0.010597401785]
 
-def _roundup_power_of_two(integer):
-    """ 入力整数を2の冪数(2, 4, 8, 16, ...)に切り上げる """
-    return 2 ** int(np.ceil(np.log2(integer)))
+# 計測用のフック（区間ごとの記録を受け取る関数） 空の間は計測しない
+_STAGE_HOOKS = []
+# スレッドごとの計測中の区間
+_STAGE_STACK = threading.local()
+
+
+def add_stage_hook(hook):
+    """ 変換の各区間の終了時に記録(dict)を受け取る関数を登録 """
+    _STAGE_HOOKS.append(hook)
+
+
+def remove_stage_hook(hook):
+    """ 登録した関数を外す """
+    _STAGE_HOOKS.remove(hook)
+
+
+class _Stage:
+    """ 計測中の区間 レベルは指定がなければ外側の区間から引き継ぐ """
+
+    def __init__(self, name, level, shape):
+        self.record = {'name': name, 'level': level, 'shape': shape, 'nbytes': 0}
+        self._traced = 0
+
+    def __enter__(self):
+        stack = _STAGE_STACK.__dict__.setdefault('stack', [])
+        if self.record['level'] is None and stack:
+            self.record['level'] = stack[-1].record['level']
+        self.record['depth'] = len(stack)
+        self.record['thread'] = threading.get_ident()
+        stack.append(self)
+        if tracemalloc.is_tracing():
+            self._traced = tracemalloc.get_traced_memory()[0]
+        self.record['start'] = time.perf_counter()
+        return self
+
+    def output(self, *arrays):
+        """ 区間で作った出力配列のバイト数を記録 """
+        self.record['nbytes'] += sum(array.nbytes for array in arrays)
+
+    def __exit__(self, *exc_info):
+        self.record['duration'] = time.perf_counter() - self.record['start']
+        if tracemalloc.is_tracing():
+            self.record['traced_bytes'] = tracemalloc.get_traced_memory()[0] - self._traced
+        _STAGE_STACK.stack.pop()
+        for hook in list(_STAGE_HOOKS):
+            hook(self.record)
+        return False
+
+
+class _NullStage:
+    """ 計測しない時の区間（何もしない） """
+
+    def __enter__(self):
+        return self
+
+    def output(self, *arrays):
+        """ 何もしない """
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _stage(name, level=None, shape=None):
+    """ 計測区間 フックが登録されていなければ何もしない区間を返す
+    変換関数は呼び出しの先頭で_STAGE_HOOKSを確認し、空なら区間を作らない経路で計算する """
+    if not _STAGE_HOOKS:
+        return _NULL_STAGE
+    return _Stage(name, level, shape)
 
 
 def _minmax_scale(vec, maxscale):
@@ -21,7 +95,8 @@ def _minmax_scale(vec, maxscale):
     minval = np.min(vec)
     maxval = np.max(vec)
     # ゼロ除算対策のため、非ゼロ要素だけ除算
-    div = np.divide(vec - minval, maxval - minval, where=(vec - minval) != 0)
+    div = np.divide(vec - minval, maxval - minval, out=np.zeros(np.shape(vec)),
+            where=(vec - minval) != 0)
     return maxscale * div
 
 
@@ -33,150 +108,883 @@ def calculate_wavelet_coef(scaling_coefficients):
     return wavelet_coefficients
 
 
-def fwt1d(src, scaling_coef):
-    """ 1次元高速ウェーブレット変換 """
-    # ウェーブレット係数計算
-    wavelet_coef = calculate_wavelet_coef(scaling_coef)
-    # 入力が整数だと丸め込まれるためfloatに変換
-    src = src.astype(float)
-    # correlate1dはフィルタカーネルの半分（中心）だけ出力が後ろにずれるので
-    # 先に入力を前にずらしておく
-    src = np.roll(src, -len(scaling_coef) // 2)
-    # 畳み込み 入力の端点は巡回
+# フィルタを保持するデータ型
+SUPPORTED_DTYPES = (np.float64, np.float32)
+# 名前なしで渡されたスケーリング係数から作ったWaveletを保持する数
+WAVELET_CACHE_SIZE = 32
+
+
+class Wavelet:
+    """ スケーリング係数から事前計算したフィルタバンク """
+
+    def __init__(self, scaling_coef, name=None):
+        self.name = name
+        scaling_coef = np.array(scaling_coef, dtype=np.float64)
+        if scaling_coef.ndim != 1 or len(scaling_coef) == 0 or len(scaling_coef) % 2 != 0:
+            raise ValueError("scaling coefficients must be a non-empty even-length sequence")
+        wavelet_coef = calculate_wavelet_coef(scaling_coef)
+        # 解析時に入力を前にずらす量（合成時は後ろにずらす）
+        self.shift = len(scaling_coef) // 2
+        # ポリフェーズフィルタをcorrelate1dで使う時の中心位置
+        # 解析は先頭、合成は（逆順にしたフィルタの）末尾に合わせる
+        self.analysis_origin = -(self.shift // 2)
+        self.synthesis_origin = (self.shift - 1) // 2
+        self._filters = {}
+        for dtype in SUPPORTED_DTYPES:
+            dtype = np.dtype(dtype)
+            scaling = scaling_coef.astype(dtype)
+            wavelet = wavelet_coef.astype(dtype)
+            filters = {
+                'scaling': scaling,
+                'wavelet': wavelet,
+                # 解析用ポリフェーズ成分（偶数番目, 奇数番目）
+                'scaling_phases': (scaling[0::2], scaling[1::2]),
+                'wavelet_phases': (wavelet[0::2], wavelet[1::2]),
+                # 合成用ポリフェーズ成分（偶数番目, 奇数番目を逆順にしたもの）
+                'scaling_phases_rev': (scaling[0::2][::-1], scaling[1::2][::-1]),
+                'wavelet_phases_rev': (wavelet[0::2][::-1], wavelet[1::2][::-1]),
+            }
+            # 共有するため書き換え不可にしておく
+            for value in filters.values():
+                for array in (value if isinstance(value, tuple) else (value,)):
+                    array.flags.writeable = False
+            self._filters[dtype] = filters
+
+    def __len__(self):
+        return len(self.scaling_coef)
+
+    def __repr__(self):
+        return f"Wavelet(name={self.name!r}, length={len(self)})"
+
+    @property
+    def scaling_coef(self):
+        """ スケーリング係数（float64） """
+        return self._filters[np.dtype(np.float64)]['scaling']
+
+    @property
+    def wavelet_coef(self):
+        """ ウェーブレット係数（float64） """
+        return self._filters[np.dtype(np.float64)]['wavelet']
+
+    def filters(self, dtype=np.float64):
+        """ 指定データ型のフィルタ一式を取得 """
+        try:
+            return self._filters[np.dtype(dtype)]
+        except KeyError as exc:
+            raise ValueError(f"unsupported dtype: {np.dtype(dtype)}") from exc
+
+
+# 名前で引けるウェーブレット（キャッシュから追い出されない）
+_WAVELET_REGISTRY = {
+    'haar': Wavelet(HAAR_SCALING_COEF, 'haar'),
+    'db2': Wavelet(DAUBECHIES2_SCALING_COEF, 'db2'),
+    'db3': Wavelet(DAUBECHIES3_SCALING_COEF, 'db3'),
+    'db4': Wavelet(DAUBECHIES4_SCALING_COEF, 'db4'),
+}
+# 係数の値からも登録済みのウェーブレットを引けるようにする
+_WAVELET_BY_COEF = {tuple(w.scaling_coef.tolist()): w for w in _WAVELET_REGISTRY.values()}
+
+
+def register_wavelet(name, scaling_coef):
+    """ スケーリング係数に名前を付けてレジストリに登録 """
+    wavelet = Wavelet(scaling_coef, name)
+    _WAVELET_REGISTRY[name] = wavelet
+    _WAVELET_BY_COEF[tuple(wavelet.scaling_coef.tolist())] = wavelet
+    return wavelet
+
+
+def wavelet_names():
+    """ 登録済みウェーブレット名の一覧 """
+    return list(_WAVELET_REGISTRY)
+
+
+@functools.lru_cache(maxsize=WAVELET_CACHE_SIZE)
+def _cached_wavelet(scaling_coef):
+    """ 名前なしのスケーリング係数からWaveletを生成（LRUキャッシュ） """
+    return Wavelet(scaling_coef)
+
+
+def get_wavelet(wavelet):
+    """ Wavelet・登録名・スケーリング係数のいずれかからWaveletを取得 """
+    if isinstance(wavelet, Wavelet):
+        return wavelet
+    if isinstance(wavelet, str):
+        try:
+            return _WAVELET_REGISTRY[wavelet]
+        except KeyError as exc:
+            raise ValueError(f"unknown wavelet: {wavelet}") from exc
+    key = tuple(np.asarray(wavelet, dtype=np.float64).ravel().tolist())
+    if key in _WAVELET_BY_COEF:
+        return _WAVELET_BY_COEF[key]
+    return _cached_wavelet(key)
+
+
+# 境界の拡張方法
+BOUNDARY_MODES = ('periodic', 'symmetric', 'zero')
+
+
+def _check_mode(mode):
+    """ 境界モードの確認 """
+    if mode not in BOUNDARY_MODES:
+        raise ValueError(f"unknown boundary mode: {mode}")
+
+
+def coef_length(length, scaling_coef, mode='periodic'):
+    """ 長さlengthの信号を1回変換した時の係数の長さ """
+    _check_mode(mode)
+    if mode == 'periodic':
+        # 奇数長は末尾を1サンプル延長してから巡回
+        return (length + 1) // 2
+    # 巡回以外はフィルタが信号に掛かる全ての位置の係数を残す（完全再構成のため）
+    return (length + len(get_wavelet(scaling_coef)) - 1) // 2
+
+
+def _extend(src, wavelet, axis, mode):
+    """ 境界モードに従いaxis方向に入力を拡張 """
+    length = src.shape[axis]
+    if mode == 'periodic':
+        if length % 2 == 0:
+            return src
+        # 奇数長は末尾のサンプルを複製して偶数長にする
+        pad, pad_mode = (0, 1), 'edge'
+    else:
+        # 先頭にフィルタ長-2、末尾に偶数長になるまで拡張
+        pad = (len(wavelet) - 2, len(wavelet) - 2 + length % 2)
+        pad_mode = 'symmetric' if mode == 'symmetric' else 'constant'
+    pad_width = [(0, 0)] * src.ndim
+    pad_width[axis] = pad
+    return np.pad(src, pad_width, mode=pad_mode)
+
+
+def _fwt1d_convolve(src, wavelet, axis, periodic):
+    """ 畳み込み後に間引く1次元高速ウェーブレット変換（scipyバックエンド） """
+    filters = wavelet.filters(src.dtype)
+    ndimage = fwt_backend.ndimage()
+    if periodic:
+        # correlate1dはフィルタカーネルの半分（中心）だけ出力が後ろにずれるので
+        # 先に入力を前にずらしておく
+        src = np.roll(src, -wavelet.shift, axis=axis)
+        ndimage_mode = 'wrap'
+        decimate = fwt_backend.axis_slice(src.ndim, axis, slice(None, None, 2))
+    else:
+        # 拡張済みの入力なので、フィルタ全体が入力に収まる位置だけ取り出す
+        ndimage_mode = 'constant'
+        decimate = fwt_backend.axis_slice(src.ndim, axis,
+                slice(wavelet.shift, src.shape[axis] - len(wavelet) + 1 + wavelet.shift, 2))
+    # 畳み込み
     # フィルタのインデックスが正方向に増加するためcorrelate1dを使用
-    decomp_src = correlate1d(src, scaling_coef, mode='wrap')[::2]
-    decomp_wav = correlate1d(src, wavelet_coef, mode='wrap')[::2]
+    decomp_src = ndimage.correlate1d(src, filters['scaling'], axis=axis,
+            mode=ndimage_mode)[decimate]
+    decomp_wav = ndimage.correlate1d(src, filters['wavelet'], axis=axis,
+            mode=ndimage_mode)[decimate]
     return [decomp_src, decomp_wav]
 
 
-def ifwt1d(decomp_src, decomp_wav, scaling_coef):
-    """ 1次元高速ウェーブレット逆変換 """
-    # ウェーブレット係数計算
-    wavelet_coef = calculate_wavelet_coef(scaling_coef)
-    src_len = 2 * len(decomp_src)
+def _fwt1d_polyphase(src, wavelet, axis, periodic):
+    """ ポリフェーズ分解による1次元高速ウェーブレット変換（scipyバックエンド） """
+    filters = wavelet.filters(src.dtype)
+    ndimage = fwt_backend.ndimage()
+    # 入力を偶数/奇数番目に分け、フィルタも偶数/奇数番目の係数に分ける
+    # 間引き後に残るサンプルだけを計算できる
+    src_phases = (src[fwt_backend.axis_slice(src.ndim, axis, slice(0, None, 2))],
+            src[fwt_backend.axis_slice(src.ndim, axis, slice(1, None, 2))])
+    ndimage_mode = 'wrap' if periodic else 'constant'
+    decomp_len = src.shape[axis] // 2 if periodic else (src.shape[axis] - len(wavelet)) // 2 + 1
+    # 出力[n] = sum_j coef[2j] * 偶数[n + j] + coef[2j + 1] * 奇数[n + j]
+    def polyphase_filter(coef_phases):
+        out = ndimage.correlate1d(src_phases[0], coef_phases[0],
+                axis=axis, mode=ndimage_mode, origin=wavelet.analysis_origin)
+        out += ndimage.correlate1d(src_phases[1], coef_phases[1],
+                axis=axis, mode=ndimage_mode, origin=wavelet.analysis_origin)
+        if not periodic:
+            out = out[fwt_backend.axis_slice(out.ndim, axis, slice(0, decomp_len))]
+        return out
+    return [polyphase_filter(filters['scaling_phases']),
+            polyphase_filter(filters['wavelet_phases'])]
+
+
+def _fwt1d_filter(src, wavelet, axis, periodic, method, backend):
+    """ バックエンドに応じたフィルタ・間引き（methodはscipyバックエンドでの計算方法） """
+    backend = fwt_backend.resolve_backend(backend)
+    if backend != 'scipy':
+        # 他のバックエンドは間引き後に残るサンプルだけを計算する
+        return fwt_backend.analysis(src, wavelet.filters(src.dtype), axis, periodic, backend)
+    if method == 'convolve':
+        return _fwt1d_convolve(src, wavelet, axis, periodic)
+    return _fwt1d_polyphase(src, wavelet, axis, periodic)
+
+
+def fwt1d(src, scaling_coef, axis=-1, method='convolve', mode='periodic', dtype=np.float64,
+        *, backend=None):
+    """ 1次元高速ウェーブレット変換（axis方向の信号をまとめて変換）
+    backendは'scipy', 'numpy', 'numba'（Noneなら環境変数FWT_BACKENDか'scipy'） """
+    _check_mode(mode)
+    # フィルタ取得（Wavelet・登録名・スケーリング係数のいずれも可）
+    wavelet = get_wavelet(scaling_coef)
+    if method not in ('convolve', 'polyphase'):
+        raise ValueError(f"unknown method: {method}")
+    if not _STAGE_HOOKS:
+        # 計測しない時は区間を作らずに変換
+        src = _extend(np.asarray(src).astype(dtype, copy=False), wavelet, axis, mode)
+        return _fwt1d_filter(src, wavelet, axis, mode == 'periodic', method, backend)
+    with _stage('fwt1d', shape=np.shape(src)) as stage:
+        with _stage('fwt1d.extend'):
+            # 入力が整数だと丸め込まれるため浮動小数（既定はfloat64）に変換
+            src = np.asarray(src).astype(dtype, copy=False)
+            # 奇数長・巡回以外の境界は入力を拡張しておく
+            src = _extend(src, wavelet, axis, mode)
+        with _stage('fwt1d.filter'):
+            decomp = _fwt1d_filter(src, wavelet, axis, mode == 'periodic', method, backend)
+        stage.output(*decomp)
+    return decomp
+
+
+def fwt1d_valid(src, scaling_coef, axis=-1, dtype=np.float64, *, backend=None):
+    """ 境界拡張済みの入力に対する1次元高速ウェーブレット変換（フィルタが収まる位置のみ） """
+    wavelet = get_wavelet(scaling_coef)
+    src = np.asarray(src).astype(dtype, copy=False)
+    if src.shape[axis] < len(wavelet) or src.shape[axis] % 2 != 0:
+        raise ValueError("extended input must be even-length and at least the filter length")
+    return _fwt1d_filter(src, wavelet, axis, False, 'polyphase', backend)
+
+
+def _ifwt1d_convolve(decomp_src, decomp_wav, wavelet, axis, periodic):
+    """ 0値挿入後に畳み込む1次元高速ウェーブレット逆変換（scipyバックエンド） """
+    filters = wavelet.filters(decomp_src.dtype)
+    ndimage = fwt_backend.ndimage()
+    interp_shape = list(decomp_src.shape)
+    interp_shape[axis] *= 2
+    # 巡回しない場合は、出力のずれの分だけ先頭に0を追加しておく
+    head = 0 if periodic else wavelet.shift
+    interp_shape[axis] += head
     # 0値挿入
-    scaling_interp = np.zeros(src_len)
-    scaling_interp[::2] = decomp_src
-    wavelet_interp = np.zeros(src_len)
-    wavelet_interp[::2] = decomp_wav
-    # 畳み込み 入力の端点は巡回
-    src = convolve1d(scaling_interp, scaling_coef, mode='wrap')
-    src += convolve1d(wavelet_interp, wavelet_coef, mode='wrap')
+    upsample = fwt_backend.axis_slice(decomp_src.ndim, axis, slice(head, None, 2))
+    scaling_interp = np.zeros(interp_shape, dtype=decomp_src.dtype)
+    scaling_interp[upsample] = decomp_src
+    wavelet_interp = np.zeros(interp_shape, dtype=decomp_src.dtype)
+    wavelet_interp[upsample] = decomp_wav
+    # 畳み込み
+    ndimage_mode = 'wrap' if periodic else 'constant'
+    src = ndimage.convolve1d(scaling_interp, filters['scaling'], axis=axis, mode=ndimage_mode)
+    src += ndimage.convolve1d(wavelet_interp, filters['wavelet'], axis=axis, mode=ndimage_mode)
     # convolve1dはフィルタカーネルの半分（中心）だけ出力が前にずれるので
-    # 入力を後ろにずらす
-    src = np.roll(src, len(scaling_coef) // 2)
+    # 入力を後ろにずらす（巡回しない場合は先頭に追加した0の分で相殺済み）
+    if periodic:
+        return np.roll(src, wavelet.shift, axis=axis)
+    return src[fwt_backend.axis_slice(src.ndim, axis, slice(0, 2 * decomp_src.shape[axis]))]
+
+
+def _ifwt1d_polyphase(decomp_src, decomp_wav, wavelet, axis, periodic):
+    """ ポリフェーズ合成による1次元高速ウェーブレット逆変換（scipyバックエンド） """
+    filters = wavelet.filters(decomp_src.dtype)
+    ndimage = fwt_backend.ndimage()
+    # 偶数[m] = sum_j coef[2j] * 係数[m - j]、奇数[m] = sum_j coef[2j + 1] * 係数[m - j]
+    # 逆順のフィルタでcorrelate1dする 0値挿入したバッファは作らない
+    ndimage_mode = 'wrap' if periodic else 'constant'
+    interp_shape = list(decomp_src.shape)
+    interp_shape[axis] *= 2
+    src = np.empty(interp_shape, dtype=decomp_src.dtype)
+    for phase in range(2):
+        out = ndimage.correlate1d(decomp_src, filters['scaling_phases_rev'][phase],
+                axis=axis, mode=ndimage_mode, origin=wavelet.synthesis_origin)
+        out += ndimage.correlate1d(decomp_wav, filters['wavelet_phases_rev'][phase],
+                axis=axis, mode=ndimage_mode, origin=wavelet.synthesis_origin)
+        src[fwt_backend.axis_slice(src.ndim, axis, slice(phase, None, 2))] = out
     return src
 
 
-def fwt2d(src2d, scaling_coef):
-    """ 2次元高速ウェーブレット変換 """
-    src_len = src2d.shape[0]
-    half_src_len = src_len // 2
-    src2d_ll = np.zeros((half_src_len, half_src_len))
-    src2d_hl = np.zeros((half_src_len, half_src_len))
-    src2d_lh = np.zeros((half_src_len, half_src_len))
-    src2d_hh = np.zeros((half_src_len, half_src_len))
-    src2d_l = np.zeros((src_len, half_src_len))
-    src2d_h = np.zeros((src_len, half_src_len))
-    # src2dを低域（左）と高域（右）に分解
-    for j in range(src_len):
-        src_l, src_h = fwt1d(src2d[j, :], scaling_coef)
-        src2d_l[j, :] = src_l
-        src2d_h[j, :] = src_h
-    # src2d_l, src2d_hを更に左上(ll)、左下(hl)、右上(lh)、右下(hh)に分解
-    for j in range(half_src_len):
-        src_l, src_h = fwt1d(src2d_l[:, j], scaling_coef)
-        src2d_ll[:, j] = src_l
-        src2d_hl[:, j] = src_h
-        src_l, src_h = fwt1d(src2d_h[:, j], scaling_coef)
-        src2d_lh[:, j] = src_l
-        src2d_hh[:, j] = src_h
+def _ifwt1d_filter(decomp_src, decomp_wav, wavelet, axis, periodic, method, backend):
+    """ バックエンドに応じたアップサンプル・フィルタ（methodはscipyバックエンドでの計算方法） """
+    backend = fwt_backend.resolve_backend(backend)
+    if backend != 'scipy':
+        return fwt_backend.synthesis(decomp_src, decomp_wav, wavelet.filters(decomp_src.dtype),
+                axis, periodic, backend)
+    if method == 'convolve':
+        return _ifwt1d_convolve(decomp_src, decomp_wav, wavelet, axis, periodic)
+    return _ifwt1d_polyphase(decomp_src, decomp_wav, wavelet, axis, periodic)
+
+
+def ifwt1d_length(decomp_len, scaling_coef, mode='periodic'):
+    """ decomp_len個の係数から再構成される信号の長さ（元の長さが不明な時は偶数長とみなす） """
+    if mode == 'periodic':
+        return 2 * decomp_len
+    return 2 * decomp_len - len(get_wavelet(scaling_coef)) + 2
+
+
+def ifwt1d(decomp_src, decomp_wav, scaling_coef, axis=-1, method='convolve',
+        mode='periodic', length=None, dtype=np.float64, *, backend=None):
+    """ 1次元高速ウェーブレット逆変換（axis方向の信号をまとめて逆変換） """
+    _check_mode(mode)
+    # フィルタ取得（Wavelet・登録名・スケーリング係数のいずれも可）
+    wavelet = get_wavelet(scaling_coef)
+    decomp_src = np.asarray(decomp_src).astype(dtype, copy=False)
+    decomp_wav = np.asarray(decomp_wav).astype(dtype, copy=False)
+    decomp_len = decomp_src.shape[axis]
+    # 元の信号長 指定がなければ偶数長とみなす
+    if length is None:
+        length = ifwt1d_length(decomp_len, wavelet, mode)
+    if coef_length(length, wavelet, mode) != decomp_len:
+        raise ValueError(f"length {length} does not match {decomp_len} coefficients")
+    if method not in ('convolve', 'polyphase'):
+        raise ValueError(f"unknown method: {method}")
+    if not _STAGE_HOOKS:
+        # 計測しない時は区間を作らずに逆変換
+        src = _ifwt1d_filter(decomp_src, decomp_wav, wavelet, axis, mode == 'periodic',
+                method, backend)
+    else:
+        with _stage('ifwt1d', shape=decomp_src.shape) as stage:
+            with _stage('ifwt1d.filter'):
+                src = _ifwt1d_filter(decomp_src, decomp_wav, wavelet, axis, mode == 'periodic',
+                        method, backend)
+            stage.output(src)
+    # 拡張した分を取り除く
+    head = 0 if mode == 'periodic' else len(wavelet) - 2
+    if head == 0 and src.shape[axis] == length:
+        return src
+    return src[fwt_backend.axis_slice(src.ndim, axis, slice(head, head + length))]
+
+
+# 並列処理で1スレッドに割り当てる短冊の最小幅
+PARALLEL_MIN_STRIP = 32
+
+
+@contextlib.contextmanager
+def _executor_scope(workers, executor):
+    """ 並列処理に使うExecutorと分割数を用意（workersだけ指定されたら呼び出し中だけ作る） """
+    if executor is not None:
+        yield executor, workers or os.cpu_count() or 1
+    elif workers is not None and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield pool, workers
+    else:
+        yield None, 1
+
+
+def _run_strips(func, arrays, split_axis, executor, strips):
+    """ 配列をsplit_axis方向の短冊に分けてfuncを適用し、結果を短冊の順に結合 """
+    length = arrays[0].shape[split_axis]
+    strips = max(1, min(strips, length // PARALLEL_MIN_STRIP))
+    if executor is None or strips == 1:
+        return func(*arrays)
+    bounds = np.linspace(0, length, strips + 1).astype(int)
+    pieces = [[array[fwt_backend.axis_slice(array.ndim, split_axis, slice(start, end))]
+            for array in arrays] for start, end in zip(bounds[:-1], bounds[1:])]
+    # 結果は投入順に受け取るので、並列数によらず出力は同じ
+    results = list(executor.map(lambda piece: func(*piece), pieces))
+    if isinstance(results[0], list):
+        return [np.concatenate(outputs, axis=split_axis) for outputs in zip(*results)]
+    return np.concatenate(results, axis=split_axis)
+
+
+def fwt2d(src2d, scaling_coef, method='convolve', mode='periodic', dtype=np.float64,
+        *, workers=None, executor=None, backend=None):
+    """ 2次元高速ウェーブレット変換（workers/executorを指定すると行・列の短冊を並列処理） """
+    wavelet = get_wavelet(scaling_coef)
+    def row_transform(src):
+        return fwt1d(src, wavelet, axis=1, method=method, mode=mode, dtype=dtype,
+                backend=backend)
+    def column_transform(src):
+        return fwt1d(src, wavelet, axis=0, method=method, mode=mode, dtype=dtype,
+                backend=backend)
+    if not _STAGE_HOOKS:
+        # 計測しない時は区間を作らずに変換
+        with _executor_scope(workers, executor) as (pool, strips):
+            src2d_l, src2d_h = _run_strips(row_transform, [np.asarray(src2d)], 0, pool, strips)
+            return (_run_strips(column_transform, [src2d_l], 1, pool, strips)
+                    + _run_strips(column_transform, [src2d_h], 1, pool, strips))
+    with _executor_scope(workers, executor) as (pool, strips), \
+            _stage('fwt2d', shape=np.shape(src2d)) as stage:
+        # src2dを低域（左）と高域（右）に分解 各行をまとめて変換
+        with _stage('fwt2d.rows'):
+            src2d_l, src2d_h = _run_strips(row_transform, [np.asarray(src2d)], 0, pool, strips)
+        # src2d_l, src2d_hを更に左上(ll)、左下(hl)、右上(lh)、右下(hh)に分解 各列をまとめて変換
+        with _stage('fwt2d.columns'):
+            src2d_ll, src2d_hl = _run_strips(column_transform, [src2d_l], 1, pool, strips)
+            src2d_lh, src2d_hh = _run_strips(column_transform, [src2d_h], 1, pool, strips)
+        stage.output(src2d_ll, src2d_hl, src2d_lh, src2d_hh)
     return [src2d_ll, src2d_hl, src2d_lh, src2d_hh]
 
 
-def ifwt2d(src2d_ll, src2d_hl, src2d_lh, src2d_hh, scaling_coef):
-    """ 2次元高速ウェーブレット逆変換 """
-    src_len = src2d_ll.shape[0]
-    twice_src_len = 2 * src_len
-    src2d = np.zeros((twice_src_len, twice_src_len))
-    src2d_l = np.zeros((twice_src_len, src_len))
-    src2d_h = np.zeros((twice_src_len, src_len))
-    # 左上(ll)、左下(hl)、右上(lh)、右下(hh)から左(l)、右(h)に合成
-    for j in range(src_len):
-        src2d_l[:, j] = ifwt1d(src2d_ll[:, j], src2d_hl[:, j], scaling_coef)
-        src2d_h[:, j] = ifwt1d(src2d_lh[:, j], src2d_hh[:, j], scaling_coef)
-    # 左(l)、右(h)から元を合成
-    for j in range(twice_src_len):
-        src2d[j, :] = ifwt1d(src2d_l[j, :], src2d_h[j, :], scaling_coef)
+def ifwt2d(src2d_ll, src2d_hl, src2d_lh, src2d_hh, scaling_coef, method='convolve',
+        mode='periodic', shape=None, dtype=np.float64, *, workers=None, executor=None,
+        backend=None):
+    """ 2次元高速ウェーブレット逆変換（shapeを指定すると元のサイズに切り出す） """
+    wavelet = get_wavelet(scaling_coef)
+    height, width = (None, None) if shape is None else shape
+    def column_transform(decomp_src, decomp_wav):
+        return ifwt1d(decomp_src, decomp_wav, wavelet, axis=0, method=method, mode=mode,
+                length=height, dtype=dtype, backend=backend)
+    def row_transform(decomp_src, decomp_wav):
+        return ifwt1d(decomp_src, decomp_wav, wavelet, axis=1, method=method, mode=mode,
+                length=width, dtype=dtype, backend=backend)
+    if not _STAGE_HOOKS:
+        # 計測しない時は区間を作らずに逆変換
+        with _executor_scope(workers, executor) as (pool, strips):
+            src2d_l = _run_strips(column_transform,
+                    [np.asarray(src2d_ll), np.asarray(src2d_hl)], 1, pool, strips)
+            src2d_h = _run_strips(column_transform,
+                    [np.asarray(src2d_lh), np.asarray(src2d_hh)], 1, pool, strips)
+            return _run_strips(row_transform, [src2d_l, src2d_h], 0, pool, strips)
+    with _executor_scope(workers, executor) as (pool, strips), \
+            _stage('ifwt2d', shape=np.shape(src2d_ll)) as stage:
+        # 左上(ll)、左下(hl)、右上(lh)、右下(hh)から左(l)、右(h)に合成 各列をまとめて逆変換
+        with _stage('ifwt2d.columns'):
+            src2d_l = _run_strips(column_transform,
+                    [np.asarray(src2d_ll), np.asarray(src2d_hl)], 1, pool, strips)
+            src2d_h = _run_strips(column_transform,
+                    [np.asarray(src2d_lh), np.asarray(src2d_hh)], 1, pool, strips)
+        # 左(l)、右(h)から元を合成 各行をまとめて逆変換
+        with _stage('ifwt2d.rows'):
+            src2d = _run_strips(row_transform, [src2d_l, src2d_h], 0, pool, strips)
+        stage.output(src2d)
     return src2d
 
 
-def fwt2d_mra(src2d, max_level, scaling_coef):
+def fwt1d_mra(src, max_level, scaling_coef, axis=-1, method='convolve', mode='periodic',
+        dtype=np.float64, *, backend=None):
+    """ 1次元高速ウェーブレット変換による多重解像度解析 """
+    wavelet = get_wavelet(scaling_coef)
+    octave = []
+    # 低域の分解を繰り返す 先頭に一番解像度の低い情報が来るように、先頭に追記
+    decomp_src = src
+    staged = bool(_STAGE_HOOKS)
+    for level in range(1, max_level + 1):
+        with (_stage('fwt1d_mra.level', level, np.shape(decomp_src)) if staged
+                else _NULL_STAGE):
+            decomp_src, decomp_wav = fwt1d(decomp_src, wavelet, axis=axis,
+                    method=method, mode=mode, dtype=dtype, backend=backend)
+        octave.insert(0, decomp_wav)
+    return [decomp_src, octave]
+
+
+def ifwt1d_mra(lowest_scale, octave, scaling_coef, axis=-1, method='convolve', mode='periodic',
+        length=None, dtype=np.float64, *, backend=None):
+    """ 1次元高速ウェーブレット逆変換による多重解像度再構成（lengthは元の信号長） """
+    wavelet = get_wavelet(scaling_coef)
+    # 元の信号長から各レベルの信号長を求める（解像度の低い順）
+    lengths = [None] * len(octave)
+    if length is not None:
+        for level in range(len(octave) - 1, -1, -1):
+            lengths[level] = length
+            length = coef_length(length, wavelet, mode)
+    reconstract = lowest_scale
+    staged = bool(_STAGE_HOOKS)
+    for level, decomp_wav, level_length in zip(range(len(octave), 0, -1), octave, lengths):
+        with (_stage('ifwt1d_mra.level', level, np.shape(reconstract)) if staged
+                else _NULL_STAGE):
+            reconstract = ifwt1d(reconstract, decomp_wav, wavelet, axis=axis, method=method,
+                    mode=mode, length=level_length, dtype=dtype, backend=backend)
+    return reconstract
+
+
+class ImageOctave(list):
+    """ 多重解像度解析の高域成分リスト（各レベルの入力サイズと境界モードを記録） """
+
+    def __init__(self, subbands=(), shapes=(), mode='periodic'):
+        super().__init__(subbands)
+        # shapes[i]はself[i]を使って再構成する画像のサイズ
+        self.shapes = list(shapes)
+        self.mode = mode
+
+
+def mra_shapes(shape, max_level, scaling_coef, mode='periodic'):
+    """ 多重解像度解析の各レベルの入力サイズ（解像度の低い順） """
+    wavelet = get_wavelet(scaling_coef)
+    shapes = []
+    for _ in range(max_level):
+        shapes.insert(0, tuple(shape))
+        shape = tuple(coef_length(length, wavelet, mode) for length in shape)
+    return shapes
+
+
+def fwt2d_mra(src2d, max_level, scaling_coef, method='convolve', mode='periodic',
+        dtype=np.float64, *, workers=None, executor=None, backend=None):
     """ 2次元高速ウェーブレット変換による多重解像度解析 """
-    image_octave = []
+    wavelet = get_wavelet(scaling_coef)
+    image_octave = ImageOctave(mode=mode)
     # 低域/低域(out_ll)の分解を繰り返す
     out_ll = src2d
-    for _ in range(max_level):
-        out_ll, out_hl, out_lh, out_hh = fwt2d(out_ll, scaling_coef)
-        # 先頭に一番解像度の低い情報が来るように、先頭に追記
-        image_octave.insert(0, [out_hl, out_lh, out_hh])
+    staged = bool(_STAGE_HOOKS)
+    with _executor_scope(workers, executor) as (pool, strips):
+        for level in range(1, max_level + 1):
+            shape = np.shape(out_ll)
+            with _stage('fwt2d_mra.level', level, shape) if staged else _NULL_STAGE:
+                out_ll, out_hl, out_lh, out_hh = fwt2d(out_ll, wavelet, method=method,
+                        mode=mode, dtype=dtype, workers=strips, executor=pool, backend=backend)
+            # 先頭に一番解像度の低い情報が来るように、先頭に追記
+            image_octave.insert(0, [out_hl, out_lh, out_hh])
+            image_octave.shapes.insert(0, shape)
     return [out_ll, image_octave]
 
 
-def ifwt2d_mra(lowest_scale, image_octave, scaling_coef):
-    """ 2次元高速ウェーブレット逆変換による多重解像度再構成 """
+def _synthesis_taps(positions, length, wavelet, mode):
+    """ 逆変換の出力positions番目に各タップが掛かる係数の番号（掛からない所は-1）
+    返り値の形は(フィルタ長, len(positions)) """
+    filter_len = len(wavelet)
+    decomp_len = coef_length(length, wavelet, mode)
+    # 拡張後の座標での位置からタップ分ずらした位置が偶数なら係数に対応
+    offset = 0 if mode == 'periodic' else filter_len - 2
+    ext = np.asarray(positions)[np.newaxis, :] + offset - np.arange(filter_len)[:, np.newaxis]
+    index = ext // 2
+    if mode == 'periodic':
+        index %= decomp_len
+        valid = ext % 2 == 0
+    else:
+        valid = (ext % 2 == 0) & (index >= 0) & (index < decomp_len)
+    return np.where(valid, index, -1)
+
+
+def roi_support(positions, length, scaling_coef, mode='periodic'):
+    """ 長さlengthの信号のpositions番目の再構成に必要な係数の番号（昇順） """
+    taps = _synthesis_taps(positions, length, get_wavelet(scaling_coef), mode)
+    return np.unique(taps[taps >= 0])
+
+
+def _ifwt1d_gather(decomp_src, decomp_wav, support, positions, length, wavelet, axis, mode,
+        dtype):
+    """ 係数のsupport番目だけを持つ配列から、出力のpositions番目だけを逆変換 """
+    filters = wavelet.filters(dtype)
+    taps = _synthesis_taps(positions, length, wavelet, mode)
+    shape = list(decomp_src.shape)
+    shape[axis] = len(positions)
+    out = np.zeros(shape, dtype=dtype)
+    for scaling, wavelet_coef, tap in zip(filters['scaling'], filters['wavelet'], taps):
+        valid = tap >= 0
+        if not np.any(valid):
+            continue
+        local = np.searchsorted(support, tap[valid])
+        out[fwt_backend.axis_slice(out.ndim, axis, np.flatnonzero(valid))] += \
+                scaling * np.take(decomp_src, local, axis=axis) \
+                + wavelet_coef * np.take(decomp_wav, local, axis=axis)
+    return out
+
+
+def _ifwt2d_mra_roi(lowest_scale, image_octave, shapes, wavelet, mode, roi, dtype):
+    """ 関心領域roi=(top, left, height, width)だけを再構成 """
+    top, left, height, width = roi
+    out_shape = shapes[-1] if shapes else np.shape(lowest_scale)
+    if (min(top, left) < 0 or height <= 0 or width <= 0
+            or top + height > out_shape[0] or left + width > out_shape[1]):
+        raise ValueError(f"roi {tuple(roi)} is outside the image of shape {tuple(out_shape)}")
+    # 細かいレベルから順に、フィルタが掛かる係数の範囲を求める
+    rows, cols = np.arange(top, top + height), np.arange(left, left + width)
+    supports = []
+    for level_shape in reversed(shapes):
+        row_support = roi_support(rows, level_shape[0], wavelet, mode)
+        col_support = roi_support(cols, level_shape[1], wavelet, mode)
+        supports.insert(0, (rows, cols, row_support, col_support))
+        rows, cols = row_support, col_support
+    # 必要な係数だけを読み出して解像度の低い順に再構成
+    reconstract = np.asarray(lowest_scale)[np.ix_(rows, cols)].astype(dtype, copy=False)
+    for src_h, level_shape, (rows, cols, row_support, col_support) in zip(
+            image_octave, shapes, supports):
+        src_hl, src_lh, src_hh = [np.asarray(subband)[np.ix_(row_support, col_support)]
+                for subband in src_h]
+        src2d_l = _ifwt1d_gather(reconstract, src_hl, row_support, rows, level_shape[0],
+                wavelet, 0, mode, dtype)
+        src2d_h = _ifwt1d_gather(src_lh, src_hh, row_support, rows, level_shape[0],
+                wavelet, 0, mode, dtype)
+        reconstract = _ifwt1d_gather(src2d_l, src2d_h, col_support, cols, level_shape[1],
+                wavelet, 1, mode, dtype)
+    return reconstract
+
+
+def ifwt2d_mra(lowest_scale, image_octave, scaling_coef, method='convolve',
+        mode=None, shape=None, dtype=np.float64, *, target_level=0, roi=None,
+        workers=None, executor=None, backend=None):
+    """ 2次元高速ウェーブレット逆変換による多重解像度再構成
+    target_levelを指定するとそのレベルの低域/低域（低解像度の近似）で止める
+    roi=(top, left, height, width)を指定すると出力のその領域だけを再構成する """
+    wavelet = get_wavelet(scaling_coef)
+    # 境界モード・各レベルのサイズは指定がなければ解析時の記録を使う
+    if mode is None:
+        mode = getattr(image_octave, 'mode', 'periodic')
+    if shape is not None:
+        shapes = mra_shapes(shape, len(image_octave), wavelet, mode)
+    else:
+        shapes = getattr(image_octave, 'shapes', [])
+        if len(shapes) != len(image_octave):
+            shapes = [None] * len(image_octave)
+    if not 0 <= target_level <= len(image_octave):
+        raise ValueError(f"target_level must be in [0, {len(image_octave)}]")
+    # 細かい方からtarget_level分のレベルは使わない
+    levels = len(image_octave) - target_level
+    image_octave, shapes = list(image_octave)[:levels], list(shapes)[:levels]
+    if roi is not None:
+        # 記録がない場合は偶数長とみなす
+        shapes = [level_shape or tuple(ifwt1d_length(length, wavelet, mode)
+            for length in np.shape(src_h[0])) for src_h, level_shape in zip(image_octave, shapes)]
+        return _ifwt2d_mra_roi(lowest_scale, image_octave, shapes, wavelet, mode, roi, dtype)
     # 先頭から取り出しつつ逐次再構成
     reconstract = lowest_scale
-    for _, src_h in enumerate(image_octave):
-        src_hl, src_lh, src_hh = src_h
-        reconstract = ifwt2d(reconstract, src_hl, src_lh, src_hh, scaling_coef)
+    staged = bool(_STAGE_HOOKS)
+    with _executor_scope(workers, executor) as (pool, strips):
+        for level, src_h, level_shape in zip(range(levels + target_level, target_level, -1),
+                image_octave, shapes):
+            src_hl, src_lh, src_hh = src_h
+            with (_stage('ifwt2d_mra.level', level, np.shape(reconstract)) if staged
+                    else _NULL_STAGE):
+                reconstract = ifwt2d(reconstract, src_hl, src_lh, src_hh, wavelet,
+                        method=method, mode=mode, shape=level_shape, dtype=dtype,
+                        workers=strips, executor=pool, backend=backend)
     return reconstract
 
 
+def fwt2d_mra_batch(images, max_level, scaling_coef, method='convolve', mode='periodic',
+        dtype=np.float64, *, workers=None, executor=None, backend=None):
+    """ 複数画像の多重解像度解析（画像単位で並列処理） """
+    wavelet = get_wavelet(scaling_coef)
+    def transform(image):
+        return fwt2d_mra(image, max_level, wavelet, method=method, mode=mode, dtype=dtype,
+                backend=backend)
+    with _executor_scope(workers, executor) as (pool, _):
+        if pool is None:
+            return [transform(image) for image in images]
+        return list(pool.map(transform, images))
+
+
+def ifwt2d_mra_batch(decomps, scaling_coef, method='convolve', dtype=np.float64,
+        *, workers=None, executor=None, backend=None):
+    """ 複数の多重解像度解析結果([低域, 高域])からの再構成（画像単位で並列処理） """
+    wavelet = get_wavelet(scaling_coef)
+    def transform(decomp):
+        return ifwt2d_mra(decomp[0], decomp[1], wavelet, method=method, dtype=dtype,
+                backend=backend)
+    with _executor_scope(workers, executor) as (pool, _):
+        if pool is None:
+            return [transform(decomp) for decomp in decomps]
+        return list(pool.map(transform, decomps))
+
+
+# ピラミッド配置での高域成分の並び（行オフセット, 列オフセットを取る側）
+PACKED_ORIENTATIONS = ('hl', 'lh', 'hh')
+
+
+def pyramid_layout(shape, max_level, scaling_coef, mode='periodic'):
+    """ 多重解像度解析の係数を1つの配列に詰める時の配置 """
+    # 各レベルの帯域のサイズ（解像度の低い順）
+    subband_shapes = [tuple(coef_length(length, scaling_coef, mode) for length in level_shape)
+            for level_shape in mra_shapes(shape, max_level, scaling_coef, mode)]
+    if not subband_shapes:
+        return tuple(shape), []
+    # 最も低い解像度の低域/低域から順に、右・下・右下へ高域を並べる
+    # 低域の領域は高域より大きくなり得る（奇数サイズ・巡回以外の境界）ので大きい方に合わせる
+    box = subband_shapes[0]
+    layout = []
+    for height, width in subband_shapes:
+        top, left = max(box[0], height), max(box[1], width)
+        layout.insert(0, {
+            'shape': (height, width),
+            'hl': (0, left),
+            'lh': (top, 0),
+            'hh': (top, left),
+        })
+        box = (top + height, left + width)
+    # layout[0]が最も細かいレベル（レベル1）
+    return box, layout
+
+
+def packed_work_size(shape, max_level, scaling_coef, mode='periodic'):
+    """ パック形式の変換・逆変換に必要な作業領域の要素数 """
+    # 各レベルで行方向の低域・高域と、和を取るための一時領域を使う
+    size = 0
+    for rows, cols in mra_shapes(shape, max_level, scaling_coef, mode):
+        height = coef_length(rows, scaling_coef, mode)
+        width = coef_length(cols, scaling_coef, mode)
+        size = max(size, (2 * rows + max(rows, height)) * width)
+    return size
+
+
+class PackedPyramid:
+    """ 多重解像度解析の全係数を1つの配列にピラミッド配置で詰めたもの """
+
+    def __init__(self, data, shape, max_level, scaling_coef, mode='periodic'):
+        self.wavelet = get_wavelet(scaling_coef)
+        self.shape = tuple(shape)
+        self.max_level = max_level
+        self.mode = mode
+        pyramid_shape, self.layout = pyramid_layout(shape, max_level, self.wavelet, mode)
+        if data.shape != pyramid_shape:
+            raise ValueError(f"packed array must have shape {pyramid_shape}, got {data.shape}")
+        self.data = data
+
+    @property
+    def dtype(self):
+        """ 係数のデータ型 """
+        return self.data.dtype
+
+    def subband(self, level, orientation):
+        """ 帯域のビュー（levelは1が最も細かく、'll'は最深レベルのみ） """
+        if orientation == 'll' and level == self.max_level == 0:
+            # 分解していなければ配列全体（元の画像）が低域/低域
+            return self.data
+        if not 1 <= level <= self.max_level:
+            raise ValueError(f"level must be in [1, {self.max_level}]")
+        height, width = self.layout[level - 1]['shape']
+        if orientation == 'll':
+            if level != self.max_level:
+                raise ValueError("'ll' subband is stored only for the deepest level")
+            row, col = 0, 0
+        elif orientation in PACKED_ORIENTATIONS:
+            row, col = self.layout[level - 1][orientation]
+        else:
+            raise ValueError(f"unknown orientation: {orientation}")
+        return self.data[row:row + height, col:col + width]
+
+    def lowest(self):
+        """ 最も解像度の低い低域/低域成分のビュー """
+        return self.subband(self.max_level, 'll')
+
+    def to_mra(self):
+        """ fwt2d_mraと同じ形式（各帯域はビュー）に変換 """
+        image_octave = ImageOctave(mode=self.mode,
+                shapes=mra_shapes(self.shape, self.max_level, self.wavelet, self.mode))
+        for level in range(self.max_level, 0, -1):
+            image_octave.append([self.subband(level, orientation)
+                for orientation in PACKED_ORIENTATIONS])
+        return [self.lowest(), image_octave]
+
+
+def _work_views(work, shapes):
+    """ 作業領域の先頭から指定サイズの配列ビューを切り出す """
+    sizes = [shape[0] * shape[1] for shape in shapes]
+    if sum(sizes) > work.size:
+        raise ValueError(f"work buffer too small: need at least {sum(sizes)} elements")
+    offsets = np.cumsum([0] + sizes)
+    return [work[offset:offset + size].reshape(shape)
+            for offset, size, shape in zip(offsets, sizes, shapes)]
+
+
+def _fwt1d_into(src, wavelet, axis, mode, decomp_src, decomp_wav, tmp, backend):
+    """ 1次元高速ウェーブレット変換の結果を確保済みの配列に書き込む """
+    if mode != 'periodic' or src.shape[axis] % 2 != 0:
+        # 入力の拡張が必要な場合は通常の変換結果をコピー
+        decomp_src[...], decomp_wav[...] = fwt1d(src, wavelet, axis=axis,
+                method='polyphase', mode=mode, dtype=decomp_src.dtype, backend=backend)
+        return
+    filters = wavelet.filters(decomp_src.dtype)
+    backend = fwt_backend.resolve_backend(backend)
+    if backend != 'scipy':
+        fwt_backend.analysis(src.astype(decomp_src.dtype, copy=False), filters, axis, True,
+                backend, decomp_src, decomp_wav, tmp)
+        return
+    # ポリフェーズ分解 出力先・一時領域を指定して新たな配列を確保しない
+    ndimage = fwt_backend.ndimage()
+    src_phases = (src[fwt_backend.axis_slice(src.ndim, axis, slice(0, None, 2))],
+            src[fwt_backend.axis_slice(src.ndim, axis, slice(1, None, 2))])
+    for out, coef_phases in [(decomp_src, filters['scaling_phases']),
+            (decomp_wav, filters['wavelet_phases'])]:
+        ndimage.correlate1d(src_phases[0], coef_phases[0], axis=axis, output=out,
+                mode='wrap', origin=wavelet.analysis_origin)
+        ndimage.correlate1d(src_phases[1], coef_phases[1], axis=axis, output=tmp,
+                mode='wrap', origin=wavelet.analysis_origin)
+        out += tmp
+
+
+def _ifwt1d_into(decomp_src, decomp_wav, wavelet, axis, mode, out, tmp, backend):
+    """ 1次元高速ウェーブレット逆変換の結果を確保済みの配列に書き込む """
+    if mode != 'periodic' or out.shape[axis] != 2 * decomp_src.shape[axis]:
+        # 拡張分の切り落としが必要な場合は通常の逆変換結果をコピー
+        out[...] = ifwt1d(decomp_src, decomp_wav, wavelet, axis=axis, method='polyphase',
+                mode=mode, length=out.shape[axis], dtype=out.dtype, backend=backend)
+        return
+    filters = wavelet.filters(out.dtype)
+    backend = fwt_backend.resolve_backend(backend)
+    if backend != 'scipy':
+        fwt_backend.synthesis(decomp_src, decomp_wav, filters, axis, True, backend, out, tmp)
+        return
+    # ポリフェーズ合成 偶数/奇数番目の出力ビューに直接書き込む
+    ndimage = fwt_backend.ndimage()
+    for phase in range(2):
+        out_phase = out[fwt_backend.axis_slice(out.ndim, axis, slice(phase, None, 2))]
+        ndimage.correlate1d(decomp_src, filters['scaling_phases_rev'][phase], axis=axis,
+                output=out_phase, mode='wrap', origin=wavelet.synthesis_origin)
+        ndimage.correlate1d(decomp_wav, filters['wavelet_phases_rev'][phase], axis=axis,
+                output=tmp, mode='wrap', origin=wavelet.synthesis_origin)
+        out_phase += tmp
+
+
+def fwt2d_mra_packed(src2d, max_level, scaling_coef, mode='periodic', dtype=np.float64,
+        out=None, work=None, *, backend=None):
+    """ 2次元多重解像度解析（全係数を1つの配列にピラミッド配置で書き込む） """
+    wavelet = get_wavelet(scaling_coef)
+    src2d = np.asarray(src2d)
+    if out is None:
+        out = np.empty(pyramid_layout(src2d.shape, max_level, wavelet, mode)[0], dtype=dtype)
+    if work is None:
+        work = np.empty(packed_work_size(src2d.shape, max_level, wavelet, mode), dtype=out.dtype)
+    pyramid = PackedPyramid(out, src2d.shape, max_level, wavelet, mode)
+    if max_level == 0:
+        out[...] = src2d
+        return pyramid
+    # 低域/低域の分解を繰り返す 2レベル目以降は出力配列内の低域/低域を入力とする
+    level_src = src2d
+    for level in range(1, max_level + 1):
+        height, width = pyramid.layout[level - 1]['shape']
+        # 行方向の分解結果は作業領域に置く
+        row_shape = (level_src.shape[0], width)
+        src2d_l, src2d_h, tmp = _work_views(work,
+                [row_shape, row_shape, (max(row_shape[0], height), width)])
+        _fwt1d_into(level_src, wavelet, 1, mode, src2d_l, src2d_h, tmp[:row_shape[0]],
+                backend)
+        # 列方向の分解結果は出力配列の所定の位置に直接書き込む
+        level_src = out[0:height, 0:width]
+        _fwt1d_into(src2d_l, wavelet, 0, mode, level_src,
+                pyramid.subband(level, 'hl'), tmp[:height], backend)
+        _fwt1d_into(src2d_h, wavelet, 0, mode, pyramid.subband(level, 'lh'),
+                pyramid.subband(level, 'hh'), tmp[:height], backend)
+    return pyramid
+
+
+def ifwt2d_mra_packed(pyramid, out=None, work=None, *, backend=None):
+    """ パック形式の多重解像度解析結果から再構成 """
+    wavelet = pyramid.wavelet
+    if out is None:
+        out = np.empty(pyramid.shape, dtype=pyramid.dtype)
+    if work is None:
+        work = np.empty(packed_work_size(pyramid.shape, pyramid.max_level, wavelet, pyramid.mode),
+                dtype=out.dtype)
+    if pyramid.max_level == 0:
+        out[...] = pyramid.data
+        return out
+    # 解像度の低い順に再構成 途中結果は出力配列の左上に置く
+    level_shapes = mra_shapes(pyramid.shape, pyramid.max_level, wavelet, pyramid.mode)
+    reconstract = pyramid.lowest()
+    for level, level_shape in zip(range(pyramid.max_level, 0, -1), level_shapes):
+        height, width = pyramid.layout[level - 1]['shape']
+        # 列方向の合成結果は作業領域に置く
+        rows = level_shape[0]
+        src2d_l, src2d_h, tmp = _work_views(work,
+                [(rows, width), (rows, width), (max(rows, height), width)])
+        _ifwt1d_into(reconstract, pyramid.subband(level, 'hl'), wavelet, 0, pyramid.mode,
+                src2d_l, tmp[:height], backend)
+        _ifwt1d_into(pyramid.subband(level, 'lh'), pyramid.subband(level, 'hh'), wavelet, 0,
+                pyramid.mode, src2d_h, tmp[:height], backend)
+        # 行方向の合成結果を出力配列に書き込む
+        # 巡回以外の境界で途中のサイズが出力より大きくなる場合だけ別に確保
+        if level_shape[0] <= out.shape[0] and level_shape[1] <= out.shape[1]:
+            reconstract = out[0:level_shape[0], 0:level_shape[1]]
+        else:
+            reconstract = np.empty(level_shape, dtype=out.dtype)
+        _ifwt1d_into(src2d_l, src2d_h, wavelet, 1, pyramid.mode, reconstract, tmp[:rows],
+                backend)
+    return out
+
+
+def pyramid_image(packed, maxscale=255):
+    """ 帯域ごとに値域を[0, maxscale]に調整したピラミッド画像（表示用） """
+    image = PackedPyramid(np.zeros(packed.data.shape), packed.shape, packed.max_level,
+            packed.wavelet, mode=packed.mode)
+    image.lowest()[...] = _minmax_scale(packed.lowest(), maxscale)
+    for depth in range(1, packed.max_level + 1):
+        for band in PACKED_ORIENTATIONS:
+            image.subband(depth, band)[...] = _minmax_scale(packed.subband(depth, band), maxscale)
+    return image.data
+
+
 if __name__ == "__main__":
+    import importlib
     import sys
-    from PIL import Image
-
-    MAX_LEVEL = 2
-
-    # 画像読み込み（簡略化のためグレスケ変換）
-    img = Image.open(sys.argv[1]).convert("L")
-
-    # サイズを2の冪数に切り上げ、配列に画像データをロード
-    # 余白は0埋め
-    p2width = _roundup_power_of_two(max(img.height, img.width))
-    original = np.zeros((p2width, p2width))
-    original[0:img.height, 0:img.width] = np.asarray(img)
-    image_pyramid = original.copy()
-
-    # スケーリング係数
-    scal_coef = HAAR_SCALING_COEF
-    # scal_coef = DAUBECHIES2_SCALING_COEF
-    # scal_coef = DAUBECHIES3_SCALING_COEF
-    # scal_coef = DAUBECHIES4_SCALING_COEF
-
-    # 分解
-    ll, octave = fwt2d_mra(original, MAX_LEVEL, scal_coef)
-
-    # ピラミッド画像作成
-    width = ll.shape[0]
-    image_pyramid[0:width, 0:width] = _minmax_scale(ll, 255)
-    for _, h in enumerate(octave):
-        hl, lh, hh = h
-        width = hl.shape[0]
-        image_pyramid[0:width, width:2*width] = _minmax_scale(hl, 255)
-        image_pyramid[width:2*width, 0:width] = _minmax_scale(lh, 255)
-        image_pyramid[width:2*width, width:2*width] = _minmax_scale(hh, 255)
-
-    # 再構成
-    recon = ifwt2d_mra(ll, octave, scal_coef)
-
-    # 再構成誤差
-    print('Reconstract RMSE:', np.linalg.norm(original - recon))
-
-    # 結果保存
-    Image.fromarray(original.astype(np.uint8)).save("original.png")
-    Image.fromarray(image_pyramid.astype(np.uint8)).save("pyramid.png")
-    Image.fromarray(recon.astype(np.uint8)).save("reconstruct.png")
-
-    sys.exit()
+    # 画像の一括分解はfwt_cliで行う（python fwt.py 画像... で同じ引数を受け付ける）
+    # ワーカープロセスへ渡す関数を解決できるよう、モジュールとして読み込んで呼ぶ
+    sys.exit(importlib.import_module('fwt_cli').main())
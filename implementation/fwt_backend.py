@@ -0,0 +1,322 @@
+" 高速ウェーブレット変換の計算バックエンド（フィルタ・間引き、アップサンプル・フィルタ、à trousの核） "
+import functools
+import importlib
+import importlib.util
+import os
+import numpy as np
+
+# 選択できるバックエンド
+# 'scipy': scipy.ndimageのcorrelate1d/convolve1d（初めて使う時に読み込む）
+# 'numpy': NumPyのストライド付きビューへの足し込み（scipy不要）
+# 'numba': Numbaで巡回・フィルタ・間引きを1パスにまとめたもの（numbaが必要）
+BACKENDS = ('scipy', 'numpy', 'numba')
+# 既定のバックエンドを指定する環境変数
+BACKEND_ENV = 'FWT_BACKEND'
+DEFAULT_BACKEND = 'scipy'
+
+
+@functools.lru_cache(maxsize=None)
+def _installed(module):
+    """ モジュールが読み込めるか（読み込みはしない） """
+    return importlib.util.find_spec(module) is not None
+
+
+def available_backends():
+    """ この環境で使えるバックエンド """
+    return [backend for backend in BACKENDS if _installed(backend)]
+
+
+def resolve_backend(backend=None):
+    """ バックエンド名の確認（Noneなら環境変数FWT_BACKEND、なければDEFAULT_BACKEND） """
+    if backend is None:
+        backend = os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend}")
+    if not _installed(backend):
+        raise ImportError(f"backend {backend!r} requires the {backend} package")
+    return backend
+
+
+@functools.lru_cache(maxsize=None)
+def ndimage():
+    """ scipy.ndimage（import fwtを軽くするため初めて使う時に読み込む） """
+    return importlib.import_module('scipy.ndimage')
+
+
+def axis_slice(ndim, axis, index):
+    """ 指定軸だけindexで切り出すためのスライスタプルを生成 """
+    slices = [slice(None)] * ndim
+    slices[axis] = index
+    return tuple(slices)
+
+
+def _numpy_filter(src, filters, axis, decomp_src, decomp_wav, tmp):
+    """ 出力[n] = sum_k coef[k] * 入力[2n + k]（入力は拡張済み）を係数ごとの間引いたビューの足し込みで計算 """
+    count = decomp_src.shape[axis]
+    for k, (scaling, wavelet) in enumerate(zip(filters['scaling'], filters['wavelet'])):
+        shifted = src[axis_slice(src.ndim, axis, slice(k, k + 2 * count - 1, 2))]
+        if k == 0:
+            np.multiply(shifted, scaling, out=decomp_src)
+            np.multiply(shifted, wavelet, out=decomp_wav)
+            continue
+        np.multiply(shifted, scaling, out=tmp)
+        decomp_src += tmp
+        np.multiply(shifted, wavelet, out=tmp)
+        decomp_wav += tmp
+
+
+def _numpy_analysis(src, filters, axis, decomp_src, decomp_wav, tmp, periodic):
+    """ フィルタ・間引き 巡回で折り返す末尾だけを小さな拡張で別に計算し、入力全体はコピーしない """
+    taps = len(filters['scaling'])
+    count = decomp_src.shape[axis]
+    # 折り返さずに計算できる出力の数
+    inner = max(0, min(count, (src.shape[axis] - taps) // 2 + 1)) if periodic else count
+    if inner > 0:
+        index = axis_slice(src.ndim, axis, slice(0, inner))
+        _numpy_filter(src, filters, axis, decomp_src[index], decomp_wav[index], tmp[index])
+    if inner < count:
+        # 末尾の出力が参照する入力[2 * inner, 2 * count + taps - 2)だけを巡回で取り出す
+        extended = src[axis_slice(src.ndim, axis,
+            np.arange(2 * inner, 2 * count + taps - 2) % src.shape[axis])]
+        index = axis_slice(src.ndim, axis, slice(inner, count))
+        _numpy_filter(extended, filters, axis, decomp_src[index], decomp_wav[index], tmp[index])
+
+
+def _numpy_synthesis(decomp_src, decomp_wav, filters, axis, out, tmp, periodic):
+    """ 偶数/奇数番目の出力[m] = sum_j coef[2j + 位相] * 係数[m - j] を足し込みで計算
+    係数[m - j]が範囲外になる先頭 m < half - 1 だけは別に計算し、係数全体はコピーしない """
+    half = len(filters['scaling']) // 2
+    count = decomp_src.shape[axis]
+    head = min(half - 1, count)
+    ndim = out.ndim
+    if periodic and head > 0:
+        # 先頭の出力が参照する係数[-(half - 1), head)だけを巡回で取り出す
+        wrap = axis_slice(ndim, axis, np.arange(-(half - 1), head) % count)
+        head_coefs = [decomp_src[wrap], decomp_wav[wrap]]
+        offset = half - 1
+    else:
+        # 巡回しない場合、範囲外の係数は0なので足さない
+        head_coefs = [decomp_src, decomp_wav]
+        offset = 0
+    for phase in range(2):
+        out_phase = out[axis_slice(ndim, axis, slice(phase, None, 2))]
+        taps = [(2 * j + phase, j) for j in range(half)]
+        if count > head:
+            inner = axis_slice(ndim, axis, slice(head, None))
+            for tap, j in taps:
+                index = axis_slice(ndim, axis, slice(head - j, count - j))
+                np.multiply(decomp_src[index], filters['scaling'][tap],
+                        out=out_phase[inner] if j == 0 else tmp[inner])
+                if j > 0:
+                    out_phase[inner] += tmp[inner]
+                np.multiply(decomp_wav[index], filters['wavelet'][tap], out=tmp[inner])
+                out_phase[inner] += tmp[inner]
+        out_phase[axis_slice(ndim, axis, slice(0, head))] = 0
+        for tap, j in taps:
+            # 出力[start, head)は取り出した係数[start + offset - j, head + offset - j)を参照
+            start = max(0, j - offset)
+            if start >= head:
+                continue
+            index = axis_slice(ndim, axis, slice(start + offset - j, head + offset - j))
+            part = axis_slice(ndim, axis, slice(start, head))
+            for coefs, coef in zip(head_coefs, [filters['scaling'][tap], filters['wavelet'][tap]]):
+                np.multiply(coefs[index], coef, out=tmp[part])
+                out_phase[part] += tmp[part]
+
+
+def _numpy_atrous(src, filters, step, axis):
+    """ 係数の間にstep-1個の0を挿入したフィルタでの巡回相関
+    0を挿入したフィルタは作らず、係数ごとにずらした入力を足し込む（計算量はレベルによらない） """
+    length = src.shape[axis]
+    pad_width = [(0, 0)] * src.ndim
+    pad_width[axis] = (0, step * (len(filters['scaling']) - 1))
+    extended = np.pad(src, pad_width, mode='wrap')
+    decomp_src = np.zeros_like(src)
+    decomp_wav = np.zeros_like(src)
+    for k, (scaling, wavelet) in enumerate(zip(filters['scaling'], filters['wavelet'])):
+        shifted = extended[axis_slice(src.ndim, axis, slice(step * k, step * k + length))]
+        decomp_src += scaling * shifted
+        decomp_wav += wavelet * shifted
+    return [decomp_src, decomp_wav]
+
+
+def _numpy_iatrous(decomp_src, decomp_wav, filters, step, axis):
+    """ _numpy_atrousの逆（2つの位相からの再構成の和、1/2倍は呼び出し側） """
+    length = decomp_src.shape[axis]
+    taps = len(filters['scaling'])
+    pad_width = [(0, 0)] * decomp_src.ndim
+    pad_width[axis] = (step * (taps - 1), 0)
+    extended_src = np.pad(decomp_src, pad_width, mode='wrap')
+    extended_wav = np.pad(decomp_wav, pad_width, mode='wrap')
+    out = np.zeros_like(decomp_src)
+    for k, (scaling, wavelet) in enumerate(zip(filters['scaling'], filters['wavelet'])):
+        index = axis_slice(out.ndim, axis,
+                slice(step * (taps - 1 - k), step * (taps - 1 - k) + length))
+        out += scaling * extended_src[index]
+        out += wavelet * extended_wav[index]
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_kernels():
+    """ Numbaでコンパイルした核（初めて使う時に読み込み、型ごとに初回呼び出し時にコンパイル）
+    配列は(変換軸より前, 変換軸, 変換軸より後)の3次元にまとめて渡す """
+    numba = importlib.import_module('numba')
+
+    @numba.njit(cache=True, nogil=True)
+    def analysis_kernel(src, scaling, wavelet, decomp_src, decomp_wav, periodic):
+        pre, length, post = src.shape
+        for i in range(pre):
+            for n in range(decomp_src.shape[1]):
+                for j in range(post):
+                    # 和は出力に書き戻さずに求める
+                    acc_src = 0.0
+                    acc_wav = 0.0
+                    for k in range(scaling.shape[0]):
+                        # 巡回は添字の折り返しで扱い、ずらした入力を作らない
+                        index = 2 * n + k
+                        while periodic and index >= length:
+                            index -= length
+                        acc_src += scaling[k] * src[i, index, j]
+                        acc_wav += wavelet[k] * src[i, index, j]
+                    decomp_src[i, n, j] = acc_src
+                    decomp_wav[i, n, j] = acc_wav
+
+    @numba.njit(cache=True, nogil=True)
+    def synthesis_kernel(decomp_src, decomp_wav, scaling, wavelet, out, periodic):
+        pre, count, post = decomp_src.shape
+        for i in range(pre):
+            for m in range(count):
+                for j in range(post):
+                    # 出力[2m], 出力[2m + 1]は同じ係数[m - t]から求まるので一度に計算
+                    acc_even = 0.0
+                    acc_odd = 0.0
+                    for t in range(scaling.shape[0] // 2):
+                        n = m - t
+                        if n < 0 and not periodic:
+                            break
+                        if n < 0:
+                            n += count * ((-n - 1) // count + 1)
+                        acc_even += scaling[2 * t] * decomp_src[i, n, j] \
+                                + wavelet[2 * t] * decomp_wav[i, n, j]
+                        acc_odd += scaling[2 * t + 1] * decomp_src[i, n, j] \
+                                + wavelet[2 * t + 1] * decomp_wav[i, n, j]
+                    out[i, 2 * m, j] = acc_even
+                    out[i, 2 * m + 1, j] = acc_odd
+
+    @numba.njit(cache=True, nogil=True)
+    def atrous_kernel(src, scaling, wavelet, decomp_src, decomp_wav, step):
+        pre, length, post = src.shape
+        # 係数ごとのずれ（入力長で折り返したもの）
+        offsets = np.array([step * k % length for k in range(scaling.shape[0])])
+        for i in range(pre):
+            for n in range(length):
+                for j in range(post):
+                    acc_src = 0.0
+                    acc_wav = 0.0
+                    for k in range(scaling.shape[0]):
+                        index = n + offsets[k]
+                        if index >= length:
+                            index -= length
+                        acc_src += scaling[k] * src[i, index, j]
+                        acc_wav += wavelet[k] * src[i, index, j]
+                    decomp_src[i, n, j] = acc_src
+                    decomp_wav[i, n, j] = acc_wav
+
+    @numba.njit(cache=True, nogil=True)
+    def iatrous_kernel(decomp_src, decomp_wav, scaling, wavelet, out, step):
+        pre, length, post = decomp_src.shape
+        offsets = np.array([step * k % length for k in range(scaling.shape[0])])
+        for i in range(pre):
+            for n in range(length):
+                for j in range(post):
+                    acc = 0.0
+                    for k in range(scaling.shape[0]):
+                        index = n - offsets[k]
+                        if index < 0:
+                            index += length
+                        acc += scaling[k] * decomp_src[i, index, j] \
+                                + wavelet[k] * decomp_wav[i, index, j]
+                    out[i, n, j] = acc
+
+    return analysis_kernel, synthesis_kernel, atrous_kernel, iatrous_kernel
+
+
+def _view_3d(array, axis):
+    """ (axisより前, axis, axisより後)にまとめた3次元配列（ビューにできなければコピー） """
+    axis %= array.ndim
+    return array.reshape(int(np.prod(array.shape[:axis])), array.shape[axis],
+            int(np.prod(array.shape[axis + 1:])))
+
+
+def _numba_call(kernel, inputs, outputs, axis, filters, option):
+    """ 3次元にまとめた入出力で核を呼ぶ（出力がビューにできなければ計算後に書き戻す）
+    optionは核の最後の引数（巡回するか、à trousの係数の間隔） """
+    views = [_view_3d(output, axis) for output in outputs]
+    kernel(*[_view_3d(array, axis) for array in inputs], filters['scaling'],
+            filters['wavelet'], *views, option)
+    for output, view in zip(outputs, views):
+        if not np.may_share_memory(output, view):
+            output[...] = view.reshape(output.shape)
+
+
+def analysis(src, filters, axis, periodic, backend, decomp_src=None, decomp_wav=None,
+        tmp=None):
+    """ フィルタ・間引き 低域・高域[n] = sum_k coef[k] * 入力[2n + k]
+    巡回なら入力は偶数長で添字はその長さで折り返し、巡回しないなら入力は拡張済みとする
+    tmpは出力と同じ形の一時領域（numpyバックエンドで使い、Noneなら確保する） """
+    length = src.shape[axis]
+    shape = list(src.shape)
+    shape[axis] = length // 2 if periodic else (length - len(filters['scaling'])) // 2 + 1
+    if decomp_src is None:
+        decomp_src = np.empty(shape, dtype=src.dtype)
+    if decomp_wav is None:
+        decomp_wav = np.empty(shape, dtype=src.dtype)
+    if backend == 'numba':
+        _numba_call(_numba_kernels()[0], [src], [decomp_src, decomp_wav], axis, filters,
+                periodic)
+    else:
+        if tmp is None:
+            tmp = np.empty_like(decomp_src)
+        _numpy_analysis(src, filters, axis, decomp_src, decomp_wav, tmp, periodic)
+    return [decomp_src, decomp_wav]
+
+
+def synthesis(decomp_src, decomp_wav, filters, axis, periodic, backend, out=None, tmp=None):
+    """ アップサンプル・フィルタ 出力[p] = sum_{2n + k = p} h[k] * 低域[n] + g[k] * 高域[n]
+    出力は係数の2倍の長さ（巡回なら添字はその長さで折り返す）
+    tmpは係数と同じ形の一時領域（numpyバックエンドで使い、Noneなら確保する） """
+    if out is None:
+        shape = list(decomp_src.shape)
+        shape[axis] *= 2
+        out = np.empty(shape, dtype=decomp_src.dtype)
+    if backend == 'numba':
+        _numba_call(_numba_kernels()[1], [decomp_src, decomp_wav], [out], axis, filters,
+                periodic)
+    else:
+        if tmp is None:
+            tmp = np.empty_like(decomp_src, dtype=out.dtype)
+        _numpy_synthesis(decomp_src, decomp_wav, filters, axis, out, tmp, periodic)
+    return out
+
+
+def atrous(src, filters, step, axis, backend):
+    """ 間引きなしの巡回フィルタ 低域・高域[n] = sum_k coef[k] * 入力[(n + step * k) mod N]
+    scipyのcorrelate1dは挿入した0の分も計算するので、'scipy'でもNumPyの足し込みを使う """
+    if backend == 'numba':
+        decomp = [np.empty_like(src), np.empty_like(src)]
+        _numba_call(_numba_kernels()[2], [src], decomp, axis, filters, step)
+        return decomp
+    return _numpy_atrous(src, filters, step, axis)
+
+
+def iatrous(decomp_src, decomp_wav, filters, step, axis, backend):
+    """ atrousの逆 出力[n] = sum_k (h[k] * 低域[n - step * k] + g[k] * 高域[n - step * k]) / 2 """
+    if backend == 'numba':
+        out = np.empty_like(decomp_src)
+        _numba_call(_numba_kernels()[3], [decomp_src, decomp_wav], [out], axis, filters, step)
+    else:
+        out = _numpy_iatrous(decomp_src, decomp_wav, filters, step, axis)
+    # 間引きなしの変換は2倍冗長なので、2つの位相からの再構成を平均する
+    out *= 0.5
+    return out
@@ -0,0 +1,229 @@
+" 高速ウェーブレット変換のベンチマーク（結果はJSONで出力し、基準と比較） "
+import argparse
+import importlib.metadata
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import fwt
+import fwt_backend
+
+# 計測条件の既定値
+# 'quick'はCIなど短時間で回す用
+SWEEPS = {
+    'full': {
+        'sizes_1d': [1024, 16384, 262144],
+        'sizes_2d': [64, 256, 1024],
+        'levels': [1, 3, 5],
+        'wavelets': ['haar', 'db2', 'db3', 'db4'],
+        'dtypes': ['float64', 'float32'],
+    },
+    'quick': {
+        'sizes_1d': [4096],
+        'sizes_2d': [128],
+        'levels': [3],
+        'wavelets': ['haar', 'db4'],
+        'dtypes': ['float64'],
+    },
+}
+# 回帰とみなす基準からの遅延の割合
+DEFAULT_THRESHOLD = 0.2
+
+
+def _cases_1d(size, wavelet, dtype, levels, backend):
+    """ 1次元の計測対象 (関数名, レベル, 計測する処理) 逆変換の入力は取り出す時に用意する """
+    src = np.random.default_rng(0).random(size)
+    options = {'dtype': dtype, 'backend': backend}
+    decomp = fwt.fwt1d(src, wavelet, **options)
+    yield 'fwt1d', None, lambda: fwt.fwt1d(src, wavelet, **options)
+    yield 'ifwt1d', None, lambda: fwt.ifwt1d(*decomp, wavelet, **options)
+    for level in levels:
+        mra = fwt.fwt1d_mra(src, level, wavelet, **options)
+        yield 'fwt1d_mra', level, lambda level=level: fwt.fwt1d_mra(src, level, wavelet,
+                **options)
+        yield 'ifwt1d_mra', level, lambda mra=mra: fwt.ifwt1d_mra(*mra, wavelet, **options)
+
+
+def _cases_2d(size, wavelet, dtype, levels, backend):
+    """ 2次元の計測対象 (関数名, レベル, 計測する処理) 逆変換の入力は取り出す時に用意する """
+    src = np.random.default_rng(0).random((size, size))
+    options = {'dtype': dtype, 'backend': backend}
+    decomp = fwt.fwt2d(src, wavelet, **options)
+    yield 'fwt2d', None, lambda: fwt.fwt2d(src, wavelet, **options)
+    yield 'ifwt2d', None, lambda: fwt.ifwt2d(*decomp, wavelet, **options)
+    for level in levels:
+        mra = fwt.fwt2d_mra(src, level, wavelet, **options)
+        yield 'fwt2d_mra', level, lambda level=level: fwt.fwt2d_mra(src, level, wavelet,
+                **options)
+        yield 'ifwt2d_mra', level, lambda mra=mra: fwt.ifwt2d_mra(*mra, wavelet, **options)
+
+
+def measure(func, repeat=5, min_time=0.05):
+    """ 処理時間（repeat回の最小値）と処理中のメモリ確保のピーク（バイト） """
+    # 1回目はキャッシュなどの影響を除くため捨てる
+    func()
+    best = float('inf')
+    for _ in range(repeat):
+        # 短い処理は合計min_time以上になるまで繰り返して平均する
+        count = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / count)
+    # 時間への影響を避けるためメモリは別に計測
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_suite(sweep, repeat=5, min_time=0.05, pattern=None, log=None, backend=None):
+    """ 全条件を計測し結果のリストを返す（patternを含む名前の条件だけに絞れる） """
+    results = []
+    grids = [('1d', _cases_1d, sweep['sizes_1d']), ('2d', _cases_2d, sweep['sizes_2d'])]
+    for dim, cases, sizes in grids:
+        for size, wavelet, dtype in itertools.product(sizes, sweep['wavelets'],
+                sweep['dtypes']):
+            samples = size if dim == '1d' else size * size
+            for function, level, func in cases(size, wavelet, np.dtype(dtype), sweep['levels'],
+                    backend):
+                shape = f"{size}" if dim == '1d' else f"{size}x{size}"
+                name = f"{function}[{wavelet},{shape},{dtype}" \
+                        + ("]" if level is None else f",level={level}]")
+                if pattern is not None and pattern not in name:
+                    continue
+                seconds, peak = measure(func, repeat, min_time)
+                result = {'name': name, 'function': function, 'wavelet': wavelet,
+                        'shape': shape, 'dtype': dtype, 'level': level, 'time_s': seconds,
+                        'samples_per_s': samples / seconds, 'peak_bytes': peak}
+                results.append(result)
+                if log is not None:
+                    log(result)
+    return results
+
+
+def _package_version(name):
+    """ パッケージのバージョン（読み込まずに調べる なければNone） """
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def environment(backend=None):
+    """ 計測環境の記録 """
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': _package_version('scipy'), 'numba': _package_version('numba'),
+            'backend': fwt_backend.resolve_backend(backend), 'machine': platform.machine(),
+            'platform': platform.platform(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def _process_time(code, repeat):
+    """ 新しいPythonプロセスでcodeを実行した時間（repeat回の最小値） """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True,
+                cwd=os.path.dirname(os.path.abspath(__file__)))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_startup(backends=None, repeat=5):
+    """ 起動時間（何もしないプロセスからの増分）
+    'import fwt'と、バックエンドごとの最初の変換までの時間を(名前, 秒)のリストで返す
+    scipyの読み込みやnumbaのコンパイルは最初の変換の時間に含まれる """
+    baseline = _process_time('pass', repeat)
+    startup = [{'name': 'import fwt', 'time_s': _process_time('import fwt', repeat) - baseline}]
+    for backend in backends or fwt_backend.available_backends():
+        code = ("import numpy as np; import fwt; "
+                f"fwt.fwt2d_mra(np.zeros((64, 64)), 2, 'db2', backend={backend!r})")
+        startup.append({'name': f"first fwt2d_mra[{backend}]",
+            'time_s': _process_time(code, repeat) - baseline})
+    return startup
+
+
+def _measured_backend(results):
+    """ 結果を計測したバックエンド（記録の無い結果はバックエンドを選べなかった版のscipy） """
+    return results.get('environment', {}).get('backend', 'scipy')
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """ 基準の結果と比べ、threshold以上遅くなった条件を(名前, 基準, 今回, 比)で返す
+    条件名にはバックエンドを含まないので、違うバックエンドの結果どうしは比べない（ValueError） """
+    if _measured_backend(results) != _measured_backend(baseline):
+        raise ValueError(f"cannot compare backend {_measured_backend(results)!r} "
+                f"with baseline measured on {_measured_backend(baseline)!r}")
+    baseline_times = {result['name']: result['time_s'] for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        base = baseline_times.get(result['name'])
+        if base is not None and result['time_s'] > base * (1 + threshold):
+            regressions.append((result['name'], base, result['time_s'], result['time_s'] / base))
+    return regressions
+
+
+def _print_result(result):
+    """ 計測結果1件の表示 """
+    print(f"{result['name']:<48} {1e3 * result['time_s']:10.3f} ms "
+            f"{result['samples_per_s'] / 1e6:10.2f} Msamples/s "
+            f"{result['peak_bytes'] / 1e6:10.2f} MB")
+
+
+def main(argv=None):
+    """ コマンドラインのエントリポイント（回帰があれば1を返す） """
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--sweep', default='full', choices=sorted(SWEEPS),
+            help="set of sizes, wavelets, levels and dtypes to measure")
+    parser.add_argument('-k', '--filter', default=None, help="measure only names containing this")
+    parser.add_argument('--repeat', type=int, default=5, help="repetitions per case")
+    parser.add_argument('--min-time', type=float, default=0.05,
+            help="minimum seconds per repetition")
+    parser.add_argument('-o', '--output', default=None, help="write results to this JSON file")
+    parser.add_argument('-b', '--baseline', default=None, help="baseline JSON to compare with")
+    parser.add_argument('--backend', default=None, choices=fwt_backend.BACKENDS,
+            help="compute backend to measure")
+    parser.add_argument('--startup', action='store_true',
+            help="also measure interpreter startup and first-transform time per backend")
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+            help="allowed slowdown against the baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    results = {'environment': environment(args.backend), 'sweep': args.sweep,
+            'results': run_suite(SWEEPS[args.sweep], args.repeat, args.min_time,
+                args.filter, _print_result, args.backend)}
+    if args.startup:
+        results['startup'] = measure_startup(repeat=args.repeat)
+        for entry in results['startup']:
+            print(f"{entry['name']:<48} {1e3 * entry['time_s']:10.3f} ms")
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=1)
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    try:
+        regressions = compare(results, baseline, args.threshold)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    for name, base, current, ratio in regressions:
+        print(f"REGRESSION {name}: {1e3 * base:.3f} ms -> {1e3 * current:.3f} ms ({ratio:.2f}x)")
+    print(f"{len(regressions)} regressions over {args.threshold:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
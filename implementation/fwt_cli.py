@@ -0,0 +1,228 @@
+" 高速ウェーブレット変換による画像の一括分解（コマンドライン） "
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+import fwt
+import fwt_backend
+import fwt_store
+
+# 入力として扱う画像の拡張子
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.gif')
+# 出力形式と出力ファイルの接尾辞
+OUTPUT_SUFFIXES = {
+    # 帯域ごとに値域を調整したピラミッド画像
+    'png': '_pyramid.png',
+    # ピラミッド配置の係数そのもの
+    'npy': '_pyramid.npy',
+    # ウェーブレット・境界モードなどを記録した係数ファイル（fwt_store）
+    'fwc': '.fwc',
+}
+# 出力と一緒に記録し、最新かどうかの判定で比べるオプション（計算バックエンドは結果を変えないので除く）
+RECORDED_OPTIONS = ('wavelet', 'level', 'mode', 'format', 'dtype', 'quantize')
+# 記録したオプションのファイルの接尾辞（出力ファイル名に付ける）
+OPTIONS_SUFFIX = '.json'
+
+
+def collect_inputs(patterns):
+    """ ディレクトリ・globパターン・ファイル名から入力画像の一覧を作る（重複は除く） """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.extend(os.path.join(root, name) for name in sorted(files)
+                        if name.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths.extend(sorted(glob.glob(pattern, recursive=True)) or [pattern])
+    return list(dict.fromkeys(paths))
+
+
+def input_root(paths):
+    """ 入力画像に共通の親ディレクトリ（出力ではここからの相対的なディレクトリ構成を保つ） """
+    if not paths:
+        return os.curdir
+    return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+
+
+def output_path(src_path, output_dir, output_format, root=None):
+    """ 入力画像に対応する出力ファイル名（rootを与えるとそこからのサブディレクトリを再現） """
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    subdir = '' if root is None else os.path.relpath(
+            os.path.dirname(os.path.abspath(src_path)), root)
+    return os.path.normpath(os.path.join(output_dir, subdir, stem + OUTPUT_SUFFIXES[output_format]))
+
+
+def find_collisions(tasks):
+    """ 出力先が同じになる入力の組（例: a.pngとa.jpg）を{出力先: [入力, ...]}で返す """
+    sources = {}
+    for src_path, dst_path, _ in tasks:
+        sources.setdefault(dst_path, []).append(src_path)
+    return {dst_path: paths for dst_path, paths in sources.items() if len(paths) > 1}
+
+
+def recorded_options(options):
+    """ 出力と一緒に記録するオプション（JSONにできる形） """
+    return {key: str(options[key]) if key == 'dtype' else options[key]
+            for key in RECORDED_OPTIONS}
+
+
+def read_recorded_options(dst_path):
+    """ 出力に記録したオプション（無い・読めなければNone） """
+    try:
+        with open(dst_path + OPTIONS_SUFFIX, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(src_path, dst_path, options=None):
+    """ 出力が存在し、入力より新しければ真（入力が無ければ偽とし、分解時のエラーとして報告する）
+    optionsを与えると、出力に記録したオプションが同じ場合に限る """
+    if not (os.path.exists(src_path) and os.path.exists(dst_path)
+            and os.path.getmtime(dst_path) >= os.path.getmtime(src_path)):
+        return False
+    return options is None or read_recorded_options(dst_path) == recorded_options(options)
+
+
+def _decompose(src_path, dst_path, options):
+    """ 1枚の画像を分解して保存する """
+    # 簡略化のためグレスケ変換
+    with Image.open(src_path) as img:
+        original = np.asarray(img.convert("L"))
+    # 帯域の間の隙間（巡回以外の境界モード）も決まった値になるよう0で初期化しておく
+    pyramid_shape, _ = fwt.pyramid_layout(original.shape, options['level'],
+            options['wavelet'], options['mode'])
+    packed = fwt.fwt2d_mra_packed(original, options['level'], options['wavelet'],
+            mode=options['mode'], dtype=options['dtype'],
+            out=np.zeros(pyramid_shape, dtype=options['dtype']), backend=options['backend'])
+    # 書き込み途中のファイルを最新と誤認しないよう、一時ファイルから置き換える
+    # （同時に動く別のプロセスと衝突しないようプロセス番号を付ける）
+    tmp_path = f"{dst_path}.{os.getpid()}.tmp"
+    # 出力を置き換える前に古いオプションの記録を消す（途中で止まっても古い記録と食い違わない）
+    if os.path.exists(dst_path + OPTIONS_SUFFIX):
+        os.remove(dst_path + OPTIONS_SUFFIX)
+    try:
+        if options['format'] == 'png':
+            Image.fromarray(fwt.pyramid_image(packed).astype(np.uint8)).save(tmp_path,
+                    format='PNG')
+        elif options['format'] == 'npy':
+            with open(tmp_path, 'wb') as file:
+                np.save(file, packed.data)
+        else:
+            lowest_scale, image_octave = packed.to_mra()
+            fwt_store.save_mra(tmp_path, lowest_scale, image_octave, packed.wavelet,
+                    quantize=options['quantize'])
+        os.replace(tmp_path, dst_path)
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(recorded_options(options), file)
+        os.replace(tmp_path, dst_path + OPTIONS_SUFFIX)
+    finally:
+        # 失敗した場合は書きかけの一時ファイルを残さない
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def decompose_file(task):
+    """ 1枚の画像を分解して保存し、[読み込んだバイト数, エラー(成功ならNone)]を返す
+    （プロセスプールから呼ぶ 1枚の失敗で他の画像の処理を止めないよう、エラーは返り値で伝える） """
+    src_path, dst_path, options = task
+    try:
+        _decompose(src_path, dst_path, options)
+    except (OSError, ValueError) as exc:
+        # 読めない画像（PIL.UnidentifiedImageErrorはOSError）・存在しないファイルなど
+        return [0, f"{type(exc).__name__}: {exc}"]
+    return [os.path.getsize(src_path), None]
+
+
+def report(tasks, results, skipped, elapsed):
+    """ 失敗した入力と処理速度を表示し、終了コード（失敗があれば1）を返す """
+    failures = [(task[0], error) for task, (_, error) in zip(tasks, results) if error is not None]
+    for src_path, error in failures:
+        print(f"{src_path}: {error}", file=sys.stderr)
+    processed = len(tasks) - len(failures)
+    size = sum(size for size, _ in results)
+    failed = f", {len(failures)} failed" if failures else ''
+    print(f"processed {processed} images ({skipped} up to date{failed}) in {elapsed:.2f} s: "
+            f"{processed / elapsed:.1f} images/s, {size / elapsed / 1e6:.2f} MB/s")
+    return 1 if failures else 0
+
+
+def build_parser():
+    """ コマンドライン引数の定義 """
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('inputs', nargs='+', help="input images, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', default='.', help="output directory")
+    parser.add_argument('-w', '--wavelet', default='haar', choices=fwt.wavelet_names(),
+            help="wavelet name")
+    parser.add_argument('-l', '--level', type=int, default=2, help="decomposition level")
+    parser.add_argument('-m', '--mode', default='periodic', choices=fwt.BOUNDARY_MODES,
+            help="boundary mode")
+    parser.add_argument('-f', '--format', default='png', choices=sorted(OUTPUT_SUFFIXES),
+            help="output format")
+    parser.add_argument('-q', '--quantize', default=None,
+            choices=sorted(fwt_store.QUANTIZE_DTYPES),
+            help="quantization of the coefficient file (fwc format only)")
+    parser.add_argument('--dtype', default='float64', choices=['float64', 'float32'],
+            help="computation dtype")
+    parser.add_argument('--backend', default=None, choices=fwt_backend.BACKENDS,
+            help=f"compute backend (default: ${fwt_backend.BACKEND_ENV} or "
+            f"{fwt_backend.DEFAULT_BACKEND})")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+            help="number of worker processes")
+    parser.add_argument('--chunksize', type=int, default=None,
+            help="images per task dispatched to a worker")
+    parser.add_argument('--force', action='store_true', help="overwrite up-to-date outputs")
+    return parser
+
+
+def main(argv=None):
+    """ コマンドラインのエントリポイント """
+    args = build_parser().parse_args(argv)
+    if args.level < 0:
+        print("level must be non-negative", file=sys.stderr)
+        return 2
+    try:
+        backend = fwt_backend.resolve_backend(args.backend)
+    except ImportError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {'wavelet': args.wavelet, 'level': args.level, 'mode': args.mode,
+            'format': args.format, 'dtype': np.dtype(args.dtype), 'quantize': args.quantize,
+            'backend': backend}
+    src_paths = collect_inputs(args.inputs)
+    root = input_root(src_paths)
+    tasks = [(src_path, output_path(src_path, args.output_dir, args.format, root), options)
+            for src_path in src_paths]
+    # 同じ出力先に書く入力があれば、処理を始める前に止める
+    collisions = find_collisions(tasks)
+    if collisions:
+        for dst_path, paths in collisions.items():
+            print(f"{dst_path}: written by {', '.join(paths)}", file=sys.stderr)
+        return 2
+    for dst_dir in {os.path.dirname(dst_path) for _, dst_path, _ in tasks}:
+        os.makedirs(dst_dir or os.curdir, exist_ok=True)
+    skipped = 0
+    if not args.force:
+        pending = [task for task in tasks if not is_up_to_date(*task)]
+        skipped = len(tasks) - len(pending)
+        tasks = pending
+    jobs = max(1, min(args.jobs or 1, len(tasks)))
+    # 1回の受け渡しで複数枚をまとめて送り、プロセス間通信の回数を減らす
+    chunksize = args.chunksize or max(1, len(tasks) // (4 * jobs))
+    start = time.perf_counter()
+    if jobs == 1:
+        results = [decompose_file(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(decompose_file, tasks, chunksize=chunksize))
+    return report(tasks, results, skipped, max(time.perf_counter() - start, 1e-9))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+" 多重解像度解析の係数の閾値処理と疎な形式での圧縮 "
+import numpy as np
+import fwt
+import fwt_store
+
+# 閾値処理の方式
+THRESHOLD_RULES = ('hard', 'soft')
+# 閾値の決め方
+THRESHOLD_ESTIMATORS = ('universal', 'bayes')
+
+
+def _flatten_details(image_octave):
+    """ 全レベルの高域成分を1本のベクトルに連結し、（ベクトル, 各帯域のサイズ）を返す """
+    shapes = [np.shape(subband) for subbands in image_octave for subband in subbands]
+    if not shapes:
+        return np.zeros(0), shapes
+    flat = np.concatenate([np.ravel(subband) for subbands in image_octave
+        for subband in subbands])
+    return flat, shapes
+
+
+def _unflatten_details(flat, shapes, image_octave):
+    """ _flatten_detailsの逆 レベル構成・サイズの記録はimage_octaveから引き継ぐ """
+    bounds = np.cumsum([0] + [int(np.prod(shape)) for shape in shapes])
+    subbands = [flat[start:end].reshape(shape)
+            for start, end, shape in zip(bounds[:-1], bounds[1:], shapes)]
+    out_octave = fwt.ImageOctave(mode=getattr(image_octave, 'mode', 'periodic'),
+            shapes=getattr(image_octave, 'shapes', []))
+    for level in range(len(subbands) // 3):
+        out_octave.append(subbands[3 * level:3 * level + 3])
+    return out_octave
+
+
+def estimate_noise(image_octave):
+    """ 最も細かいレベルの右下(hh)成分の中央絶対値からノイズの標準偏差を推定
+    （分解していない・帯域が空なら推定できないので0） """
+    if len(image_octave) == 0 or np.size(image_octave[-1][2]) == 0:
+        return 0.0
+    return float(np.median(np.abs(image_octave[-1][2]))) / 0.6745
+
+
+def universal_threshold(image_octave, sigma=None):
+    """ 全帯域共通の閾値 sigma * sqrt(2 log N) """
+    if sigma is None:
+        sigma = estimate_noise(image_octave)
+    flat, _ = _flatten_details(image_octave)
+    return sigma * np.sqrt(2 * np.log(max(flat.size, 2)))
+
+
+def bayes_shrink_thresholds(image_octave, sigma=None):
+    """ BayesShrinkによる帯域ごとの閾値 sigma^2 / sigma_x（image_octaveと同じ並び） """
+    if sigma is None:
+        sigma = estimate_noise(image_octave)
+    thresholds = []
+    for subbands in image_octave:
+        level_thresholds = []
+        for subband in subbands:
+            # 信号成分の標準偏差 全てノイズとみなせる帯域は丸ごと0にする
+            signal_var = np.mean(np.square(subband)) - sigma ** 2 if np.size(subband) > 0 else 0
+            if signal_var > 0:
+                level_thresholds.append(sigma ** 2 / np.sqrt(signal_var))
+            else:
+                level_thresholds.append(float(np.max(np.abs(subband), initial=0)))
+        thresholds.append(level_thresholds)
+    return thresholds
+
+
+def _apply_threshold(flat, threshold, rule):
+    """ ベクトルに閾値処理を適用（thresholdは要素ごとでも可） """
+    if rule == 'hard':
+        return np.where(np.abs(flat) > threshold, flat, 0)
+    if rule == 'soft':
+        return np.sign(flat) * np.maximum(np.abs(flat) - threshold, 0)
+    raise ValueError(f"unknown threshold rule: {rule}")
+
+
+def threshold_mra(lowest_scale, image_octave, threshold='universal', rule='hard', sigma=None):
+    """ 高域成分の閾値処理（thresholdは'universal', 'bayes'または数値 低域はそのまま） """
+    flat, shapes = _flatten_details(image_octave)
+    if threshold == 'universal':
+        threshold = universal_threshold(image_octave, sigma)
+    elif threshold == 'bayes':
+        # 帯域ごとの閾値を係数ごとに展開して一括で処理
+        level_thresholds = bayes_shrink_thresholds(image_octave, sigma)
+        threshold = np.repeat(np.ravel(level_thresholds),
+                [int(np.prod(shape)) for shape in shapes])
+    elif isinstance(threshold, str):
+        raise ValueError(f"unknown threshold estimator: {threshold}")
+    return [lowest_scale, _unflatten_details(_apply_threshold(flat, threshold, rule),
+        shapes, image_octave)]
+
+
+def top_k_mra(lowest_scale, image_octave, fraction=None, *, count=None):
+    """ 全レベルの高域成分から絶対値の大きい順に、割合fraction（0以上1以下 1なら全て）
+    または個数countだけ残す（どちらか一方を指定） """
+    if (fraction is None) == (count is None):
+        raise ValueError("give exactly one of fraction and count")
+    flat, shapes = _flatten_details(image_octave)
+    if fraction is not None:
+        if not 0 <= fraction <= 1:
+            raise ValueError(f"fraction must be in [0, 1], got {fraction}")
+        count = int(round(fraction * flat.size))
+    elif count < 0 or count != int(count):
+        raise ValueError(f"count must be a non-negative integer, got {count}")
+    count = min(int(count), flat.size)
+    kept = np.zeros_like(flat)
+    if count > 0:
+        # 全体を整列せず、上位keep個の位置だけ求める
+        index = np.argpartition(np.abs(flat), flat.size - count)[flat.size - count:]
+        kept[index] = flat[index]
+    return [lowest_scale, _unflatten_details(kept, shapes, image_octave)]
+
+
+class SparseMRA:
+    """ 高域成分の非ゼロ係数だけを（位置, 値）で保持した多重解像度解析結果 """
+
+    def __init__(self, lowest_scale, image_octave, scaling_coef, quantize=None):
+        self.wavelet = fwt.get_wavelet(scaling_coef)
+        self.mode = getattr(image_octave, 'mode', 'periodic')
+        self.shapes = list(getattr(image_octave, 'shapes', []))
+        self.lowest_scale = np.asarray(lowest_scale)
+        self.dtype = self.lowest_scale.dtype
+        flat, self.subband_shapes = _flatten_details(image_octave)
+        self.size = flat.size
+        # 各帯域が連結したベクトル上で占める範囲の境界
+        self._bounds = np.cumsum([0] + [int(np.prod(shape)) for shape in self.subband_shapes])
+        # 位置は全高域成分を連結したベクトル上の番号（収まる最小の符号なし整数型）
+        index = np.flatnonzero(flat)
+        self.indices = index.astype(np.min_scalar_type(max(flat.size - 1, 0)))
+        self.quantize = quantize
+        self.values, self.scale = fwt_store.quantize_array(flat[index], quantize)
+
+    @property
+    def nbytes(self):
+        """ 保持している係数のバイト数 """
+        return self.lowest_scale.nbytes + self.indices.nbytes + self.values.nbytes
+
+    @property
+    def dense_nbytes(self):
+        """ 全係数を密に持った場合のバイト数 """
+        return self.lowest_scale.nbytes + self.size * self.dtype.itemsize
+
+    @property
+    def compression_ratio(self):
+        """ 密な形式に対する圧縮率 """
+        return self.dense_nbytes / self.nbytes
+
+    @property
+    def max_level(self):
+        """ 分解レベル数 """
+        return len(self.subband_shapes) // 3
+
+    def _subband(self, number):
+        """ 連結した順でnumber番目の帯域を密な配列に戻す（帯域の大きさの配列だけを確保） """
+        start, end = self._bounds[number], self._bounds[number + 1]
+        # 位置は昇順なので、帯域に含まれる係数は連続した範囲
+        first, last = np.searchsorted(self.indices, [start, end])
+        subband = np.zeros(end - start, dtype=self.dtype)
+        subband[self.indices[first:last] - start] = fwt_store.dequantize_array(
+                self.values[first:last], self.scale, self.dtype)
+        return subband.reshape(self.subband_shapes[number])
+
+    def _level_subbands(self, level):
+        """ 解像度の低い方からlevel番目（0始まり）の高域成分[hl, lh, hh] """
+        return [self._subband(number) for number in range(3 * level, 3 * level + 3)]
+
+    def to_mra(self):
+        """ fwt2d_mraと同じ形式（密な配列）に戻す """
+        image_octave = fwt.ImageOctave([self._level_subbands(level)
+            for level in range(self.max_level)], shapes=self.shapes, mode=self.mode)
+        return [self.lowest_scale, image_octave]
+
+    def reconstruct(self, method='convolve', *, backend=None):
+        """ 画像の再構成（to_mraの結果をifwt2d_mraで再構成するのと同じ）
+        高域成分はレベルごとに密な配列に戻して逆変換し、全レベル分を同時には持たない """
+        shapes = self.shapes if len(self.shapes) == self.max_level else [None] * self.max_level
+        reconstract = self.lowest_scale
+        for level, level_shape in enumerate(shapes):
+            src_hl, src_lh, src_hh = self._level_subbands(level)
+            reconstract = fwt.ifwt2d(reconstract, src_hl, src_lh, src_hh, self.wavelet,
+                    method=method, mode=self.mode, shape=level_shape, dtype=self.dtype,
+                    backend=backend)
+        return reconstract
+
+
+def compress_image(src2d, max_level, scaling_coef, mode='periodic', rule='hard',
+        threshold='universal', keep_fraction=None, quantize=None, *, keep_count=None,
+        backend=None):
+    """ 分解・閾値処理（keep_fraction・keep_countを指定するとtop-k）・疎な形式への変換・再構成を行い、
+    [疎な形式, 再構成画像, {'compression_ratio', 'rmse', 'kept'}]を返す """
+    wavelet = fwt.get_wavelet(scaling_coef)
+    src2d = np.asarray(src2d)
+    lowest_scale, image_octave = fwt.fwt2d_mra(src2d, max_level, wavelet, mode=mode,
+            backend=backend)
+    if keep_fraction is not None or keep_count is not None:
+        lowest_scale, image_octave = top_k_mra(lowest_scale, image_octave, keep_fraction,
+                count=keep_count)
+    else:
+        lowest_scale, image_octave = threshold_mra(lowest_scale, image_octave,
+                threshold=threshold, rule=rule)
+    sparse = SparseMRA(lowest_scale, image_octave, wavelet, quantize=quantize)
+    reconstruct = sparse.reconstruct(backend=backend)
+    report = {'compression_ratio': sparse.compression_ratio,
+            'rmse': float(np.sqrt(np.mean(np.square(src2d - reconstruct)))),
+            'kept': len(sparse.indices)}
+    return [sparse, reconstruct, report]
@@ -0,0 +1,131 @@
+" リフティングによる整数可逆ウェーブレット変換（可逆圧縮向け） "
+import numpy as np
+import fwt
+import fwt_backend
+
+# 整数可逆変換の種類
+# 'haar': 整数ハール変換（S変換）
+# 'legall53': LeGall 5/3（JPEG 2000の可逆変換 境界は対称拡張）
+INTEGER_WAVELETS = ('haar', 'legall53')
+
+
+def work_dtype(dtype):
+    """ 値域が広がっても溢れない演算用の整数型（uint8なら1段広いint16） """
+    dtype = np.dtype(dtype)
+    if dtype.kind not in 'iu':
+        raise ValueError(f"integer lifting needs integer input, got {dtype}")
+    return np.dtype(f'int{min(2 * dtype.itemsize, 8) * 8}')
+
+
+def _check_wavelet(wavelet):
+    """ 変換の種類の確認 """
+    if wavelet not in INTEGER_WAVELETS:
+        raise ValueError(f"unknown integer wavelet: {wavelet}")
+
+
+def _neighbors(src, axis, length):
+    """ 次の要素を並べたもの（末尾は対称拡張で折り返す）をlength個 """
+    extended = np.concatenate([src[fwt_backend.axis_slice(src.ndim, axis, slice(1, None))],
+        src[fwt_backend.axis_slice(src.ndim, axis, slice(-1, None))]], axis=axis)
+    return extended[fwt_backend.axis_slice(src.ndim, axis, slice(0, length))]
+
+
+def _update(decomp_wav, axis, length):
+    """ 更新量 floor((d[n-1] + d[n] + 2) / 4)（両端は対称拡張で折り返す）をlength個 """
+    ndim = decomp_wav.ndim
+    extended = np.concatenate([decomp_wav[fwt_backend.axis_slice(ndim, axis, slice(0, 1))],
+        decomp_wav, decomp_wav[fwt_backend.axis_slice(ndim, axis, slice(-1, None))]], axis=axis)
+    return (extended[fwt_backend.axis_slice(ndim, axis, slice(0, length))]
+            + extended[fwt_backend.axis_slice(ndim, axis, slice(1, length + 1))] + 2) >> 2
+
+
+def lwt1d(src, wavelet='legall53', axis=-1, dtype=None):
+    """ 整数可逆1次元ウェーブレット変換 [低域, 高域]を返す（低域は(N+1)//2個） """
+    _check_wavelet(wavelet)
+    src = np.asarray(src)
+    dtype = work_dtype(src.dtype) if dtype is None else np.dtype(dtype)
+    even = src[fwt_backend.axis_slice(src.ndim, axis, slice(0, None, 2))].astype(dtype)
+    odd = src[fwt_backend.axis_slice(src.ndim, axis, slice(1, None, 2))].astype(dtype)
+    count = odd.shape[axis]
+    if count == 0:
+        return [even, odd]
+    paired = fwt_backend.axis_slice(src.ndim, axis, slice(0, count))
+    if wavelet == 'haar':
+        # d = x[2n+1] - x[2n], s = x[2n] + floor(d / 2)
+        odd -= even[paired]
+        even[paired] += odd >> 1
+        return [even, odd]
+    # 予測: d[n] = x[2n+1] - floor((x[2n] + x[2n+2]) / 2)
+    odd -= (even[paired] + _neighbors(even, axis, count)) >> 1
+    # 更新: s[n] = x[2n] + floor((d[n-1] + d[n] + 2) / 4)
+    even += _update(odd, axis, even.shape[axis])
+    return [even, odd]
+
+
+def ilwt1d(decomp_src, decomp_wav, wavelet='legall53', axis=-1, dtype=None):
+    """ 整数可逆1次元ウェーブレット逆変換（長さは低域・高域の個数の和） """
+    _check_wavelet(wavelet)
+    decomp_src = np.asarray(decomp_src)
+    decomp_wav = np.asarray(decomp_wav)
+    work = np.result_type(decomp_src, decomp_wav)
+    even = decomp_src.astype(work)
+    odd = decomp_wav.astype(work)
+    count = odd.shape[axis]
+    if count > 0:
+        paired = fwt_backend.axis_slice(even.ndim, axis, slice(0, count))
+        if wavelet == 'haar':
+            even[paired] -= odd >> 1
+            odd += even[paired]
+        else:
+            # 順変換の更新・予測を逆の順に取り消す
+            even -= _update(odd, axis, even.shape[axis])
+            odd += (even[paired] + _neighbors(even, axis, count)) >> 1
+    shape = list(even.shape)
+    shape[axis] += count
+    out = np.empty(shape, dtype=work if dtype is None else dtype)
+    out[fwt_backend.axis_slice(out.ndim, axis, slice(0, None, 2))] = even
+    out[fwt_backend.axis_slice(out.ndim, axis, slice(1, None, 2))] = odd
+    return out
+
+
+def lwt2d(src2d, wavelet='legall53', dtype=None):
+    """ 整数可逆2次元ウェーブレット変換 [ll, hl, lh, hh]を返す（行、列の順に変換） """
+    src2d = np.asarray(src2d)
+    dtype = work_dtype(src2d.dtype) if dtype is None else np.dtype(dtype)
+    src2d_l, src2d_h = lwt1d(src2d, wavelet, axis=1, dtype=dtype)
+    return lwt1d(src2d_l, wavelet, axis=0, dtype=dtype) \
+            + lwt1d(src2d_h, wavelet, axis=0, dtype=dtype)
+
+
+def ilwt2d(src2d_ll, src2d_hl, src2d_lh, src2d_hh, wavelet='legall53', dtype=None):
+    """ 整数可逆2次元ウェーブレット逆変換 """
+    src2d_l = ilwt1d(src2d_ll, src2d_hl, wavelet, axis=0)
+    src2d_h = ilwt1d(src2d_lh, src2d_hh, wavelet, axis=0)
+    return ilwt1d(src2d_l, src2d_h, wavelet, axis=1, dtype=dtype)
+
+
+def lwt2d_mra(src2d, max_level, wavelet='legall53', dtype=None):
+    """ 整数可逆変換による多重解像度解析（fwt2d_mraと同じ[低域, 高域のリスト]を返す）
+    全レベルを通して入力より1段広い整数型（uint8ならint16）で計算・保持する """
+    src2d = np.asarray(src2d)
+    dtype = work_dtype(src2d.dtype) if dtype is None else np.dtype(dtype)
+    image_octave = fwt.ImageOctave(mode='symmetric' if wavelet == 'legall53' else 'periodic')
+    out_ll = src2d
+    for _ in range(max_level):
+        shape = out_ll.shape
+        out_ll, out_hl, out_lh, out_hh = lwt2d(out_ll, wavelet, dtype=dtype)
+        image_octave.insert(0, [out_hl, out_lh, out_hh])
+        image_octave.shapes.insert(0, shape)
+    return [out_ll, image_octave]
+
+
+def ilwt2d_mra(lowest_scale, image_octave, wavelet='legall53', dtype=None):
+    """ 整数可逆変換による多重解像度再構成（dtypeに元の型を与えるとその型で返す） """
+    reconstract = lowest_scale
+    for level, (src_hl, src_lh, src_hh) in enumerate(image_octave):
+        # 途中のレベルは計算用の型のまま
+        level_dtype = dtype if level == len(image_octave) - 1 else None
+        reconstract = ilwt2d(reconstract, src_hl, src_lh, src_hh, wavelet, dtype=level_dtype)
+    if dtype is not None:
+        reconstract = reconstract.astype(dtype, copy=False)
+    return reconstract
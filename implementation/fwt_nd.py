@@ -0,0 +1,96 @@
+" N次元の高速ウェーブレット変換（ボリューム・動画向け） "
+import itertools
+import numpy as np
+import fwt
+
+
+def _normalize_axes(ndim, axes):
+    """ 変換する軸（負の番号も可 Noneなら全ての軸）を0以上の番号のタプルにする """
+    axes = tuple(range(ndim)) if axes is None else tuple(axis % ndim for axis in axes)
+    if len(set(axes)) != len(axes):
+        raise ValueError(f"axes must be unique: {axes}")
+    return axes
+
+
+def fwtnd(src, scaling_coef, axes=None, method='convolve', mode='periodic', dtype=np.float64,
+        *, backend=None):
+    """ N次元高速ウェーブレット変換（axesの順に各軸をまとめて変換）
+    帯域はaxesの各軸の低域'a'・高域'd'を並べた文字列をキーとする辞書で返す
+    （2次元でaxes=(0, 1)なら'aa'がfwt2dのll、'da'がhl、'ad'がlh、'dd'がhh） """
+    wavelet = fwt.get_wavelet(scaling_coef)
+    src = np.asarray(src)
+    axes = _normalize_axes(src.ndim, axes)
+    subbands = {'': src}
+    for axis in axes:
+        next_subbands = {}
+        for key, subband in subbands.items():
+            next_subbands[key + 'a'], next_subbands[key + 'd'] = fwt.fwt1d(subband, wavelet,
+                    axis=axis, method=method, mode=mode, dtype=dtype, backend=backend)
+        subbands = next_subbands
+    return subbands
+
+
+def ifwtnd(subbands, scaling_coef, axes=None, method='convolve', mode='periodic', shape=None,
+        dtype=np.float64, *, backend=None):
+    """ N次元高速ウェーブレット逆変換（shapeを指定すると元のサイズに切り出す） """
+    wavelet = fwt.get_wavelet(scaling_coef)
+    ndim = np.ndim(next(iter(subbands.values())))
+    axes = _normalize_axes(ndim, axes)
+    if set(subbands) != {''.join(key) for key in itertools.product('ad', repeat=len(axes))}:
+        raise ValueError(f"subbands must have every 'a'/'d' key of length {len(axes)}")
+    # 最後に変換した軸から順に、低域・高域の組を合成
+    for depth in range(len(axes) - 1, -1, -1):
+        axis = axes[depth]
+        length = None if shape is None else shape[axis]
+        subbands = {key[:depth]: fwt.ifwt1d(subbands[key[:depth] + 'a'],
+            subbands[key[:depth] + 'd'], wavelet, axis=axis, method=method, mode=mode,
+            length=length, dtype=dtype, backend=backend)
+            for key in subbands if key[depth] == 'a'}
+    return subbands['']
+
+
+class NdOctave(fwt.ImageOctave):
+    """ N次元の多重解像度解析の高域成分リスト（各レベルで変換した軸も記録） """
+
+    def __init__(self, subbands=(), shapes=(), axes=(), mode='periodic'):
+        super().__init__(subbands, shapes, mode)
+        # axes[i]はself[i]のキーの各文字に対応する軸
+        self.axes = list(axes)
+
+
+def fwtnd_mra(src, max_level, scaling_coef, axes=None, method='convolve', mode='periodic',
+        dtype=np.float64, *, backend=None):
+    """ N次元高速ウェーブレット変換による多重解像度解析
+    max_levelを軸ごとに与えると、レベル数に達した軸は以降変換しない
+    [最も解像度の低い低域, 高域の辞書のリスト(解像度の低い順)]を返す """
+    wavelet = fwt.get_wavelet(scaling_coef)
+    src = np.asarray(src)
+    axes = _normalize_axes(src.ndim, axes)
+    levels = [max_level] * len(axes) if np.ndim(max_level) == 0 else list(max_level)
+    if len(levels) != len(axes):
+        raise ValueError(f"max_level must be an integer or have one entry per axis {axes}")
+    octave = NdOctave(mode=mode)
+    lowest_scale = src
+    for level in range(1, max(levels, default=0) + 1):
+        level_axes = tuple(axis for axis, axis_level in zip(axes, levels) if axis_level >= level)
+        subbands = fwtnd(lowest_scale, wavelet, level_axes, method=method, mode=mode,
+                dtype=dtype, backend=backend)
+        octave.shapes.insert(0, lowest_scale.shape)
+        octave.axes.insert(0, level_axes)
+        lowest_scale = subbands.pop('a' * len(level_axes))
+        octave.insert(0, subbands)
+    return [lowest_scale, octave]
+
+
+def ifwtnd_mra(lowest_scale, octave, scaling_coef, method='convolve', mode=None,
+        dtype=np.float64, *, backend=None):
+    """ N次元高速ウェーブレット逆変換による多重解像度再構成 """
+    wavelet = fwt.get_wavelet(scaling_coef)
+    if mode is None:
+        mode = octave.mode
+    reconstract = lowest_scale
+    for subbands, level_shape, level_axes in zip(octave, octave.shapes, octave.axes):
+        reconstract = ifwtnd(dict(subbands, **{'a' * len(level_axes): reconstract}),
+                wavelet, level_axes, method=method, mode=mode, shape=level_shape, dtype=dtype,
+                backend=backend)
+    return reconstract
@@ -0,0 +1,78 @@
+" 高速ウェーブレット変換の区間ごとの計測（時間・確保量・配列サイズ） "
+import json
+import os
+import threading
+import tracemalloc
+import fwt
+
+
+class Profiler:
+    """ with Profiler() as profiler: の中で実行した変換の各区間を記録する
+    trace_memory=Trueならtracemallocで区間ごとのメモリの増減も記録する """
+
+    def __init__(self, trace_memory=False):
+        self.records = []
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def _record(self, record):
+        """ 区間の記録を受け取る（fwtのフックから呼ばれる） """
+        with self._lock:
+            self.records.append(dict(record))
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        fwt.add_stage_hook(self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        fwt.remove_stage_hook(self._record)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def summary(self):
+        """ 区間名・レベルごとの回数・合計時間・出力バイト数・入力サイズ """
+        summary = {}
+        for record in self.records:
+            key = (record['name'], record['level'])
+            entry = summary.setdefault(key, {'name': record['name'], 'level': record['level'],
+                'count': 0, 'total_s': 0.0, 'nbytes': 0, 'shapes': []})
+            entry['count'] += 1
+            entry['total_s'] += record['duration']
+            entry['nbytes'] += record['nbytes']
+            if record['shape'] is not None and list(record['shape']) not in entry['shapes']:
+                entry['shapes'].append(list(record['shape']))
+            if 'traced_bytes' in record:
+                entry['traced_bytes'] = entry.get('traced_bytes', 0) + record['traced_bytes']
+        return sorted(summary.values(),
+                key=lambda entry: (entry['name'], -1 if entry['level'] is None else entry['level']))
+
+    def to_dict(self):
+        """ 全記録と集計を辞書で返す（json.dumpでそのまま保存できる） """
+        records = [dict(record, shape=None if record['shape'] is None else list(record['shape']))
+                for record in self.records]
+        return {'records': records, 'summary': self.summary()}
+
+    def to_chrome_trace(self):
+        """ Chromeのトレース形式（chrome://tracing, Perfettoで表示できる） """
+        origin = min((record['start'] for record in self.records), default=0.0)
+        events = []
+        for record in self.records:
+            args = {'level': record['level'], 'nbytes': record['nbytes'],
+                    'shape': None if record['shape'] is None else list(record['shape'])}
+            if 'traced_bytes' in record:
+                args['traced_bytes'] = record['traced_bytes']
+            events.append({'name': record['name'], 'cat': 'fwt', 'ph': 'X',
+                'ts': 1e6 * (record['start'] - origin), 'dur': 1e6 * record['duration'],
+                'pid': os.getpid(), 'tid': record['thread'], 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        """ Chromeのトレース形式でファイルに保存 """
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_chrome_trace(), file)
@@ -0,0 +1,175 @@
+" 多重解像度解析の係数の保存・読み込み（メモリマップで帯域単位に参照） "
+import json
+import numpy as np
+import fwt
+
+# ファイル先頭の識別子
+MAGIC = b'FWTCOEF\0'
+FORMAT_VERSION = 1
+# 各帯域の先頭位置の揃え（バイト）
+BLOCK_ALIGNMENT = 64
+# 保存時の量子化方式
+QUANTIZE_DTYPES = {'float16': np.float16, 'int8': np.int8, 'int16': np.int16}
+
+
+def _align(offset, alignment=BLOCK_ALIGNMENT):
+    """ offset以上で最小のalignmentの倍数 """
+    return -(-offset // alignment) * alignment
+
+
+def quantize_array(array, quantize):
+    """ 配列を保存用の型に変換し、（変換後の配列, スケール）を返す """
+    array = np.asarray(array)
+    if quantize is None:
+        return array, None
+    if quantize not in QUANTIZE_DTYPES:
+        raise ValueError(f"unknown quantization: {quantize}")
+    qdtype = QUANTIZE_DTYPES[quantize]
+    if quantize == 'float16':
+        return array.astype(qdtype), None
+    # 整数は最大振幅が型の最大値になるよう線形量子化
+    maxabs = float(np.max(np.abs(array))) if array.size > 0 else 0.0
+    scale = maxabs / np.iinfo(qdtype).max if maxabs > 0 else 1.0
+    return np.round(array / scale).astype(qdtype), scale
+
+
+def dequantize_array(array, scale, dtype=np.float64):
+    """ quantize_arrayで変換した配列を元の型に戻す """
+    if scale is None:
+        return array.astype(dtype)
+    return (array * scale).astype(dtype)
+
+
+def _wavelet_header(wavelet):
+    """ ヘッダに記録するウェーブレットの情報 """
+    name = wavelet.name if wavelet.name in fwt.wavelet_names() else None
+    return {'name': name, 'scaling_coef': [float(coef) for coef in wavelet.scaling_coef]}
+
+
+def save_mra(path, lowest_scale, image_octave, scaling_coef, mode=None, shape=None,
+        quantize=None):
+    """ fwt2d_mraの結果をファイルに保存（帯域はレベルの低い順に整列した連続領域に置く） """
+    if quantize is not None and quantize not in QUANTIZE_DTYPES:
+        raise ValueError(f"unknown quantization: {quantize}")
+    wavelet = fwt.get_wavelet(scaling_coef)
+    max_level = len(image_octave)
+    if mode is None:
+        mode = getattr(image_octave, 'mode', 'periodic')
+    # 元画像のサイズは指定がなければ解析時の記録を使う
+    if shape is None:
+        shapes = getattr(image_octave, 'shapes', [])
+        if 0 < max_level == len(shapes):
+            shape = shapes[-1]
+        else:
+            shape = np.shape(lowest_scale) if max_level == 0 \
+                    else tuple(2 * length for length in np.shape(image_octave[-1][0]))
+    # 保存する帯域（解像度の低い順 levelは1が最も細かい）
+    blocks = [(max_level, 'll', lowest_scale)]
+    for depth, subbands in zip(range(max_level, 0, -1), image_octave):
+        blocks.extend((depth, band, subband)
+                for band, subband in zip(fwt.PACKED_ORIENTATIONS, subbands))
+    table = []
+    arrays = []
+    offset = 0
+    for depth, band, subband in blocks:
+        stored, scale = quantize_array(subband, quantize)
+        stored = np.ascontiguousarray(stored, dtype=stored.dtype.newbyteorder('<'))
+        offset = _align(offset)
+        table.append({'level': depth, 'orientation': band, 'shape': list(stored.shape),
+            'dtype': stored.dtype.str, 'offset': offset, 'scale': scale})
+        arrays.append(stored)
+        offset += stored.nbytes
+    header = {'version': FORMAT_VERSION, 'wavelet': _wavelet_header(wavelet),
+            'max_level': max_level, 'shape': [int(length) for length in shape],
+            'dtype': np.dtype(np.asarray(lowest_scale).dtype).str, 'mode': mode,
+            'quantize': quantize, 'subbands': table}
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_offset = _align(len(MAGIC) + 8 + len(header_bytes))
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(np.array(data_offset, dtype='<u8').tobytes())
+        file.write(header_bytes)
+        for entry, stored in zip(table, arrays):
+            file.seek(data_offset + entry['offset'])
+            stored.tofile(file)
+        # 末尾の帯域が空でもファイル長が揃うように伸ばす
+        file.truncate(data_offset + offset)
+
+
+class CoefficientFile:
+    """ save_mraで保存したファイル（帯域はメモリマップのビューとして参照） """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"not a coefficient file: {path}")
+            data_offset = int(np.frombuffer(file.read(8), dtype='<u8')[0])
+            header = json.loads(file.read(data_offset - len(MAGIC) - 8).rstrip(b'\0'))
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f"unsupported format version: {header['version']}")
+        self.header = header
+        self.path = path
+        wavelet = header['wavelet']
+        # 名前は読み込む側で未登録のこともあるので係数から引く（登録済みなら同じWavelet）
+        self.wavelet = fwt.get_wavelet(wavelet['scaling_coef'])
+        self.max_level = header['max_level']
+        self.shape = tuple(header['shape'])
+        self.mode = header['mode']
+        self.dtype = np.dtype(header['dtype'])
+        self.quantize = header['quantize']
+        # ファイル全体をマップしておき、帯域はその一部のビューとして返す
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+        self._data_offset = data_offset
+        self._entries = {(entry['level'], entry['orientation']): entry
+                for entry in header['subbands']}
+
+    def _entry(self, level, orientation):
+        """ 帯域の記録を探す """
+        if not 1 <= level <= self.max_level:
+            raise ValueError(f"level must be in [1, {self.max_level}]")
+        if orientation == 'll' and level != self.max_level:
+            raise ValueError("'ll' subband is stored only for the deepest level")
+        if orientation != 'll' and orientation not in fwt.PACKED_ORIENTATIONS:
+            raise ValueError(f"unknown orientation: {orientation}")
+        return self._entries[(level, orientation)]
+
+    def _view(self, entry):
+        """ 記録された位置の配列ビュー（保存された型のまま） """
+        return np.ndarray(tuple(entry['shape']), dtype=np.dtype(entry['dtype']),
+                buffer=self._map, offset=self._data_offset + entry['offset'])
+
+    def _decode(self, entry):
+        """ 量子化された帯域を元の型に戻す（量子化なしならビューのまま） """
+        raw = self._view(entry)
+        if self.quantize is None:
+            return raw
+        return dequantize_array(raw, entry['scale'], self.dtype)
+
+    def raw_subband(self, level, orientation):
+        """ 保存された型のままの帯域（メモリマップのビュー） """
+        return self._view(self._entry(level, orientation))
+
+    def subband(self, level, orientation):
+        """ 帯域（levelは1が最も細かく、'll'は最深レベルのみ） 量子化なしならビュー """
+        return self._decode(self._entry(level, orientation))
+
+    def lowest(self):
+        """ 最も解像度の低い低域/低域成分 """
+        return self._decode(self._entries[(self.max_level, 'll')])
+
+    def level(self, level):
+        """ 1レベル分の高域成分[hl, lh, hh] """
+        return [self.subband(level, orientation) for orientation in fwt.PACKED_ORIENTATIONS]
+
+    def to_mra(self):
+        """ fwt2d_mraと同じ形式に変換（ifwt2d_mraでそのまま再構成できる） """
+        image_octave = fwt.ImageOctave(mode=self.mode,
+                shapes=fwt.mra_shapes(self.shape, self.max_level, self.wavelet, self.mode))
+        for level in range(self.max_level, 0, -1):
+            image_octave.append(self.level(level))
+        return [self.lowest(), image_octave]
+
+
+def load_mra(path):
+    """ save_mraで保存したファイルをメモリマップで開く """
+    return CoefficientFile(path)
@@ -0,0 +1,249 @@
+" 高速ウェーブレット変換の逐次処理（長さの決まっていない信号向け） "
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import fwt
+
+
+class _AnalysisLevel:
+    """ 1レベル分の逐次ウェーブレット変換 """
+
+    def __init__(self, wavelet, mode, dtype):
+        self.wavelet = wavelet
+        self.mode = mode
+        self.dtype = np.dtype(dtype)
+        filters = wavelet.filters(self.dtype)
+        # 窓(長さL)に掛けて低域・高域を同時に求める行列
+        self.bank = np.stack([filters['scaling'], filters['wavelet']], axis=1)
+        # 先頭の拡張長（巡回以外）
+        self.head_len = 0 if mode == 'periodic' else len(wavelet) - 2
+        # 受け取った入力の総数
+        self.length = 0
+        # 未処理の（拡張後の座標での）入力と、その先頭位置
+        self.buffer = np.zeros(0, dtype=self.dtype)
+        self.base = 0
+        # 次に出力する係数の番号
+        self.next_coef = 0
+        # 巡回境界の末尾で使う先頭のサンプル
+        self.head = np.zeros(0, dtype=self.dtype)
+        # 巡回以外の末尾の拡張に使う直近のサンプル
+        self.recent = np.zeros(0, dtype=self.dtype)
+        # フィルタ長に達するまでは拡張せず溜めておく
+        self.started = False
+
+    def _emit(self, count):
+        """ バッファ先頭からcount個の係数を計算しバッファを進める """
+        if count <= 0:
+            return np.zeros((0, 2), dtype=self.dtype)
+        windows = sliding_window_view(self.buffer, len(self.wavelet))[0:2 * count:2]
+        decomp = (windows @ self.bank).astype(self.dtype, copy=False)
+        self.buffer = self.buffer[2 * count:]
+        self.base += 2 * count
+        self.next_coef += count
+        return decomp
+
+    def _ready_count(self):
+        """ 現在の入力だけで確定する係数の数 """
+        available = self.base + len(self.buffer)
+        return max(0, (available - len(self.wavelet)) // 2 + 1 - self.next_coef)
+
+    def process(self, chunk):
+        """ 入力を追加し、確定した係数を返す """
+        chunk = np.asarray(chunk).astype(self.dtype, copy=False).ravel()
+        filter_len = len(self.wavelet)
+        self.length += len(chunk)
+        self.recent = np.concatenate([self.recent, chunk])[-filter_len:]
+        if len(self.head) < filter_len - 2:
+            self.head = np.concatenate([self.head, chunk[:filter_len - 2 - len(self.head)]])
+        self.buffer = np.concatenate([self.buffer, chunk])
+        if not self.started:
+            if self.length < filter_len:
+                return np.zeros((0, 2), dtype=self.dtype)
+            # 先頭を境界モードに従い拡張（ここで初めて係数の計算を始める）
+            self.started = True
+            if self.head_len > 0:
+                pad_mode = 'symmetric' if self.mode == 'symmetric' else 'constant'
+                head = np.pad(self.buffer[:self.head_len], (self.head_len, 0), mode=pad_mode)
+                self.buffer = np.concatenate([head[:self.head_len], self.buffer])
+        return self._emit(self._ready_count())
+
+    def flush(self):
+        """ 入力の終端を確定させ、残りの係数を返す """
+        if not self.started:
+            # フィルタ長より短い信号は一括変換
+            self.started = True
+            if self.length == 0:
+                return np.zeros((0, 2), dtype=self.dtype)
+            decomp = fwt.fwt1d(self.buffer, self.wavelet, method='polyphase',
+                    mode=self.mode, dtype=self.dtype)
+            self.buffer = np.zeros(0, dtype=self.dtype)
+            return np.stack(decomp, axis=1)
+        total = fwt.coef_length(self.length, self.wavelet, self.mode)
+        if self.mode == 'periodic':
+            # 奇数長は末尾を複製、その後は先頭のサンプルで巡回
+            tail = self.recent[-1:] if self.length % 2 else np.zeros(0, dtype=self.dtype)
+            extended_len = self.length + len(tail)
+            wrap_len = 2 * total + len(self.wavelet) - 2 - extended_len
+            wrap = self.head[np.arange(wrap_len) % extended_len] if wrap_len > 0 else self.head[:0]
+            self.buffer = np.concatenate([self.buffer, tail, wrap])
+        else:
+            # 末尾を境界モードに従い拡張
+            tail_len = len(self.wavelet) - 2 + self.length % 2
+            pad_mode = 'symmetric' if self.mode == 'symmetric' else 'constant'
+            tail = np.pad(self.recent, (0, tail_len), mode=pad_mode)[len(self.recent):]
+            self.buffer = np.concatenate([self.buffer, tail])
+        return self._emit(total - self.next_coef)
+
+
+class StreamAnalyzer:
+    """ 逐次入力に対する多重解像度1次元高速ウェーブレット変換
+    既定の境界モードはStreamSynthesizerと同じ'symmetric'（巡回境界は逆変換を逐次にできないため） """
+
+    def __init__(self, scaling_coef, max_level=1, mode='symmetric', dtype=np.float64):
+        if mode not in fwt.BOUNDARY_MODES:
+            raise ValueError(f"unknown boundary mode: {mode}")
+        wavelet = fwt.get_wavelet(scaling_coef)
+        self.max_level = max_level
+        self.levels = [_AnalysisLevel(wavelet, mode, dtype) for _ in range(max_level)]
+
+    @property
+    def length(self):
+        """ これまでに受け取った入力の総数 """
+        return self.levels[0].length if self.levels else 0
+
+    def _cascade(self, step, chunk):
+        """ 各レベルに低域を順に流し、[最深の低域, 高域のリスト(解像度の低い順)]を返す """
+        octave = []
+        decomp_src = chunk
+        for level in self.levels:
+            decomp = step(level, decomp_src)
+            decomp_src = decomp[:, 0]
+            octave.insert(0, decomp[:, 1])
+        return [decomp_src, octave]
+
+    def process(self, chunk):
+        """ 入力を追加し、各レベルで確定した係数を返す """
+        return self._cascade(lambda level, src: level.process(src), chunk)
+
+    def flush(self):
+        """ 入力の終端を確定させ、各レベルの残りの係数を返す """
+        def step(level, src):
+            decomp = level.process(src)
+            return np.concatenate([decomp, level.flush()])
+        return self._cascade(step, np.zeros(0))
+
+
+class _SynthesisLevel:
+    """ 1レベル分の逐次ウェーブレット逆変換 """
+
+    def __init__(self, wavelet, mode, dtype):
+        self.wavelet = wavelet
+        self.mode = mode
+        self.dtype = np.dtype(dtype)
+        filters = wavelet.filters(self.dtype)
+        # 係数の窓(長さL/2)に掛けて偶数・奇数番目の出力を求める行列
+        self.bank = np.stack([
+            np.concatenate([filters['scaling_phases_rev'][0], filters['wavelet_phases_rev'][0]]),
+            np.concatenate([filters['scaling_phases_rev'][1], filters['wavelet_phases_rev'][1]]),
+        ], axis=1)
+        # 過去の係数（ストリーム開始前は0）
+        self.history = np.zeros((wavelet.shift - 1, 2), dtype=self.dtype)
+        # 未対応の低域・高域の係数
+        self.pending = [np.zeros(0, dtype=self.dtype), np.zeros(0, dtype=self.dtype)]
+        # 出力の先頭で捨てる拡張分と、終端が決まるまで保留する出力
+        self.skip = 0 if mode == 'periodic' else len(wavelet) - 2
+        self.held = np.zeros(0, dtype=self.dtype)
+        self.coef_count = 0
+
+    def _synthesize(self):
+        """ 低域・高域が揃った係数から確定する出力を計算 """
+        count = min(len(self.pending[0]), len(self.pending[1]))
+        if count == 0:
+            return np.zeros(0, dtype=self.dtype)
+        decomp = np.stack([self.pending[0][:count], self.pending[1][:count]], axis=1)
+        self.pending = [self.pending[0][count:], self.pending[1][count:]]
+        coefs = np.concatenate([self.history, decomp])
+        self.history = coefs[len(coefs) - len(self.history):]
+        self.coef_count += count
+        # windows[m] = [低域[m-L/2+1..m], 高域[m-L/2+1..m]]
+        windows = sliding_window_view(coefs, self.wavelet.shift, axis=0)
+        windows = windows.reshape((len(windows), -1), order='C')
+        out = (windows @ self.bank).astype(self.dtype, copy=False).ravel()
+        # 先頭の拡張分を捨てる
+        drop = min(self.skip, len(out))
+        self.skip -= drop
+        return out[drop:]
+
+    def process(self, decomp_src, decomp_wav):
+        """ 係数を追加し、確定した出力を返す（終端の1サンプルは保留） """
+        self.pending[0] = np.concatenate([self.pending[0],
+            np.asarray(decomp_src).astype(self.dtype, copy=False).ravel()])
+        self.pending[1] = np.concatenate([self.pending[1],
+            np.asarray(decomp_wav).astype(self.dtype, copy=False).ravel()])
+        out = np.concatenate([self.held, self._synthesize()])
+        # 奇数長の信号では最後の1サンプルが捨てられるため、終端が決まるまで出さない
+        self.held = out[-1:]
+        return out[:-1]
+
+    def flush(self, length):
+        """ 元の信号長を与えて残りの出力を返す """
+        out = np.concatenate([self.held, self._synthesize()])
+        self.held = out[:0]
+        # これまでに出力した数（保留の1サンプルを除く）
+        produced = 2 * self.coef_count - (len(self.wavelet) - 2 if self.mode != 'periodic' else 0)
+        emitted = produced - len(out)
+        return out[:max(0, length - emitted)]
+
+
+class StreamSynthesizer:
+    """ 逐次入力される係数からの多重解像度1次元高速ウェーブレット逆変換 """
+
+    def __init__(self, scaling_coef, max_level=1, mode='symmetric', dtype=np.float64):
+        if mode not in fwt.BOUNDARY_MODES:
+            raise ValueError(f"unknown boundary mode: {mode}")
+        wavelet = fwt.get_wavelet(scaling_coef)
+        if mode == 'periodic' and len(wavelet) > 2:
+            # 先頭の出力が末尾の係数に依存するため逐次には出せない
+            raise ValueError("periodic synthesis needs the end of the stream; "
+                    "use 'symmetric' or 'zero' mode")
+        self.wavelet = wavelet
+        self.mode = mode
+        self.max_level = max_level
+        # levels[0]が最も解像度の低いレベル
+        self.levels = [_SynthesisLevel(wavelet, mode, dtype) for _ in range(max_level)]
+
+    def process(self, lowest_scale, octave):
+        """ 最深の低域と各レベルの高域（解像度の低い順）を追加し、確定した出力を返す """
+        reconstract = lowest_scale
+        for level, decomp_wav in zip(self.levels, octave):
+            reconstract = level.process(reconstract, decomp_wav)
+        return reconstract
+
+    def flush(self, length):
+        """ 元の信号長を与えて残りの出力を返す """
+        # 各レベルの信号長（解像度の低い順）
+        lengths = []
+        for _ in range(self.max_level):
+            lengths.insert(0, length)
+            length = fwt.coef_length(length, self.wavelet, self.mode)
+        reconstract = np.zeros(0)
+        for level, level_length in zip(self.levels, lengths):
+            reconstract = np.concatenate([level.process(reconstract, np.zeros(0)),
+                level.flush(level_length)])
+        return reconstract
+
+
+def stream_fwt1d(chunks, scaling_coef, max_level=1, mode='symmetric', dtype=np.float64):
+    """ 入力チャンクごとに確定した係数を返すジェネレータ（最後にflush分を返す） """
+    analyzer = StreamAnalyzer(scaling_coef, max_level, mode, dtype)
+    for chunk in chunks:
+        yield analyzer.process(chunk)
+    yield analyzer.flush()
+
+
+def stream_ifwt1d(coef_chunks, scaling_coef, length, max_level=1, mode='symmetric',
+        dtype=np.float64):
+    """ 係数チャンク([低域, 高域のリスト])ごとに確定した出力を返すジェネレータ """
+    synthesizer = StreamSynthesizer(scaling_coef, max_level, mode, dtype)
+    for lowest_scale, octave in coef_chunks:
+        yield synthesizer.process(lowest_scale, octave)
+    yield synthesizer.flush(length)
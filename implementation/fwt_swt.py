@@ -0,0 +1,88 @@
+" 定常（間引きなし、à trous）ウェーブレット変換（平行移動に不変な解析向け） "
+import numpy as np
+import fwt
+import fwt_backend
+
+
+def iter_swt1d(src, max_level, scaling_coef, axis=-1, dtype=np.float64, *, backend=None):
+    """ 1次元定常ウェーブレット変換を1レベルずつ行い、(レベル, 低域, 高域)を細かい順に返す
+    前のレベルの低域は保持しないので、レベルごとに処理すれば全レベル分のメモリは要らない
+    backendはfwt1dと同じ（'scipy'と'numpy'はどちらもNumPyの足し込み） """
+    backend = fwt_backend.resolve_backend(backend)
+    wavelet = fwt.get_wavelet(scaling_coef)
+    filters = wavelet.filters(dtype)
+    decomp_src = np.asarray(src).astype(dtype, copy=False)
+    for level in range(1, max_level + 1):
+        # レベルlではフィルタ係数の間隔を2^(l-1)に広げる
+        decomp_src, decomp_wav = fwt_backend.atrous(decomp_src, filters, 2 ** (level - 1), axis,
+                backend)
+        yield level, decomp_src, decomp_wav
+
+
+def swt1d(src, max_level, scaling_coef, axis=-1, dtype=np.float64, *, backend=None):
+    """ 1次元定常ウェーブレット変換（fwt1d_mraと同じ[低域, 高域のリスト]を返す）
+    全ての係数は入力と同じ長さで、周期境界なら任意の長さを扱える """
+    octave = []
+    decomp_src = np.asarray(src).astype(dtype, copy=False)
+    for _, decomp_src, decomp_wav in iter_swt1d(src, max_level, scaling_coef, axis, dtype,
+            backend=backend):
+        # 先頭に一番解像度の低い情報が来るように、先頭に追記
+        octave.insert(0, decomp_wav)
+    return [decomp_src, octave]
+
+
+def iswt1d(lowest_scale, octave, scaling_coef, axis=-1, dtype=np.float64, *, backend=None):
+    """ 1次元定常ウェーブレット逆変換 """
+    backend = fwt_backend.resolve_backend(backend)
+    wavelet = fwt.get_wavelet(scaling_coef)
+    filters = wavelet.filters(dtype)
+    reconstract = np.asarray(lowest_scale).astype(dtype, copy=False)
+    for level, decomp_wav in zip(range(len(octave), 0, -1), octave):
+        reconstract = fwt_backend.iatrous(reconstract,
+                np.asarray(decomp_wav).astype(dtype, copy=False), filters, 2 ** (level - 1), axis,
+                backend)
+    return reconstract
+
+
+def iter_swt2d(src2d, max_level, scaling_coef, dtype=np.float64, *, backend=None):
+    """ 2次元定常ウェーブレット変換を1レベルずつ行い、(レベル, ll, [hl, lh, hh])を細かい順に返す """
+    backend = fwt_backend.resolve_backend(backend)
+    wavelet = fwt.get_wavelet(scaling_coef)
+    filters = wavelet.filters(dtype)
+    out_ll = np.asarray(src2d).astype(dtype, copy=False)
+    for level in range(1, max_level + 1):
+        step = 2 ** (level - 1)
+        # fwt2dと同じく行、列の順に変換
+        src2d_l, src2d_h = fwt_backend.atrous(out_ll, filters, step, 1, backend)
+        out_ll, out_hl = fwt_backend.atrous(src2d_l, filters, step, 0, backend)
+        del src2d_l
+        out_lh, out_hh = fwt_backend.atrous(src2d_h, filters, step, 0, backend)
+        del src2d_h
+        yield level, out_ll, [out_hl, out_lh, out_hh]
+
+
+def swt2d(src2d, max_level, scaling_coef, dtype=np.float64, *, backend=None):
+    """ 2次元定常ウェーブレット変換（fwt2d_mraと同じ[低域, 高域のリスト]を返す） """
+    image_octave = fwt.ImageOctave(mode='periodic')
+    out_ll = np.asarray(src2d).astype(dtype, copy=False)
+    for _, out_ll, subbands in iter_swt2d(src2d, max_level, scaling_coef, dtype,
+            backend=backend):
+        image_octave.insert(0, subbands)
+        image_octave.shapes.insert(0, out_ll.shape)
+    return [out_ll, image_octave]
+
+
+def iswt2d(lowest_scale, image_octave, scaling_coef, dtype=np.float64, *, backend=None):
+    """ 2次元定常ウェーブレット逆変換 """
+    backend = fwt_backend.resolve_backend(backend)
+    wavelet = fwt.get_wavelet(scaling_coef)
+    filters = wavelet.filters(dtype)
+    reconstract = np.asarray(lowest_scale).astype(dtype, copy=False)
+    for level, subbands in zip(range(len(image_octave), 0, -1), image_octave):
+        step = 2 ** (level - 1)
+        src2d_hl, src2d_lh, src2d_hh = (np.asarray(subband).astype(dtype, copy=False)
+                for subband in subbands)
+        src2d_l = fwt_backend.iatrous(reconstract, src2d_hl, filters, step, 0, backend)
+        src2d_h = fwt_backend.iatrous(src2d_lh, src2d_hh, filters, step, 0, backend)
+        reconstract = fwt_backend.iatrous(src2d_l, src2d_h, filters, step, 1, backend)
+    return reconstract
@@ -0,0 +1,249 @@
+" 高速ウェーブレット変換のタイル処理（メモリに載らない画像向け） "
+import os
+import tempfile
+import numpy as np
+import fwt
+
+
+def open_source(src, shape=None, dtype=None):
+    """ 入力をメモリマップで開く（配列・.npyファイル・生データファイルに対応） """
+    if isinstance(src, np.ndarray):
+        return src
+    if str(src).endswith('.npy'):
+        return np.load(src, mmap_mode='r')
+    if shape is None or dtype is None:
+        raise ValueError("shape and dtype are required for raw input files")
+    return np.memmap(src, dtype=dtype, mode='r', shape=tuple(shape))
+
+
+def _source_indices(positions, length, wavelet, mode):
+    """ 拡張後の座標positionsに対応する入力のインデックス（0埋めの位置は-1） """
+    positions = np.array(positions)
+    if mode == 'periodic':
+        # 奇数長は末尾を複製して偶数長にしてから巡回
+        extended_len = length + length % 2
+        return np.minimum(positions % extended_len, length - 1)
+    # 先頭にフィルタ長-2だけ拡張した座標
+    positions -= len(wavelet) - 2
+    if mode == 'symmetric':
+        # 端で折り返す（周期2 * length）
+        positions %= 2 * length
+        return np.where(positions >= length, 2 * length - 1 - positions, positions)
+    return np.where((positions >= 0) & (positions < length), positions, -1)
+
+
+def _read_region(src, row_index, col_index, dtype):
+    """ インデックスで指定した領域を読み出す（-1の位置は0） """
+    row_valid = row_index >= 0
+    col_valid = col_index >= 0
+    rows = np.where(row_valid, row_index, 0)
+    cols = np.where(col_valid, col_index, 0)
+    if (np.all(np.diff(rows) == 1) and np.all(np.diff(cols) == 1)):
+        # 内側のタイルは連続領域なのでスライスで読む
+        region = np.array(src[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1], dtype=dtype)
+    else:
+        region = np.array(src[np.ix_(rows, cols)], dtype=dtype)
+    if not (np.all(row_valid) and np.all(col_valid)):
+        region[~row_valid, :] = 0
+        region[:, ~col_valid] = 0
+    return region
+
+
+def _tile_ranges(length, tile_len, wavelet, mode):
+    """ 係数をtile_lenごとに区切った範囲と、その計算に必要な入力のインデックス """
+    sub_length = fwt.coef_length(length, wavelet, mode)
+    for start in range(0, sub_length, tile_len):
+        end = min(start + tile_len, sub_length)
+        # 係数[start, end)の計算に必要な入力（フィルタ長分の糊代付き）
+        yield start, end, _source_indices(np.arange(2 * start, 2 * (end - 1) + len(wavelet)),
+                length, wavelet, mode)
+
+
+def _transform_region(region, wavelet, dtype, backend):
+    """ 糊代付きの領域を変換し[ll, hl, lh, hh]を返す """
+    # 行方向、列方向の順に変換（in-memoryのfwt2dと同じ順序）
+    region_l, region_h = fwt.fwt1d_valid(region, wavelet, axis=1, dtype=dtype, backend=backend)
+    return fwt.fwt1d_valid(region_l, wavelet, axis=0, dtype=dtype, backend=backend) \
+            + fwt.fwt1d_valid(region_h, wavelet, axis=0, dtype=dtype, backend=backend)
+
+
+def fwt2d_tiled(src, scaling_coef, ll_out, hl_out, lh_out, hh_out, mode='periodic',
+        tile_shape=(256, 256), dtype=np.float64, *, backend=None):
+    """ 2次元高速ウェーブレット変換をタイルごとに行い、出力先の配列に書き込む """
+    wavelet = fwt.get_wavelet(scaling_coef)
+    col_ranges = list(_tile_ranges(src.shape[1], tile_shape[1], wavelet, mode))
+    for row, row_end, row_index in _tile_ranges(src.shape[0], tile_shape[0], wavelet, mode):
+        for col, col_end, col_index in col_ranges:
+            tiles = _transform_region(_read_region(src, row_index, col_index, dtype),
+                    wavelet, dtype, backend)
+            for subband_out, tile in zip([ll_out, hl_out, lh_out, hh_out], tiles):
+                subband_out[row:row_end, col:col_end] = tile
+
+
+def fwt2d_mra_tiled(src, max_level, scaling_coef, out_path, mode='periodic',
+        tile_shape=(256, 256), dtype=np.float64, src_shape=None, src_dtype=None,
+        scratch_dir=None, *, backend=None):
+    """ タイル処理による2次元多重解像度解析（結果は.npyのメモリマップにピラミッド配置で書き込む） """
+    if mode not in fwt.BOUNDARY_MODES:
+        raise ValueError(f"unknown boundary mode: {mode}")
+    wavelet = fwt.get_wavelet(scaling_coef)
+    src = open_source(src, src_shape, src_dtype)
+    pyramid_shape, _ = fwt.pyramid_layout(src.shape, max_level, wavelet, mode)
+    out = np.lib.format.open_memmap(out_path, mode='w+', dtype=dtype, shape=pyramid_shape)
+    pyramid = fwt.PackedPyramid(out, src.shape, max_level, wavelet, mode)
+    if max_level == 0:
+        out[...] = src
+        out.flush()
+        return pyramid
+    # 途中レベルの低域/低域は作業ファイルに置き、次のレベルの入力とする
+    with tempfile.TemporaryDirectory(dir=scratch_dir) as scratch:
+        level_src = src
+        for level in range(1, max_level + 1):
+            subband_shape = pyramid.layout[level - 1]['shape']
+            if level == max_level:
+                ll_out = pyramid.lowest()
+            else:
+                ll_out = np.memmap(os.path.join(scratch, f"ll{level}.dat"), dtype=dtype,
+                        mode='w+', shape=subband_shape)
+            fwt2d_tiled(level_src, wavelet, ll_out, pyramid.subband(level, 'hl'),
+                    pyramid.subband(level, 'lh'), pyramid.subband(level, 'hh'),
+                    mode=mode, tile_shape=tile_shape, dtype=dtype, backend=backend)
+            level_src = ll_out
+        # 作業ファイルを消す前に参照を切る
+        del level_src, ll_out
+    out.flush()
+    return pyramid
+
+
+def _dirty_coefs(dirty, length, wavelet, mode):
+    """ 長さlengthの入力のdirty番目が変わった時に値が変わる係数の番号 """
+    filter_len = len(wavelet)
+    decomp_len = fwt.coef_length(length, wavelet, mode)
+    index = _source_indices(np.arange(2 * decomp_len + filter_len - 2), length, wavelet, mode)
+    # 末尾の番兵は0埋めの位置(-1)用
+    mask = np.zeros(length + 1, dtype=bool)
+    mask[dirty] = True
+    hits = np.concatenate([[0], np.cumsum(mask[index])])
+    # 係数nは拡張後の座標[2n, 2n + L)を使う
+    starts = 2 * np.arange(decomp_len)
+    return np.flatnonzero(hits[starts + filter_len] > hits[starts])
+
+
+def _coef_support(coefs, length, wavelet, mode):
+    """ 係数coefsの計算に使う入力の番号（0埋めの位置は除く） """
+    positions = 2 * np.asarray(coefs)[:, np.newaxis] + np.arange(len(wavelet))
+    index = _source_indices(positions.ravel(), length, wavelet, mode)
+    return np.unique(index[index >= 0])
+
+
+def _runs(indices):
+    """ 昇順の番号を連続した範囲[start, end)に分ける """
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    return [(int(run[0]), int(run[-1]) + 1) for run in np.split(indices, breaks) if len(run) > 0]
+
+
+def _level_region(read, shape, rows, cols, wavelet, mode, dtype, backend):
+    """ 係数rows×colsの[ll, hl, lh, hh]を、入力を読む関数read(行番号, 列番号)から計算 """
+    subbands = [np.empty((len(rows), len(cols)), dtype=dtype) for _ in range(4)]
+    for row, row_end in _runs(rows):
+        row_index = _source_indices(np.arange(2 * row, 2 * (row_end - 1) + len(wavelet)),
+                shape[0], wavelet, mode)
+        row_pos = np.searchsorted(rows, row)
+        for col, col_end in _runs(cols):
+            col_index = _source_indices(np.arange(2 * col, 2 * (col_end - 1) + len(wavelet)),
+                    shape[1], wavelet, mode)
+            col_pos = np.searchsorted(cols, col)
+            tiles = _transform_region(read(row_index, col_index), wavelet, dtype, backend)
+            for subband, tile in zip(subbands, tiles):
+                subband[row_pos:row_pos + row_end - row, col_pos:col_pos + col_end - col] = tile
+    return subbands
+
+
+def _gather_reader(values, rows, cols, dtype):
+    """ rows×colsの位置の値valuesから、番号を指定して読む関数（-1の位置は0） """
+    def read(row_index, col_index):
+        region = values[np.ix_(np.searchsorted(rows, np.maximum(row_index, 0)),
+            np.searchsorted(cols, np.maximum(col_index, 0)))].astype(dtype, copy=True)
+        region[row_index < 0, :] = 0
+        region[:, col_index < 0] = 0
+        return region
+    return read
+
+
+def _update_plan(region, shapes, wavelet, mode):
+    """ 変化した領域から、各レベルで値が変わる係数と計算が必要な係数の番号を求める """
+    top, left, height, width = region
+    # 変化が波及する係数（レベルごとにフィルタ長分ずつ広がる）
+    dirty = (np.arange(top, top + height), np.arange(left, left + width))
+    affected = []
+    for shape in shapes:
+        dirty = tuple(_dirty_coefs(index, length, wavelet, mode)
+                for index, length in zip(dirty, shape))
+        affected.append(dirty)
+    # 計算する係数 次のレベルの計算に使う低域/低域も含める
+    computed = [affected[-1]]
+    for level_affected, shape in zip(reversed(affected[:-1]), reversed(shapes[1:])):
+        computed.insert(0, tuple(np.union1d(index, _coef_support(coefs, length, wavelet, mode))
+            for index, coefs, length in zip(level_affected, computed[0], shape)))
+    return affected, computed
+
+
+def _image_reader(src, delta, region, dtype):
+    """ 最も細かいレベルの入力を読む関数（変化分は領域外を0として読む） """
+    if src is not None:
+        return lambda row_index, col_index: _read_region(src, row_index, col_index, dtype)
+    top, left, height, width = region
+    def read(row_index, col_index):
+        return _read_region(delta,
+                np.where((row_index >= top) & (row_index < top + height), row_index - top, -1),
+                np.where((col_index >= left) & (col_index < left + width), col_index - left, -1),
+                dtype)
+    return read
+
+
+def _write_affected(targets, computed, affected, replace):
+    """ 計算した範囲computedのうち、値の変わる係数affectedだけを書き込む（replaceでなければ足し込む） """
+    (rows, cols), (affected_rows, affected_cols) = computed, affected
+    local = np.ix_(np.searchsorted(rows, affected_rows), np.searchsorted(cols, affected_cols))
+    for target, subband in targets:
+        if replace:
+            target[np.ix_(affected_rows, affected_cols)] = subband[local]
+        else:
+            target[np.ix_(affected_rows, affected_cols)] += subband[local]
+
+
+def update_mra(lowest_scale, image_octave, scaling_coef, region, src=None, delta=None,
+        mode=None, dtype=np.float64, *, backend=None):
+    """ 画像の一部region=(top, left, height, width)が変わった時に、多重解像度解析の結果を
+    その領域に掛かる係数だけ更新する（更新後の画像srcか、変化分deltaのどちらかを与える）
+    lowest_scale, image_octaveをその場で書き換えて返す """
+    if (src is None) == (delta is None):
+        raise ValueError("give exactly one of src and delta")
+    wavelet = fwt.get_wavelet(scaling_coef)
+    if mode is None:
+        mode = getattr(image_octave, 'mode', 'periodic')
+    if src is not None:
+        src = open_source(src)
+    max_level = len(image_octave)
+    # 各レベルの入力サイズ（細かい順）
+    shapes = list(getattr(image_octave, 'shapes', []))
+    if len(shapes) != max_level:
+        if src is None:
+            raise ValueError("image_octave must record its level shapes when only delta is given")
+        shapes = fwt.mra_shapes(src.shape, max_level, wavelet, mode)
+    shapes = [tuple(shape) for shape in reversed(shapes)]
+    if max_level == 0 or region[2] <= 0 or region[3] <= 0:
+        return [lowest_scale, image_octave]
+    affected, computed = _update_plan(region, shapes, wavelet, mode)
+    read = _image_reader(src, None if delta is None else np.asarray(delta), region, dtype)
+    for level, (shape, (rows, cols), (affected_rows, affected_cols)) in enumerate(
+            zip(shapes, computed, affected), start=1):
+        subbands = _level_region(read, shape, rows, cols, wavelet, mode, dtype, backend)
+        # 低域/低域は最深レベルだけ書き込む
+        targets = list(zip(image_octave[max_level - level], subbands[1:]))
+        if level == max_level:
+            targets.insert(0, (lowest_scale, subbands[0]))
+        _write_affected(targets, (rows, cols), (affected_rows, affected_cols),
+                replace=src is not None)
+        read = _gather_reader(subbands[0], rows, cols, dtype)
+    return [lowest_scale, image_octave]
@@ -233,5 +233,264 @@ class TestFWT(unittest.TestCase):
         src_test = fwt.ifwt2d(ll, hl, lh, hh, haar_scaling_coef)
         self.assertTrue(np.isclose(src, src_test).all())
 
+    def test_batch_decomp_comp_by_axis(self):
+        """ 軸指定による一括分解・再合成テスト """
+        scaling_coef = np.array([0.482962913145, 0.836516303738, 0.224143868042, -0.129409522551])
+        src = np.array([random.random() for i in range(4 * 6 * 8)]).reshape((4, 6, 8))
+        for axis in [0, 2, -1]:
+            decomp_src, decomp_wav = fwt.fwt1d(src, scaling_coef, axis=axis)
+            # 1信号ずつ変換した結果と一致するか
+            moved_src = np.moveaxis(src, axis, -1).reshape((-1, src.shape[axis]))
+            moved_decomp_src = np.moveaxis(decomp_src, axis, -1).reshape((moved_src.shape[0], -1))
+            moved_decomp_wav = np.moveaxis(decomp_wav, axis, -1).reshape((moved_src.shape[0], -1))
+            for j in range(moved_src.shape[0]):
+                decomp_src_test, decomp_wav_test = fwt.fwt1d(moved_src[j], scaling_coef)
+                self.assertTrue(np.array_equal(moved_decomp_src[j], decomp_src_test))
+                self.assertTrue(np.array_equal(moved_decomp_wav[j], decomp_wav_test))
+            src_test = fwt.ifwt1d(decomp_src, decomp_wav, scaling_coef, axis=axis)
+            self.assertTrue(np.isclose(src, src_test).all())
+
+    def test_2d_decomp_by_rows_and_columns(self):
+        """ 2次元分解結果と行・列ごとの1次元分解結果の一致確認テスト """
+        scaling_coef = np.array([0.482962913145, 0.836516303738, 0.224143868042, -0.129409522551])
+        src = np.array([random.random() for i in range(8 * 8)]).reshape((8, 8))
+        ll, hl, lh, hh = fwt.fwt2d(src, scaling_coef)
+        src_l = np.array([fwt.fwt1d(src[j, :], scaling_coef)[0] for j in range(8)])
+        src_h = np.array([fwt.fwt1d(src[j, :], scaling_coef)[1] for j in range(8)])
+        for j in range(4):
+            ll_test, hl_test = fwt.fwt1d(src_l[:, j], scaling_coef)
+            lh_test, hh_test = fwt.fwt1d(src_h[:, j], scaling_coef)
+            self.assertTrue(np.array_equal(ll[:, j], ll_test))
+            self.assertTrue(np.array_equal(hl[:, j], hl_test))
+            self.assertTrue(np.array_equal(lh[:, j], lh_test))
+            self.assertTrue(np.array_equal(hh[:, j], hh_test))
+
+    def test_polyphase_decomp_comp(self):
+        """ ポリフェーズ実装による分解・再合成のリファレンス一致確認テスト """
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES2_SCALING_COEF,
+                fwt.DAUBECHIES3_SCALING_COEF, fwt.DAUBECHIES4_SCALING_COEF]:
+            # 長めの正弦波
+            src = np.array([ math.sin(i) for i in range(128) ])
+            decomp_src, decomp_wav = fwt1d_ref(src, scaling_coef)
+            decomp_src_test, decomp_wav_test = fwt.fwt1d(src, scaling_coef, method='polyphase')
+            self.assertTrue(np.isclose(decomp_src, decomp_src_test).all())
+            self.assertTrue(np.isclose(decomp_wav, decomp_wav_test).all())
+            comp_src = ifwt1d_ref(decomp_src, decomp_wav, scaling_coef)
+            comp_src_test = fwt.ifwt1d(decomp_src, decomp_wav, scaling_coef, method='polyphase')
+            self.assertTrue(np.isclose(comp_src, comp_src_test).all())
+            # ホワイトノイズ
+            src = np.array([ random.random() for i in range(16) ])
+            decomp_src, decomp_wav = fwt1d_ref(src, scaling_coef)
+            decomp_src_test, decomp_wav_test = fwt.fwt1d(src, scaling_coef, method='polyphase')
+            self.assertTrue(np.isclose(decomp_src, decomp_src_test).all())
+            self.assertTrue(np.isclose(decomp_wav, decomp_wav_test).all())
+            comp_src = ifwt1d_ref(decomp_src, decomp_wav, scaling_coef)
+            comp_src_test = fwt.ifwt1d(decomp_src, decomp_wav, scaling_coef, method='polyphase')
+            self.assertTrue(np.isclose(comp_src, comp_src_test).all())
+            self.assertTrue(np.isclose(src, comp_src_test).all())
+            # 2次元
+            src = np.array([random.random() for i in range(16 * 16)]).reshape((16, 16))
+            ll, hl, lh, hh = fwt.fwt2d(src, scaling_coef, method='polyphase')
+            src_test = fwt.ifwt2d(ll, hl, lh, hh, scaling_coef, method='polyphase')
+            self.assertTrue(np.isclose(src, src_test).all())
+
+    def test_wavelet_registry(self):
+        """ Waveletオブジェクトとレジストリのテスト """
+        # 名前・係数リスト・Waveletのいずれからも同じフィルタが得られる
+        haar = fwt.get_wavelet('haar')
+        self.assertIs(haar, fwt.get_wavelet(fwt.HAAR_SCALING_COEF))
+        self.assertIs(haar, fwt.get_wavelet(haar))
+        self.assertEqual(fwt.calculate_wavelet_coef(np.array(fwt.HAAR_SCALING_COEF)).tolist(),
+                haar.wavelet_coef.tolist())
+        self.assertEqual(haar.filters(np.float32)['scaling'].dtype, np.float32)
+        self.assertEqual(['haar', 'db2', 'db3', 'db4'], fwt.wavelet_names()[:4])
+        with self.assertRaises(ValueError):
+            fwt.get_wavelet('unknown')
+        # 名前なしの係数はキャッシュされる
+        scaling_coef = [0.6830127, 1.1830127, 0.3169873, -0.1830127]
+        self.assertIs(fwt.get_wavelet(scaling_coef), fwt.get_wavelet(np.array(scaling_coef)))
+        # 変換結果はどの指定方法でも一致
+        src = np.array([random.random() for i in range(8 * 8)]).reshape((8, 8))
+        for wavelet in ['db2', fwt.DAUBECHIES2_SCALING_COEF, fwt.get_wavelet('db2')]:
+            ll, octave = fwt.fwt2d_mra(src, 2, wavelet)
+            ll_test, octave_test = fwt.fwt2d_mra(src, 2, fwt.DAUBECHIES2_SCALING_COEF)
+            self.assertTrue(np.array_equal(ll, ll_test))
+            for subbands, subbands_test in zip(octave, octave_test):
+                for subband, subband_test in zip(subbands, subbands_test):
+                    self.assertTrue(np.array_equal(subband, subband_test))
+
+    def test_boundary_modes_and_odd_length(self):
+        """ 境界モード・奇数長による分解・再合成テスト """
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES2_SCALING_COEF,
+                fwt.DAUBECHIES3_SCALING_COEF, fwt.DAUBECHIES4_SCALING_COEF]:
+            for mode in fwt.BOUNDARY_MODES:
+                for length in [1, 2, 7, 16, 33]:
+                    src = np.array([ random.random() for i in range(length) ])
+                    decomp_src, decomp_wav = fwt.fwt1d(src, scaling_coef, mode=mode)
+                    self.assertEqual(fwt.coef_length(length, scaling_coef, mode), len(decomp_src))
+                    # 実装方式によらず分解結果は一致
+                    decomp_src_test, decomp_wav_test = fwt.fwt1d(src, scaling_coef,
+                            method='polyphase', mode=mode)
+                    self.assertTrue(np.isclose(decomp_src, decomp_src_test).all())
+                    self.assertTrue(np.isclose(decomp_wav, decomp_wav_test).all())
+                    for method in ['convolve', 'polyphase']:
+                        src_test = fwt.ifwt1d(decomp_src, decomp_wav, scaling_coef,
+                                method=method, mode=mode, length=length)
+                        self.assertEqual(src.shape, src_test.shape)
+                        self.assertTrue(np.isclose(src, src_test).all())
+
+    def test_2d_mra_rectangular(self):
+        """ 長方形・非2冪サイズの多重解像度解析・再構成テスト """
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES4_SCALING_COEF]:
+            for mode in fwt.BOUNDARY_MODES:
+                for shape in [(27, 40), (64, 33)]:
+                    src = np.array([random.random() for i in range(shape[0] * shape[1])]).reshape(shape)
+                    ll, octave = fwt.fwt2d_mra(src, 3, scaling_coef, mode=mode)
+                    self.assertEqual(fwt.mra_shapes(shape, 3, scaling_coef, mode), octave.shapes)
+                    # 解析時に記録したサイズ・境界モードで元のサイズに戻る
+                    src_test = fwt.ifwt2d_mra(ll, octave, scaling_coef)
+                    self.assertEqual(src.shape, src_test.shape)
+                    self.assertTrue(np.isclose(src, src_test).all())
+                    # 元のサイズを直接指定しても良い
+                    src_test = fwt.ifwt2d_mra(ll, list(octave), scaling_coef, mode=mode, shape=shape)
+                    self.assertTrue(np.isclose(src, src_test).all())
+        # 巡回境界・偶数長は従来通り半分のサイズ
+        src = np.zeros((32, 16))
+        ll, hl, lh, hh = fwt.fwt2d(src, fwt.DAUBECHIES2_SCALING_COEF)
+        for subband in [ll, hl, lh, hh]:
+            self.assertEqual((16, 8), subband.shape)
+
+    def test_packed_mra(self):
+        """ パック形式の多重解像度解析・再構成テスト """
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES2_SCALING_COEF]:
+            for mode in fwt.BOUNDARY_MODES:
+                for shape in [(32, 32), (27, 40)]:
+                    src = np.array([random.random() for i in range(shape[0] * shape[1])]).reshape(shape)
+                    pyramid = fwt.fwt2d_mra_packed(src, 3, scaling_coef, mode=mode)
+                    # 各帯域はfwt2d_mraの結果と一致し、配列のビューになっている
+                    ll, octave = fwt.fwt2d_mra(src, 3, scaling_coef, mode=mode)
+                    self.assertTrue(np.isclose(ll, pyramid.lowest()).all())
+                    for level, subbands in zip(range(3, 0, -1), octave):
+                        for orientation, subband in zip(fwt.PACKED_ORIENTATIONS, subbands):
+                            view = pyramid.subband(level, orientation)
+                            self.assertTrue(np.shares_memory(view, pyramid.data))
+                            self.assertTrue(np.isclose(subband, view).all())
+                    # 再構成
+                    src_test = fwt.ifwt2d_mra_packed(pyramid)
+                    self.assertTrue(np.isclose(src, src_test).all())
+                    src_test = fwt.ifwt2d_mra(*pyramid.to_mra(), scaling_coef)
+                    self.assertTrue(np.isclose(src, src_test).all())
+        # 2冪サイズでは標準的なピラミッド配置（元画像と同じサイズ）
+        src = np.array([random.random() for i in range(64 * 64)]).reshape((64, 64))
+        pyramid = fwt.fwt2d_mra_packed(src, 2, fwt.HAAR_SCALING_COEF)
+        self.assertEqual((64, 64), pyramid.data.shape)
+        self.assertEqual((16, 16), pyramid.lowest().shape)
+        self.assertTrue(np.shares_memory(pyramid.data[0:32, 32:64], pyramid.subband(1, 'hl')))
+
+    def test_packed_mra_buffers_and_float32(self):
+        """ パック形式の出力・作業領域の再利用とfloat32のテスト """
+        scaling_coef = fwt.DAUBECHIES2_SCALING_COEF
+        src = np.array([random.random() for i in range(32 * 48)]).reshape((32, 48))
+        out = np.empty((32, 48), dtype=np.float32)
+        work = np.empty(fwt.packed_work_size(src.shape, 2, scaling_coef), dtype=np.float32)
+        pyramid = fwt.fwt2d_mra_packed(src, 2, scaling_coef, out=out, work=work)
+        self.assertIs(out, pyramid.data)
+        self.assertEqual(np.float32, pyramid.dtype)
+        recon = np.empty((32, 48), dtype=np.float32)
+        src_test = fwt.ifwt2d_mra_packed(pyramid, out=recon, work=work)
+        self.assertIs(recon, src_test)
+        self.assertTrue(np.allclose(src, src_test, atol=1e-5))
+        with self.assertRaises(ValueError):
+            fwt.fwt2d_mra_packed(src, 2, scaling_coef, out=out, work=work[:10])
+
+    def test_packed_mra_level0(self):
+        """ 分解レベル0のパック形式（配列全体が低域/低域）のテスト """
+        src = np.array([random.random() for i in range(20 * 15)]).reshape((20, 15))
+        pyramid = fwt.fwt2d_mra_packed(src, 0, fwt.DAUBECHIES2_SCALING_COEF, mode='symmetric')
+        self.assertEqual(src.shape, pyramid.data.shape)
+        self.assertIs(pyramid.data, pyramid.lowest())
+        self.assertIs(pyramid.data, pyramid.subband(0, 'll'))
+        with self.assertRaises(ValueError):
+            pyramid.subband(0, 'hh')
+        lowest, image_octave = pyramid.to_mra()
+        self.assertTrue(np.array_equal(src, lowest))
+        self.assertEqual(0, len(image_octave))
+        self.assertTrue(np.allclose(src, fwt.ifwt2d_mra_packed(pyramid)))
+        self.assertEqual(src.shape, fwt.pyramid_image(pyramid).shape)
+
+    def test_1d_mra(self):
+        """ 1次元多重解像度解析・再構成テスト """
+        for mode in fwt.BOUNDARY_MODES:
+            src = np.array([ random.random() for i in range(101) ])
+            lowest, octave = fwt.fwt1d_mra(src, 3, fwt.DAUBECHIES3_SCALING_COEF, mode=mode)
+            self.assertEqual(3, len(octave))
+            self.assertEqual(len(lowest), len(octave[0]))
+            src_test = fwt.ifwt1d_mra(lowest, octave, fwt.DAUBECHIES3_SCALING_COEF,
+                    mode=mode, length=101)
+            self.assertTrue(np.isclose(src, src_test).all())
+
+    def test_parallel_mra(self):
+        """ 並列処理の結果が逐次処理と一致するかのテスト """
+        from concurrent.futures import ThreadPoolExecutor
+        src = np.random.rand(200, 130)
+        for mode in fwt.BOUNDARY_MODES:
+            lowest, octave = fwt.fwt2d_mra(src, 3, fwt.DAUBECHIES2_SCALING_COEF, mode=mode)
+            lowest_test, octave_test = fwt.fwt2d_mra(src, 3, fwt.DAUBECHIES2_SCALING_COEF,
+                    mode=mode, workers=4)
+            self.assertTrue(np.array_equal(lowest, lowest_test))
+            for subbands, subbands_test in zip(octave, octave_test):
+                for subband, subband_test in zip(subbands, subbands_test):
+                    self.assertTrue(np.array_equal(subband, subband_test))
+            src_test = fwt.ifwt2d_mra(lowest, octave, fwt.DAUBECHIES2_SCALING_COEF)
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                src_par = fwt.ifwt2d_mra(lowest, octave, fwt.DAUBECHIES2_SCALING_COEF,
+                        executor=pool)
+            self.assertTrue(np.array_equal(src_test, src_par))
+            self.assertTrue(np.allclose(src, src_par))
+
+    def test_mra_batch(self):
+        """ 複数画像の多重解像度解析・再構成テスト """
+        images = [np.random.rand(64, 48) for _ in range(5)]
+        decomps = fwt.fwt2d_mra_batch(images, 2, fwt.HAAR_SCALING_COEF, workers=3)
+        self.assertEqual(5, len(decomps))
+        for image, (lowest, octave) in zip(images, decomps):
+            lowest_test, _ = fwt.fwt2d_mra(image, 2, fwt.HAAR_SCALING_COEF)
+            self.assertTrue(np.array_equal(lowest, lowest_test))
+        images_test = fwt.ifwt2d_mra_batch(decomps, fwt.HAAR_SCALING_COEF, workers=3)
+        for image, image_test in zip(images, images_test):
+            self.assertTrue(np.allclose(image, image_test))
+
+    def test_partial_and_roi_reconstruction(self):
+        """ 途中レベルまでの再構成・関心領域だけの再構成テスト """
+        src = np.random.rand(45, 70)
+        for mode in fwt.BOUNDARY_MODES:
+            lowest, octave = fwt.fwt2d_mra(src, 3, fwt.DAUBECHIES3_SCALING_COEF, mode=mode)
+            for target_level in range(4):
+                # target_levelのレベルの低域/低域と一致
+                src_test = fwt.ifwt2d_mra(lowest, octave, fwt.DAUBECHIES3_SCALING_COEF,
+                        target_level=target_level)
+                if target_level > 0:
+                    lowest_ref, _ = fwt.fwt2d_mra(src, target_level,
+                            fwt.DAUBECHIES3_SCALING_COEF, mode=mode)
+                    self.assertTrue(np.allclose(lowest_ref, src_test))
+                height, width = src_test.shape
+                for roi in [(0, 0, height, width), (height // 3, width // 4, height // 2, width // 2),
+                        (height - 1, width - 1, 1, 1)]:
+                    top, left, roi_height, roi_width = roi
+                    roi_test = fwt.ifwt2d_mra(lowest, octave, fwt.DAUBECHIES3_SCALING_COEF,
+                            target_level=target_level, roi=roi)
+                    self.assertTrue(np.allclose(
+                        src_test[top:top + roi_height, left:left + roi_width], roi_test))
+        # サイズの記録がない場合は偶数長とみなす
+        src = np.random.rand(32, 48)
+        lowest, octave = fwt.fwt2d_mra(src, 2, fwt.DAUBECHIES2_SCALING_COEF)
+        roi_test = fwt.ifwt2d_mra(lowest, list(octave), fwt.DAUBECHIES2_SCALING_COEF,
+                roi=(30, 0, 2, 48))
+        self.assertTrue(np.allclose(src[30:32], roi_test))
+        with self.assertRaises(ValueError):
+            fwt.ifwt2d_mra(lowest, octave, fwt.DAUBECHIES2_SCALING_COEF, roi=(30, 0, 3, 48))
+        with self.assertRaises(ValueError):
+            fwt.ifwt2d_mra(lowest, octave, fwt.DAUBECHIES2_SCALING_COEF, target_level=3)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from unittest import mock
+import fwt
+import fwt_backend
+import fwt_compress
+import fwt_nd
+import fwt_swt
+import fwt_tiled
+import numpy as np
+
+
+class TestFWTBackend(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.backends = fwt_backend.available_backends()
+
+    def test_resolve_backend(self):
+        """ バックエンドの選択（引数・環境変数・既定値）テスト """
+        with mock.patch.dict(os.environ, {fwt_backend.BACKEND_ENV: ''}):
+            self.assertEqual(fwt_backend.DEFAULT_BACKEND, fwt_backend.resolve_backend())
+            # 既定はscipyで、methodごとの結果もこれまでとビット単位で一致する
+            self.assertEqual('scipy', fwt_backend.resolve_backend())
+            src = self.rng.random((5, 32))
+            for method in ['convolve', 'polyphase']:
+                for coef, coef_ref in zip(fwt.fwt1d(src, 'db2', method=method),
+                        fwt.fwt1d(src, 'db2', method=method, backend='scipy')):
+                    self.assertTrue(np.array_equal(coef_ref, coef))
+        with mock.patch.dict(os.environ, {fwt_backend.BACKEND_ENV: 'scipy'}):
+            self.assertEqual('scipy', fwt_backend.resolve_backend())
+            self.assertEqual('numpy', fwt_backend.resolve_backend('numpy'))
+        with self.assertRaises(ValueError):
+            fwt_backend.resolve_backend('fortran')
+        with self.assertRaises(ValueError):
+            fwt.fwt1d(np.zeros(8), 'haar', backend='fortran')
+        self.assertIn('numpy', self.backends)
+
+    def test_fwt1d_ifwt1d(self):
+        """ 全バックエンドの1次元変換・逆変換の一致確認テスト（境界モード・奇数長・各軸） """
+        for wavelet in ['haar', 'db2', 'db4']:
+            for mode in fwt.BOUNDARY_MODES:
+                for shape, axis in [((3, 17), 1), ((16, 5), 0), ((2, 3, 4), -1), ((2, 6), 1)]:
+                    for dtype in [np.float64, np.float32]:
+                        src = self.rng.random(shape)
+                        ref = fwt.fwt1d(src, wavelet, axis=axis, method='convolve', mode=mode,
+                                dtype=dtype, backend='scipy')
+                        dst_ref = fwt.ifwt1d(*ref, wavelet, axis=axis, method='polyphase',
+                                mode=mode, length=shape[axis], dtype=dtype, backend='scipy')
+                        for backend in self.backends:
+                            decomp = fwt.fwt1d(src, wavelet, axis=axis, mode=mode,
+                                    dtype=dtype, backend=backend)
+                            for coef, coef_ref in zip(decomp, ref):
+                                self.assertEqual(dtype, coef.dtype)
+                                self.assertTrue(np.allclose(coef_ref, coef, atol=1e-5), backend)
+                            dst = fwt.ifwt1d(*decomp, wavelet, axis=axis, mode=mode,
+                                    length=shape[axis], dtype=dtype, backend=backend)
+                            self.assertTrue(np.allclose(dst_ref, dst, atol=1e-5), backend)
+                            self.assertTrue(np.allclose(src, dst, atol=1e-5), backend)
+
+    def test_mra(self):
+        """ 全バックエンドの多重解像度解析・パック形式の一致確認テスト """
+        src = self.rng.random((40, 36))
+        lowest_ref, octave_ref = fwt.fwt2d_mra(src, 3, 'db3', backend='scipy')
+        for backend in self.backends:
+            lowest, octave = fwt.fwt2d_mra(src, 3, 'db3', backend=backend)
+            self.assertTrue(np.allclose(lowest_ref, lowest))
+            for subbands, subbands_ref in zip(octave, octave_ref):
+                for subband, subband_ref in zip(subbands, subbands_ref):
+                    self.assertTrue(np.allclose(subband_ref, subband))
+            self.assertTrue(np.allclose(src, fwt.ifwt2d_mra(lowest, octave, 'db3',
+                backend=backend)))
+            packed = fwt.fwt2d_mra_packed(src, 3, 'db3', backend=backend)
+            self.assertTrue(np.allclose(lowest_ref, packed.lowest()))
+            self.assertTrue(np.allclose(octave_ref[-1][2], packed.subband(1, 'hh')))
+            self.assertTrue(np.allclose(src, fwt.ifwt2d_mra_packed(packed, backend=backend)))
+
+    def test_other_modules(self):
+        """ N次元・定常・タイル・圧縮の各変換へのbackendの受け渡しテスト """
+        volume = self.rng.random((12, 10, 8))
+        image = self.rng.random((24, 20))
+        lowest_ref, octave_ref = fwt_nd.fwtnd_mra(volume, 2, 'db2', backend='scipy')
+        swt_ref = fwt_swt.swt2d(image, 3, 'db2', backend='scipy')
+        with tempfile.TemporaryDirectory() as workdir:
+            out_path = os.path.join(workdir, 'out.npy')
+            np.save(os.path.join(workdir, 'src.npy'), image)
+            tiled_ref = fwt_tiled.fwt2d_mra_tiled(os.path.join(workdir, 'src.npy'), 2, 'db2',
+                    out_path, tile_shape=(8, 8), backend='scipy').data.copy()
+            for backend in self.backends:
+                lowest, octave = fwt_nd.fwtnd_mra(volume, 2, 'db2', backend=backend)
+                self.assertTrue(np.allclose(lowest_ref, lowest), backend)
+                self.assertTrue(np.allclose(octave_ref[0]['dad'], octave[0]['dad']), backend)
+                self.assertTrue(np.allclose(volume, fwt_nd.ifwtnd_mra(lowest, octave, 'db2',
+                    backend=backend)), backend)
+                lowest, octave = fwt_swt.swt2d(image, 3, 'db2', backend=backend)
+                self.assertTrue(np.allclose(swt_ref[0], lowest), backend)
+                self.assertTrue(np.allclose(swt_ref[1][0][2], octave[0][2]), backend)
+                self.assertTrue(np.allclose(image, fwt_swt.iswt2d(lowest, octave, 'db2',
+                    backend=backend)), backend)
+                pyramid = fwt_tiled.fwt2d_mra_tiled(os.path.join(workdir, 'src.npy'), 2, 'db2',
+                        out_path, tile_shape=(8, 8), backend=backend)
+                self.assertTrue(np.allclose(tiled_ref, pyramid.data), backend)
+                del pyramid
+                _, recon, _ = fwt_compress.compress_image(image, 2, 'db2', keep_fraction=0.5,
+                        backend=backend)
+                self.assertEqual(image.shape, recon.shape)
+        with self.assertRaises(ValueError):
+            fwt_swt.swt1d(image[0], 2, 'db2', backend='fortran')
+
+    def test_packed_allocation(self):
+        """ 出力・作業領域を渡したパック形式の変換で入力規模の配列を確保しないことのテスト """
+        src = self.rng.random((512, 512))
+        work = np.empty(fwt.packed_work_size(src.shape, 3, 'db4'))
+        out = np.empty_like(src)
+        recon = np.empty_like(src)
+        for backend in self.backends:
+            # 初回の呼び出し（Numbaのコンパイルなど）は除いて計測
+            pyramid = fwt.fwt2d_mra_packed(src, 3, 'db4', out=out, work=work, backend=backend)
+            fwt.ifwt2d_mra_packed(pyramid, out=recon, work=work, backend=backend)
+            tracemalloc.start()
+            try:
+                pyramid = fwt.fwt2d_mra_packed(src, 3, 'db4', out=out, work=work,
+                        backend=backend)
+                fwt.ifwt2d_mra_packed(pyramid, out=recon, work=work, backend=backend)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak, src.nbytes // 4, backend)
+            self.assertTrue(np.allclose(src, recon), backend)
+
+    def test_lazy_import(self):
+        """ import fwtだけではscipyを読み込まないことのテスト """
+        code = "import sys, fwt; print('scipy' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual('False', output.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import tempfile
+import fwt_bench
+
+# テスト用の小さな計測条件
+TINY_SWEEP = {'sizes_1d': [64], 'sizes_2d': [16], 'levels': [2], 'wavelets': ['haar'],
+        'dtypes': ['float32']}
+
+
+class TestFWTBench(unittest.TestCase):
+    def test_run_suite(self):
+        """ 全関数が計測され、必要な項目が揃っているかのテスト """
+        results = fwt_bench.run_suite(TINY_SWEEP, repeat=1, min_time=0)
+        functions = {result['function'] for result in results}
+        self.assertEqual({'fwt1d', 'ifwt1d', 'fwt1d_mra', 'ifwt1d_mra',
+            'fwt2d', 'ifwt2d', 'fwt2d_mra', 'ifwt2d_mra'}, functions)
+        for result in results:
+            self.assertGreater(result['time_s'], 0)
+            self.assertGreater(result['samples_per_s'], 0)
+            self.assertGreater(result['peak_bytes'], 0)
+        self.assertEqual(['ifwt2d_mra[haar,16x16,float32,level=2]'],
+                [result['name'] for result in fwt_bench.run_suite(TINY_SWEEP, repeat=1,
+                    min_time=0, pattern='ifwt2d_mra')])
+
+    def test_compare(self):
+        """ 基準との比較で閾値を超えた遅延だけが検出されるかのテスト """
+        baseline = {'results': [{'name': 'a', 'time_s': 1.0}, {'name': 'b', 'time_s': 1.0}]}
+        results = {'results': [{'name': 'a', 'time_s': 1.1}, {'name': 'b', 'time_s': 1.5},
+            {'name': 'c', 'time_s': 9.0}]}
+        self.assertEqual(['b'], [name for name, *_ in fwt_bench.compare(results, baseline, 0.2)])
+        self.assertEqual([], fwt_bench.compare(results, baseline, 1.0))
+        # 違うバックエンドで計測した結果とは比べない（記録が無ければscipy）
+        results['environment'] = {'backend': 'numpy'}
+        with self.assertRaises(ValueError):
+            fwt_bench.compare(results, baseline, 0.2)
+        baseline['environment'] = {'backend': 'numpy'}
+        self.assertEqual(['b'], [name for name, *_ in fwt_bench.compare(results, baseline, 0.2)])
+        results['environment'] = {'backend': 'scipy'}
+        del baseline['environment']
+        self.assertEqual(['b'], [name for name, *_ in fwt_bench.compare(results, baseline, 0.2)])
+
+    def test_measure_startup(self):
+        """ 起動時間の計測テスト """
+        startup = fwt_bench.measure_startup(['numpy'], repeat=1)
+        self.assertEqual(['import fwt', 'first fwt2d_mra[numpy]'],
+                [entry['name'] for entry in startup])
+        self.assertTrue(all(entry['time_s'] > 0 for entry in startup))
+
+    def test_main(self):
+        """ JSONの出力と基準との比較の終了コードのテスト """
+        with tempfile.TemporaryDirectory() as workdir:
+            output = os.path.join(workdir, 'result.json')
+            args = ['--sweep', 'quick', '-k', 'fwt1d[haar', '--repeat', '1', '--min-time', '0']
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(0, fwt_bench.main(args + ['-o', output]))
+            with open(output, encoding='utf-8') as file:
+                results = json.load(file)
+            self.assertIn('numpy', results['environment'])
+            # 基準を極端に速くして回帰を起こす
+            for result in results['results']:
+                result['time_s'] /= 1000
+            with open(output, 'w', encoding='utf-8') as file:
+                json.dump(results, file)
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(1, fwt_bench.main(args + ['-b', output]))
+
+if __name__ == '__main__':
+    unittest.main()
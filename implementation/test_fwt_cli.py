@@ -0,0 +1,120 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import tempfile
+import fwt
+import fwt_cli
+import numpy as np
+from PIL import Image
+
+
+class TestFWTCli(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.indir = os.path.join(self.workdir.name, 'in')
+        self.outdir = os.path.join(self.workdir.name, 'out')
+        os.makedirs(os.path.join(self.indir, 'sub'))
+        rng = np.random.default_rng(0)
+        self.images = {}
+        for name in ['a.png', 'b.png', os.path.join('sub', 'c.png')]:
+            image = rng.integers(0, 256, size=(40, 30), dtype=np.uint8)
+            Image.fromarray(image).save(os.path.join(self.indir, name))
+            self.images[os.path.splitext(name)[0]] = image
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def run_main(self, *args):
+        """ 標準出力を捨ててCLIを実行 """
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(0, fwt_cli.main(list(args)))
+        return stdout.getvalue()
+
+    def test_collect_inputs(self):
+        """ ディレクトリ・globパターンからの入力収集テスト """
+        paths = fwt_cli.collect_inputs([self.indir, os.path.join(self.indir, '*.png')])
+        self.assertEqual(3, len(paths))
+        paths = fwt_cli.collect_inputs([os.path.join(self.indir, '**', 'c.png')])
+        self.assertEqual(['c.png'], [os.path.basename(path) for path in paths])
+
+    def test_decompose_and_skip(self):
+        """ 複数プロセスでの分解・最新の出力のスキップテスト """
+        output = self.run_main(self.indir, '-o', self.outdir, '-f', 'npy', '-w', 'db2',
+                '-l', '2', '-m', 'symmetric', '-j', '2', '--chunksize', '1')
+        self.assertIn('processed 3 images', output)
+        # サブディレクトリの構成は出力先でも保つ
+        for stem, image in self.images.items():
+            data = np.load(os.path.join(self.outdir, stem + '_pyramid.npy'))
+            packed = fwt.fwt2d_mra_packed(image, 2, 'db2', mode='symmetric')
+            pyramid = fwt.PackedPyramid(data, image.shape, 2, 'db2', mode='symmetric')
+            self.assertTrue(np.array_equal(packed.lowest(), pyramid.lowest()))
+            for band in fwt.PACKED_ORIENTATIONS:
+                self.assertTrue(np.array_equal(packed.subband(1, band), pyramid.subband(1, band)))
+        # オプションが違えば、出力が入力より新しくても処理し直す
+        output = self.run_main(self.indir, '-o', self.outdir, '-f', 'npy', '-j', '1')
+        self.assertIn('processed 3 images (0 up to date)', output)
+        with open(os.path.join(self.outdir, 'a_pyramid.npy.json'), encoding='utf-8') as file:
+            self.assertEqual({'wavelet': 'haar', 'level': 2, 'mode': 'periodic', 'format': 'npy',
+                'dtype': 'float64', 'quantize': None}, json.load(file))
+        # 同じオプションで、出力が入力より新しければ処理しない
+        output = self.run_main(self.indir, '-o', self.outdir, '-f', 'npy', '-j', '1')
+        self.assertIn('processed 0 images (3 up to date)', output)
+        output = self.run_main(self.indir, '-o', self.outdir, '-f', 'npy', '-l', '3', '-j', '1')
+        self.assertIn('processed 3 images (0 up to date)', output)
+        # オプションの記録が無い出力（以前の版の出力など）は処理し直す
+        os.remove(os.path.join(self.outdir, 'a_pyramid.npy.json'))
+        output = self.run_main(self.indir, '-o', self.outdir, '-f', 'npy', '-l', '3', '-j', '1')
+        self.assertIn('processed 1 images (2 up to date)', output)
+        output = self.run_main(self.indir, '-o', self.outdir, '-f', 'png', '-j', '1')
+        self.assertIn('processed 3 images', output)
+        with Image.open(os.path.join(self.outdir, 'a_pyramid.png')) as img:
+            pyramid_shape, _ = fwt.pyramid_layout((40, 30), 2, 'haar')
+            self.assertEqual(pyramid_shape, np.asarray(img).shape)
+
+    def test_level0(self):
+        """ 分解レベル0（元の画像をそのまま出力）のテスト """
+        for output_format in sorted(fwt_cli.OUTPUT_SUFFIXES):
+            output = self.run_main(self.indir, '-o', self.outdir, '-f', output_format, '-l', '0',
+                    '-j', '1')
+            self.assertIn('processed 3 images', output)
+        data = np.load(os.path.join(self.outdir, 'a_pyramid.npy'))
+        self.assertTrue(np.array_equal(self.images['a'], data))
+
+    def test_output_collisions(self):
+        """ 出力先が同じになる入力の検出テスト """
+        # 別のディレクトリにある同じ名前の画像は別々に出力
+        Image.fromarray(self.images['a']).save(os.path.join(self.indir, 'sub', 'a.png'))
+        self.run_main(self.indir, '-o', self.outdir, '-f', 'npy', '-j', '1')
+        self.assertTrue(os.path.exists(os.path.join(self.outdir, 'a_pyramid.npy')))
+        self.assertTrue(os.path.exists(os.path.join(self.outdir, 'sub', 'a_pyramid.npy')))
+        # 拡張子だけが違う画像は同じ出力先になるので、何も処理せずに止める
+        Image.fromarray(self.images['b']).save(os.path.join(self.indir, 'b.jpg'))
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self.assertEqual(2, fwt_cli.main([self.indir, '-o', self.outdir, '-f', 'npy',
+                '--force']))
+        self.assertIn('b_pyramid.npy', stderr.getvalue())
+        self.assertIn('b.jpg', stderr.getvalue())
+
+    def test_failed_inputs(self):
+        """ 読めない・存在しない入力があっても残りを処理し、最後に失敗を返すテスト """
+        with open(os.path.join(self.indir, 'broken.png'), 'wb') as file:
+            file.write(b'not an image')
+        missing = os.path.join(self.indir, 'missing.png')
+        for jobs in ['1', '2']:
+            with contextlib.redirect_stdout(io.StringIO()) as stdout, \
+                    contextlib.redirect_stderr(io.StringIO()) as stderr:
+                self.assertEqual(1, fwt_cli.main([self.indir, missing, '-o', self.outdir,
+                    '-f', 'npy', '-j', jobs, '--force']))
+            self.assertIn('processed 3 images (0 up to date, 2 failed)', stdout.getvalue())
+            self.assertIn('broken.png: UnidentifiedImageError', stderr.getvalue())
+            self.assertIn('missing.png: FileNotFoundError', stderr.getvalue())
+            for stem in self.images:
+                self.assertTrue(os.path.exists(os.path.join(self.outdir, stem + '_pyramid.npy')))
+            self.assertEqual(['a_pyramid.npy', 'a_pyramid.npy.json', 'b_pyramid.npy',
+                'b_pyramid.npy.json', 'sub'], sorted(os.listdir(self.outdir)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import fwt
+import fwt_compress
+import numpy as np
+
+
+class TestFWTCompress(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # なめらかな画像にノイズを加えたもの
+        row, col = np.mgrid[0:64, 0:48]
+        self.clean = 100 * np.sin(row / 10) * np.cos(col / 7)
+        self.noisy = self.clean + rng.normal(0, 5, self.clean.shape)
+
+    def test_threshold_rules(self):
+        """ 閾値処理（ハード・ソフト、universal・BayesShrink）のテスト """
+        lowest, octave = fwt.fwt2d_mra(self.noisy, 3, fwt.DAUBECHIES2_SCALING_COEF)
+        threshold = fwt_compress.universal_threshold(octave)
+        _, hard = fwt_compress.threshold_mra(lowest, octave, threshold=threshold, rule='hard')
+        _, soft = fwt_compress.threshold_mra(lowest, octave, threshold=threshold, rule='soft')
+        for subbands, hard_subbands, soft_subbands in zip(octave, hard, soft):
+            for subband, hard_subband, soft_subband in zip(subbands, hard_subbands, soft_subbands):
+                kept = np.abs(subband) > threshold
+                self.assertTrue(np.array_equal(np.where(kept, subband, 0), hard_subband))
+                self.assertTrue(np.allclose(np.where(kept, subband - np.sign(subband) * threshold,
+                    0), soft_subband))
+        self.assertEqual(octave.shapes, hard.shapes)
+        # ノイズが減っていること
+        noisy_error = np.linalg.norm(self.noisy - self.clean)
+        for estimator in fwt_compress.THRESHOLD_ESTIMATORS:
+            denoised = fwt.ifwt2d_mra(*fwt_compress.threshold_mra(lowest, octave,
+                threshold=estimator, rule='soft'), fwt.DAUBECHIES2_SCALING_COEF)
+            self.assertLess(np.linalg.norm(denoised - self.clean), noisy_error)
+        with self.assertRaises(ValueError):
+            fwt_compress.threshold_mra(lowest, octave, rule='medium')
+
+    def test_top_k(self):
+        """ 全レベルを通した上位k個の選択テスト """
+        lowest, octave = fwt.fwt2d_mra(self.noisy, 2, fwt.HAAR_SCALING_COEF)
+        _, kept = fwt_compress.top_k_mra(lowest, octave, count=100)
+        flat = np.concatenate([subband.ravel() for subbands in octave for subband in subbands])
+        flat_kept = np.concatenate([subband.ravel() for subbands in kept for subband in subbands])
+        self.assertEqual(100, np.count_nonzero(flat_kept))
+        self.assertGreaterEqual(np.min(np.abs(flat_kept[flat_kept != 0])),
+                np.max(np.abs(flat[flat_kept == 0])))
+        # 割合は1.0で全て、0.99で99%を残す（個数とは別の引数で指定する）
+        for fraction in [1.0, 0.99]:
+            _, kept = fwt_compress.top_k_mra(lowest, octave, fraction)
+            flat_kept = np.concatenate([subband.ravel() for subbands in kept
+                for subband in subbands])
+            self.assertEqual(round(fraction * flat.size), np.count_nonzero(flat_kept))
+        _, kept = fwt_compress.top_k_mra(lowest, octave, count=1)
+        self.assertEqual(1, sum(np.count_nonzero(subband) for subbands in kept
+            for subband in subbands))
+        for args, kwargs in [((), {}), ((0.5,), {'count': 10}), ((100,), {}), ((), {'count': -1})]:
+            with self.assertRaises(ValueError):
+                fwt_compress.top_k_mra(lowest, octave, *args, **kwargs)
+
+    def test_level0(self):
+        """ 分解レベル0（高域成分なし）の閾値処理・圧縮テスト """
+        lowest, octave = fwt.fwt2d_mra(self.noisy, 0, fwt.HAAR_SCALING_COEF)
+        self.assertEqual(0.0, fwt_compress.estimate_noise(octave))
+        for kwargs in [{}, {'threshold': 'bayes'}, {'keep_fraction': 0.5}, {'keep_count': 3}]:
+            sparse, recon, report = fwt_compress.compress_image(self.noisy, 0, 'db2', **kwargs)
+            self.assertTrue(np.allclose(self.noisy, recon))
+            self.assertEqual(0, report['kept'])
+            self.assertTrue(np.array_equal(lowest, sparse.lowest_scale))
+
+    def test_sparse_compress(self):
+        """ 疎な形式での保持・再構成テスト """
+        lowest, octave = fwt.fwt2d_mra(self.noisy, 3, fwt.DAUBECHIES3_SCALING_COEF,
+                mode='symmetric')
+        sparse = fwt_compress.SparseMRA(lowest, octave, fwt.DAUBECHIES3_SCALING_COEF)
+        # 閾値処理していなければ元通りに再構成できる
+        self.assertTrue(np.allclose(self.noisy, sparse.reconstruct()))
+        sparse, recon, report = fwt_compress.compress_image(self.noisy, 3, 'db3',
+                mode='symmetric', keep_fraction=0.05, quantize='int16')
+        self.assertEqual(self.noisy.shape, recon.shape)
+        self.assertEqual(np.uint16, sparse.indices.dtype)
+        self.assertGreater(report['compression_ratio'], 5)
+        self.assertAlmostEqual(np.sqrt(np.mean((self.noisy - recon) ** 2)), report['rmse'])
+        self.assertLess(report['rmse'], 10)
+        # レベルごとの再構成は密な形式に戻してからの再構成と一致する
+        lowest, octave = sparse.to_mra()
+        self.assertEqual(3, len(octave))
+        self.assertEqual(np.count_nonzero(octave[-1][2]),
+                np.count_nonzero(sparse.indices >= sparse.size - octave[-1][2].size))
+        self.assertTrue(np.array_equal(fwt.ifwt2d_mra(lowest, octave, 'db3'), recon))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import fwt_lifting
+import numpy as np
+
+
+def legall53_ref(src):
+    """ LeGall 5/3の整数可逆変換（JPEG 2000の定義どおりの素朴な実装） """
+    length = len(src)
+    def sample(index):
+        # 対称拡張
+        index = abs(index)
+        if index > length - 1:
+            index = 2 * (length - 1) - index
+        return int(src[index])
+    def predict(index):
+        return sample(2 * index + 1) - ((sample(2 * index) + sample(2 * index + 2)) >> 1)
+    decomp_wav = [predict(n) for n in range(length // 2)]
+    decomp_src = [sample(2 * n) + ((predict(n - 1) + predict(n) + 2) >> 2)
+            for n in range((length + 1) // 2)]
+    return [np.array(decomp_src), np.array(decomp_wav)]
+
+
+class TestFWTLifting(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_legall53_ref(self):
+        """ LeGall 5/3のリファレンス実装との一致確認テスト """
+        for length in range(2, 20):
+            src = self.rng.integers(0, 256, size=length, dtype=np.uint8)
+            decomp_src, decomp_wav = fwt_lifting.lwt1d(src, 'legall53')
+            decomp_src_ref, decomp_wav_ref = legall53_ref(src)
+            self.assertEqual(decomp_src_ref.tolist(), decomp_src.tolist())
+            self.assertEqual(decomp_wav_ref.tolist(), decomp_wav.tolist())
+
+    def test_lossless_1d(self):
+        """ 1次元の整数可逆変換・逆変換テスト（奇数長・各軸） """
+        for wavelet in fwt_lifting.INTEGER_WAVELETS:
+            for length in range(1, 16):
+                src = self.rng.integers(0, 256, size=length, dtype=np.uint8)
+                decomp_src, decomp_wav = fwt_lifting.lwt1d(src, wavelet)
+                self.assertEqual(np.int16, decomp_src.dtype)
+                self.assertEqual((length + 1) // 2, len(decomp_src))
+                src_test = fwt_lifting.ilwt1d(decomp_src, decomp_wav, wavelet, dtype=np.uint8)
+                self.assertTrue(np.array_equal(src, src_test))
+            src = self.rng.integers(0, 65536, size=(7, 10), dtype=np.uint16)
+            for axis in [0, 1]:
+                decomp = fwt_lifting.lwt1d(src, wavelet, axis=axis)
+                self.assertEqual(np.int32, decomp[0].dtype)
+                src_test = fwt_lifting.ilwt1d(*decomp, wavelet, axis=axis, dtype=np.uint16)
+                self.assertTrue(np.array_equal(src, src_test))
+        with self.assertRaises(ValueError):
+            fwt_lifting.lwt1d(np.zeros(8), 'haar')
+        with self.assertRaises(ValueError):
+            fwt_lifting.lwt1d(np.zeros(8, dtype=np.uint8), 'db2')
+
+    def test_lossless_mra(self):
+        """ 整数可逆変換による多重解像度解析・再構成テスト """
+        for wavelet in fwt_lifting.INTEGER_WAVELETS:
+            for shape in [(64, 64), (45, 70)]:
+                src = self.rng.integers(0, 256, size=shape, dtype=np.uint8)
+                lowest, octave = fwt_lifting.lwt2d_mra(src, 4, wavelet)
+                # 全レベルを通してint16のまま
+                self.assertEqual(np.int16, lowest.dtype)
+                for subbands in octave:
+                    for subband in subbands:
+                        self.assertEqual(np.int16, subband.dtype)
+                self.assertEqual(shape, octave.shapes[-1])
+                src_test = fwt_lifting.ilwt2d_mra(lowest, octave, wavelet, dtype=np.uint8)
+                self.assertEqual(np.uint8, src_test.dtype)
+                self.assertTrue(np.array_equal(src, src_test))
+
+if __name__ == '__main__':
+    unittest.main()
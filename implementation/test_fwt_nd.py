@@ -0,0 +1,61 @@
+import unittest
+import fwt
+import fwt_nd
+import numpy as np
+
+
+class TestFWTNd(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_fwtnd_matches_fwt2d(self):
+        """ 2次元でfwt2dと同じ帯域が得られるかのテスト """
+        src = self.rng.random((24, 20))
+        for method in ['convolve', 'polyphase']:
+            src_ll, src_hl, src_lh, src_hh = fwt.fwt2d(src, 'db2', method=method)
+            subbands = fwt_nd.fwtnd(src, 'db2', axes=(0, 1), method=method)
+            self.assertEqual({'aa', 'ad', 'da', 'dd'}, set(subbands))
+            for key, expect in [('aa', src_ll), ('da', src_hl), ('ad', src_lh), ('dd', src_hh)]:
+                self.assertTrue(np.allclose(expect, subbands[key]))
+
+    def test_fwtnd_ifwtnd(self):
+        """ 3次元の変換・逆変換テスト（奇数長・軸の指定・境界モード） """
+        src = self.rng.random((9, 16, 7))
+        for mode in fwt.BOUNDARY_MODES:
+            for axes in [None, (2, 0), (-1,)]:
+                subbands = fwt_nd.fwtnd(src, 'db3', axes=axes, mode=mode)
+                self.assertEqual(2 ** (3 if axes is None else len(axes)), len(subbands))
+                dst = fwt_nd.ifwtnd(subbands, 'db3', axes=axes, mode=mode, shape=src.shape)
+                self.assertTrue(np.allclose(src, dst))
+
+    def test_ifwtnd_invalid_keys(self):
+        """ 帯域のキーが揃っていない場合のエラーテスト """
+        subbands = fwt_nd.fwtnd(self.rng.random((8, 8, 8)), 'haar')
+        del subbands['dad']
+        with self.assertRaises(ValueError):
+            fwt_nd.ifwtnd(subbands, 'haar')
+        with self.assertRaises(ValueError):
+            fwt_nd.fwtnd(np.zeros((8, 8)), 'haar', axes=(0, -2))
+
+    def test_fwtnd_mra(self):
+        """ 軸ごとのレベル数を指定した多重解像度解析・再構成テスト """
+        src = self.rng.random((12, 32, 40))
+        for mode in fwt.BOUNDARY_MODES:
+            lowest, octave = fwt_nd.fwtnd_mra(src, [1, 3, 2], 'db2', mode=mode)
+            self.assertEqual(3, len(octave))
+            # 解像度の低い順（最深レベルは2軸目だけを変換）
+            self.assertEqual([(1,), (1, 2), (0, 1, 2)], octave.axes)
+            self.assertEqual(1, len(octave[0]))
+            self.assertEqual(7, len(octave[-1]))
+            self.assertEqual(src.shape, octave.shapes[-1])
+            dst = fwt_nd.ifwtnd_mra(lowest, octave, 'db2')
+            self.assertTrue(np.allclose(src, dst))
+        # 全軸同じレベル数なら2次元の多重解像度解析と同じ低域
+        image = self.rng.random((32, 32))
+        lowest, _ = fwt_nd.fwtnd_mra(image, 3, 'db2')
+        lowest_2d, _ = fwt.fwt2d_mra(image, 3, 'db2')
+        self.assertTrue(np.allclose(lowest_2d, lowest))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import json
+import fwt
+import fwt_profile
+import numpy as np
+
+
+class TestFWTProfile(unittest.TestCase):
+    def test_records(self):
+        """ 区間ごと・レベルごとの記録テスト """
+        src = np.random.rand(64, 48)
+        with fwt_profile.Profiler(trace_memory=True) as profiler:
+            # scipyバックエンドで計測
+            lowest, octave = fwt.fwt2d_mra(src, 3, fwt.DAUBECHIES2_SCALING_COEF, backend='scipy')
+            fwt.ifwt2d_mra(lowest, octave, fwt.DAUBECHIES2_SCALING_COEF, backend='scipy')
+        summary = {(entry['name'], entry['level']): entry for entry in profiler.summary()}
+        for level in range(1, 4):
+            for name in ['fwt2d_mra.level', 'fwt2d.rows', 'fwt2d.columns', 'fwt1d.filter',
+                    'ifwt2d_mra.level', 'ifwt2d.rows', 'ifwt2d.columns']:
+                self.assertIn((name, level), summary)
+            # 各レベルでは行方向に1回、列方向に2回fwt1dを呼ぶ
+            self.assertEqual(3, summary[('fwt1d', level)]['count'])
+            self.assertGreater(summary[('fwt1d', level)]['nbytes'], 0)
+            self.assertIn('traced_bytes', summary[('fwt1d', level)])
+        self.assertEqual([[64, 48]], summary[('fwt2d_mra.level', 1)]['shapes'])
+        self.assertEqual([[16, 12]], summary[('fwt2d_mra.level', 3)]['shapes'])
+        # 外側の区間は内側の区間を含む
+        level_time = summary[('fwt2d_mra.level', 1)]['total_s']
+        self.assertGreaterEqual(level_time, summary[('fwt2d.rows', 1)]['total_s'])
+        json.dumps(profiler.to_dict())
+
+    def test_chrome_trace_and_off(self):
+        """ Chromeのトレース形式の出力・計測終了後に記録されないことのテスト """
+        with fwt_profile.Profiler() as profiler:
+            fwt.fwt2d(np.random.rand(16, 16), fwt.HAAR_SCALING_COEF)
+        count = len(profiler.records)
+        trace = json.loads(json.dumps(profiler.to_chrome_trace()))
+        self.assertEqual(count, len(trace['traceEvents']))
+        for event in trace['traceEvents']:
+            self.assertEqual('X', event['ph'])
+            self.assertGreaterEqual(event['ts'], 0)
+            self.assertGreaterEqual(event['dur'], 0)
+        fwt.fwt2d(np.random.rand(16, 16), fwt.HAAR_SCALING_COEF)
+        self.assertEqual(count, len(profiler.records))
+        self.assertEqual([], fwt._STAGE_HOOKS)
+
+if __name__ == '__main__':
+    unittest.main()
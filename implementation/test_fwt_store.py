@@ -0,0 +1,80 @@
+import unittest
+import os
+import tempfile
+import fwt
+import fwt_store
+import numpy as np
+
+
+class TestFWTStore(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'coef.fwc')
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_save_load(self):
+        """ 係数ファイルの保存・読み込み・再構成テスト """
+        src = np.random.rand(45, 62)
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES3_SCALING_COEF]:
+            for mode in fwt.BOUNDARY_MODES:
+                lowest, octave = fwt.fwt2d_mra(src, 3, scaling_coef, mode=mode)
+                fwt_store.save_mra(self.path, lowest, octave, scaling_coef)
+                coef_file = fwt_store.load_mra(self.path)
+                self.assertEqual((3, (45, 62), mode), (coef_file.max_level, coef_file.shape,
+                    coef_file.mode))
+                # 帯域はファイルのメモリマップのビューで、先頭位置が揃っている
+                subband = coef_file.subband(1, 'hh')
+                self.assertIsInstance(subband.base, np.memmap)
+                self.assertFalse(subband.flags.writeable)
+                for entry in coef_file.header['subbands']:
+                    self.assertEqual(0, entry['offset'] % fwt_store.BLOCK_ALIGNMENT)
+                self.assertTrue(np.array_equal(octave[-1][2], subband))
+                self.assertTrue(np.array_equal(lowest, coef_file.lowest()))
+                lowest_test, octave_test = coef_file.to_mra()
+                src_test = fwt.ifwt2d_mra(lowest_test, octave_test, coef_file.wavelet)
+                self.assertTrue(np.allclose(src, src_test))
+                with self.assertRaises(ValueError):
+                    coef_file.subband(1, 'll')
+                with self.assertRaises(ValueError):
+                    coef_file.subband(4, 'hl')
+
+    def test_custom_wavelet(self):
+        """ 登録名のウェーブレットで保存したファイルを登録のない状態で読み込むテスト """
+        src = np.random.rand(32, 32)
+        wavelet = fwt.register_wavelet('test_store_wavelet', fwt.DAUBECHIES2_SCALING_COEF[::-1])
+        try:
+            lowest, octave = fwt.fwt2d_mra(src, 2, wavelet)
+            fwt_store.save_mra(self.path, lowest, octave, wavelet)
+            self.assertEqual('test_store_wavelet',
+                    fwt_store.load_mra(self.path).header['wavelet']['name'])
+        finally:
+            # 別のプロセスで読み込む場合と同じく、名前が登録されていない状態にする
+            del fwt._WAVELET_REGISTRY['test_store_wavelet']
+            del fwt._WAVELET_BY_COEF[tuple(wavelet.scaling_coef.tolist())]
+        coef_file = fwt_store.load_mra(self.path)
+        self.assertTrue(np.array_equal(wavelet.scaling_coef, coef_file.wavelet.scaling_coef))
+        lowest_test, octave_test = coef_file.to_mra()
+        self.assertTrue(np.allclose(src, fwt.ifwt2d_mra(lowest_test, octave_test,
+            coef_file.wavelet)))
+
+    def test_quantize(self):
+        """ 量子化して保存した係数の誤差・サイズのテスト """
+        src = 255 * np.random.rand(64, 64)
+        lowest, octave = fwt.fwt2d_mra(src, 2, fwt.DAUBECHIES2_SCALING_COEF)
+        fwt_store.save_mra(self.path, lowest, octave, 'db2')
+        full_size = os.path.getsize(self.path)
+        for quantize, tolerance in [('float16', 0.5), ('int16', 0.1), ('int8', 20)]:
+            fwt_store.save_mra(self.path, lowest, octave, 'db2', quantize=quantize)
+            self.assertLess(os.path.getsize(self.path), full_size)
+            coef_file = fwt_store.load_mra(self.path)
+            self.assertEqual(np.dtype(quantize), coef_file.raw_subband(1, 'hl').dtype)
+            self.assertEqual(np.float64, coef_file.subband(1, 'hl').dtype)
+            src_test = fwt.ifwt2d_mra(*coef_file.to_mra(), coef_file.wavelet)
+            self.assertLess(np.max(np.abs(src - src_test)), tolerance)
+        with self.assertRaises(ValueError):
+            fwt_store.save_mra(self.path, lowest, octave, 'db2', quantize='int4')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import fwt
+import fwt_stream
+import numpy as np
+import random
+
+
+def split_chunks(src, chunk_sizes):
+    """ 信号を指定サイズのチャンクに分割（サイズは繰り返し使う） """
+    chunks = []
+    pos = 0
+    while pos < len(src):
+        size = chunk_sizes[len(chunks) % len(chunk_sizes)]
+        chunks.append(src[pos:pos + size])
+        pos += size
+    return chunks
+
+
+class TestStreamFWT(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_stream_analysis(self):
+        """ 逐次変換結果と一括変換結果の一致確認テスト """
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES2_SCALING_COEF,
+                fwt.DAUBECHIES4_SCALING_COEF]:
+            for mode in fwt.BOUNDARY_MODES:
+                for length in [5, 64, 101]:
+                    src = np.array([ random.random() for i in range(length) ])
+                    for chunk_sizes in [[1], [3, 16, 2], [1000]]:
+                        outputs = list(fwt_stream.stream_fwt1d(split_chunks(src, chunk_sizes),
+                            scaling_coef, 3, mode))
+                        lowest = np.concatenate([out[0] for out in outputs])
+                        lowest_ref, octave_ref = fwt.fwt1d_mra(src, 3, scaling_coef, mode=mode)
+                        self.assertEqual(lowest_ref.shape, lowest.shape)
+                        self.assertTrue(np.isclose(lowest_ref, lowest).all())
+                        for level in range(3):
+                            decomp_wav = np.concatenate([out[1][level] for out in outputs])
+                            self.assertEqual(octave_ref[level].shape, decomp_wav.shape)
+                            self.assertTrue(np.isclose(octave_ref[level], decomp_wav).all())
+
+    def test_stream_synthesis(self):
+        """ 逐次逆変換による再構成テスト """
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES3_SCALING_COEF]:
+            for mode in ['symmetric', 'zero']:
+                for length in [7, 64, 129]:
+                    src = np.array([ random.random() for i in range(length) ])
+                    outputs = fwt_stream.stream_fwt1d(split_chunks(src, [5, 1, 11]),
+                            scaling_coef, 2, mode)
+                    src_test = np.concatenate(list(fwt_stream.stream_ifwt1d(outputs,
+                        scaling_coef, length, 2, mode)))
+                    self.assertEqual(src.shape, src_test.shape)
+                    self.assertTrue(np.isclose(src, src_test).all())
+        # 巡回境界はハール基底のみ逐次に再構成できる
+        src = np.array([ random.random() for i in range(33) ])
+        outputs = fwt_stream.stream_fwt1d(split_chunks(src, [4]), fwt.HAAR_SCALING_COEF, 2,
+                'periodic')
+        src_test = np.concatenate(list(fwt_stream.stream_ifwt1d(outputs,
+            fwt.HAAR_SCALING_COEF, 33, 2, 'periodic')))
+        self.assertTrue(np.isclose(src, src_test).all())
+        with self.assertRaises(ValueError):
+            fwt_stream.StreamSynthesizer(fwt.DAUBECHIES2_SCALING_COEF, 2, 'periodic')
+        # 既定の境界モードどうしの組み合わせで元の長さに戻る
+        outputs = fwt_stream.stream_fwt1d(split_chunks(src, [4]), fwt.DAUBECHIES2_SCALING_COEF)
+        src_test = np.concatenate(list(fwt_stream.stream_ifwt1d(outputs,
+            fwt.DAUBECHIES2_SCALING_COEF, 33)))
+        self.assertEqual(src.shape, src_test.shape)
+        self.assertTrue(np.isclose(src, src_test).all())
+
+    def test_stream_latency(self):
+        """ 係数が確定次第出力されることの確認テスト """
+        analyzer = fwt_stream.StreamAnalyzer(fwt.DAUBECHIES2_SCALING_COEF, 1, 'periodic')
+        # フィルタ長に達するまでは出力なし
+        lowest, octave = analyzer.process(np.ones(3))
+        self.assertEqual(0, len(lowest))
+        # 以降は2サンプルごとに1係数
+        lowest, octave = analyzer.process(np.ones(1))
+        self.assertEqual(1, len(lowest))
+        self.assertEqual(1, len(octave[0]))
+        lowest, octave = analyzer.process(np.ones(10))
+        self.assertEqual(5, len(lowest))
+        # 内部に保持する入力はフィルタ長程度
+        self.assertLessEqual(len(analyzer.levels[0].buffer), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import fwt
+import fwt_swt
+import numpy as np
+
+
+def hard_threshold(src, threshold=0.3):
+    """ 絶対値が閾値以下の係数を0にする """
+    return np.where(np.abs(src) > threshold, src, 0)
+
+
+class TestFWTSwt(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_swt1d_iswt1d(self):
+        """ 1次元定常ウェーブレット変換・逆変換テスト（任意の長さ・各軸） """
+        for wavelet in ['haar', 'db2', 'db4']:
+            for length in [5, 16, 37]:
+                src = self.rng.random((3, length))
+                lowest, octave = fwt_swt.swt1d(src, 3, wavelet)
+                self.assertEqual(src.shape, lowest.shape)
+                self.assertTrue(all(src.shape == decomp_wav.shape for decomp_wav in octave))
+                self.assertTrue(np.allclose(src, fwt_swt.iswt1d(lowest, octave, wavelet)))
+                lowest, octave = fwt_swt.swt1d(src.T, 2, wavelet, axis=0)
+                self.assertTrue(np.allclose(src.T, fwt_swt.iswt1d(lowest, octave, wavelet,
+                    axis=0)))
+
+    def test_swt2d_iswt2d(self):
+        """ 2次元定常ウェーブレット変換・逆変換テスト（float32を含む） """
+        src = self.rng.random((30, 44))
+        for dtype in [np.float64, np.float32]:
+            lowest, image_octave = fwt_swt.swt2d(src, 3, 'db3', dtype=dtype)
+            self.assertEqual(dtype, lowest.dtype)
+            self.assertEqual([src.shape] * 3, image_octave.shapes)
+            dst = fwt_swt.iswt2d(lowest, image_octave, 'db3', dtype=dtype)
+            self.assertEqual(dtype, dst.dtype)
+            self.assertTrue(np.allclose(src, dst, atol=1e-5))
+
+    def test_decimated_coefficients(self):
+        """ 間引くと通常の多重解像度解析の係数に一致するかのテスト """
+        src = self.rng.random((32, 32))
+        lowest, octave = fwt_swt.swt1d(src[0], 3, 'db2')
+        lowest_ref, octave_ref = fwt.fwt1d_mra(src[0], 3, 'db2')
+        self.assertTrue(np.allclose(lowest_ref, lowest[::8]))
+        for level, decomp_wav, decomp_wav_ref in zip(range(3, 0, -1), octave, octave_ref):
+            self.assertTrue(np.allclose(decomp_wav_ref, decomp_wav[::2 ** level]))
+        lowest, image_octave = fwt_swt.swt2d(src, 2, 'db2')
+        lowest_ref, image_octave_ref = fwt.fwt2d_mra(src, 2, 'db2')
+        self.assertTrue(np.allclose(lowest_ref, lowest[::4, ::4]))
+        for subband, subband_ref in zip(image_octave[1], image_octave_ref[1]):
+            self.assertTrue(np.allclose(subband_ref, subband[::2, ::2]))
+
+    def test_translation_invariance(self):
+        """ 入力をずらすと係数も同じだけずれるかのテスト """
+        src = self.rng.random((24, 24))
+        lowest, image_octave = fwt_swt.swt2d(src, 2, 'db2')
+        shifted_lowest, shifted_octave = fwt_swt.swt2d(np.roll(src, (3, 5), axis=(0, 1)), 2,
+                'db2')
+        self.assertTrue(np.allclose(np.roll(lowest, (3, 5), axis=(0, 1)), shifted_lowest))
+        for subbands, shifted_subbands in zip(image_octave, shifted_octave):
+            for subband, shifted_subband in zip(subbands, shifted_subbands):
+                self.assertTrue(np.allclose(np.roll(subband, (3, 5), axis=(0, 1)),
+                    shifted_subband))
+
+    def test_cycle_spinning(self):
+        """ 閾値処理の結果が全シフトのサイクルスピニングの平均に一致するかのテスト """
+        src = self.rng.random(32)
+        max_level = 3
+        lowest, octave = fwt_swt.swt1d(src, max_level, 'db2')
+        dst = fwt_swt.iswt1d(lowest, [hard_threshold(decomp_wav) for decomp_wav in octave],
+                'db2')
+        spinning = np.zeros_like(src)
+        for shift in range(2 ** max_level):
+            lowest, octave = fwt.fwt1d_mra(np.roll(src, -shift), max_level, 'db2')
+            spinning += np.roll(fwt.ifwt1d_mra(lowest,
+                [hard_threshold(decomp_wav) for decomp_wav in octave], 'db2'), shift)
+        self.assertTrue(np.allclose(spinning / 2 ** max_level, dst))
+
+    def test_iter_swt(self):
+        """ レベルごとの生成がまとめて変換した結果と一致するかのテスト """
+        src = self.rng.random((16, 20))
+        lowest, image_octave = fwt_swt.swt2d(src, 3, 'haar')
+        levels = list(fwt_swt.iter_swt2d(src, 3, 'haar'))
+        self.assertEqual([1, 2, 3], [level for level, _, _ in levels])
+        self.assertTrue(np.allclose(lowest, levels[-1][1]))
+        for (_, _, subbands), subbands_ref in zip(levels, image_octave[::-1]):
+            for subband, subband_ref in zip(subbands, subbands_ref):
+                self.assertTrue(np.allclose(subband_ref, subband))
+        lowest, octave = fwt_swt.swt1d(src, 2, 'haar')
+        for (level, _, decomp_wav), decomp_wav_ref in zip(fwt_swt.iter_swt1d(src, 2, 'haar'),
+                octave[::-1]):
+            self.assertTrue(np.allclose(decomp_wav_ref, decomp_wav), level)
+
+
+if __name__ == '__main__':
+    unittest.main()
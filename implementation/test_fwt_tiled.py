@@ -0,0 +1,89 @@
+import unittest
+import os
+import tempfile
+import fwt
+import fwt_tiled
+import numpy as np
+
+
+class TestTiledFWT(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_tiled_mra(self):
+        """ タイル処理と一括処理の多重解像度解析結果の一致確認テスト """
+        rng = np.random.default_rng(0)
+        src_path = os.path.join(self.workdir.name, 'src.npy')
+        out_path = os.path.join(self.workdir.name, 'out.npy')
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES2_SCALING_COEF,
+                fwt.DAUBECHIES4_SCALING_COEF]:
+            for mode in ['periodic', 'symmetric']:
+                for shape, tile_shape in [((64, 64), (8, 8)), ((45, 70), (7, 16))]:
+                    src = rng.integers(0, 256, size=shape, dtype=np.uint8)
+                    np.save(src_path, src)
+                    pyramid = fwt_tiled.fwt2d_mra_tiled(src_path, 3, scaling_coef, out_path,
+                            mode=mode, tile_shape=tile_shape)
+                    self.assertIsInstance(pyramid.data, np.memmap)
+                    # ポリフェーズ実装の一括処理とはビット単位で一致
+                    ll, octave = fwt.fwt2d_mra(src, 3, scaling_coef, method='polyphase', mode=mode)
+                    ll_test, octave_test = pyramid.to_mra()
+                    self.assertTrue(np.array_equal(ll, ll_test))
+                    for subbands, subbands_test in zip(octave, octave_test):
+                        for subband, subband_test in zip(subbands, subbands_test):
+                            self.assertTrue(np.array_equal(subband, subband_test))
+                    # 書き出したファイルから再構成できる
+                    saved = fwt.PackedPyramid(np.load(out_path, mmap_mode='r'), shape, 3,
+                            scaling_coef, mode)
+                    self.assertTrue(np.isclose(src, fwt.ifwt2d_mra_packed(saved)).all())
+                    del pyramid, saved
+
+    def test_raw_input(self):
+        """ 生データファイル入力のテスト """
+        src = np.arange(40 * 30, dtype=np.uint16).reshape((40, 30))
+        src_path = os.path.join(self.workdir.name, 'src.raw')
+        out_path = os.path.join(self.workdir.name, 'out.npy')
+        src.tofile(src_path)
+        with self.assertRaises(ValueError):
+            fwt_tiled.fwt2d_mra_tiled(src_path, 2, 'db2', out_path)
+        pyramid = fwt_tiled.fwt2d_mra_tiled(src_path, 2, 'db2', out_path,
+                tile_shape=(4, 4), src_shape=src.shape, src_dtype=np.uint16)
+        ll, _ = fwt.fwt2d_mra(src, 2, 'db2', method='polyphase')
+        self.assertTrue(np.array_equal(ll, pyramid.lowest()))
+        del pyramid
+
+    def test_update_mra(self):
+        """ 一部の領域が変わった時の係数の更新テスト """
+        rng = np.random.default_rng(0)
+        for scaling_coef in [fwt.HAAR_SCALING_COEF, fwt.DAUBECHIES4_SCALING_COEF]:
+            for mode in fwt.BOUNDARY_MODES:
+                for shape, region in [((64, 64), (20, 30, 5, 3)), ((45, 70), (0, 66, 4, 4)),
+                        ((9, 7), (0, 0, 9, 7))]:
+                    src = rng.normal(size=shape)
+                    top, left, height, width = region
+                    delta = rng.normal(size=(height, width))
+                    updated = src.copy()
+                    updated[top:top + height, left:left + width] += delta
+                    ll_ref, octave_ref = fwt.fwt2d_mra(updated, 3, scaling_coef,
+                            method='polyphase', mode=mode)
+                    # 更新後の画像を与えた場合は全体の再計算とビット単位で一致
+                    ll, octave = fwt.fwt2d_mra(src, 3, scaling_coef, method='polyphase', mode=mode)
+                    fwt_tiled.update_mra(ll, octave, scaling_coef, region, src=updated)
+                    self.assertTrue(np.array_equal(ll_ref, ll))
+                    for subbands, subbands_ref in zip(octave, octave_ref):
+                        for subband, subband_ref in zip(subbands, subbands_ref):
+                            self.assertTrue(np.array_equal(subband_ref, subband))
+                    # 変化分を与えた場合
+                    ll, octave = fwt.fwt2d_mra(src, 3, scaling_coef, mode=mode)
+                    fwt_tiled.update_mra(ll, octave, scaling_coef, region, delta=delta)
+                    self.assertTrue(np.allclose(ll_ref, ll))
+                    for subbands, subbands_ref in zip(octave, octave_ref):
+                        for subband, subband_ref in zip(subbands, subbands_ref):
+                            self.assertTrue(np.allclose(subband_ref, subband))
+        with self.assertRaises(ValueError):
+            fwt_tiled.update_mra(ll, octave, scaling_coef, region)
+
+if __name__ == '__main__':
+    unittest.main()